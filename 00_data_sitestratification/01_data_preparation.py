@@ -2,28 +2,66 @@
 # ---------------------------------------------------------------------------
 # Pre-process rasters
 # Author: Timm Nawrocki
-# Last Updated: 2025-04-08
+# Last Updated: 2026-10-17
 # Usage: Execute in Python 3.9+.
-# Description: "Pre-process rasters" combines adjacent raster tiles and extracts rasters to common extent, mask, grid, cell size, data type, and no data value.
+# Description: "Pre-process rasters" combines adjacent raster tiles and extracts rasters to common extent, mask, grid, cell size, data type, and no data value. By default, each raster is warped, filled, and masked in a single pass and written once to the output folder. The 30 m ABoVE layers may instead be described by warped views that later stages reproject on demand. Rasters are only rebuilt when their build key in the build manifest changes.
 # ---------------------------------------------------------------------------
 
 # Import packages
 import os
-import glob
 import time
-import numpy as np
-import rasterio
 from osgeo import gdal
 from osgeo.gdalconst import GDT_Byte
 from osgeo.gdalconst import GDT_Int16
 from akutils import *
+from stratification_utils import BuildManifest
+from stratification_utils import code_signature
+from stratification_utils import cover_storage_type
+from stratification_utils import warped_view_file
+from stratification_utils import write_warped_view
+from stratification_utils.warp_scheduler import compare_masked_raster
+from stratification_utils.warp_scheduler import mask_warped_raster
+from stratification_utils.warp_scheduler import run_warp_jobs
+from stratification_utils.warp_scheduler import warp_job
+from stratification_utils.warp_scheduler import warp_job_nodata
 
 # Set nodata value
 nodata = -32768
 
+# Set storage type of percent cover layers
+# 'uint8' stores foliar cover as unsigned 8 bit integers with 255 as no data, which halves the size of the dominant
+# inputs of later stages; 'int16' stores foliar cover like all other layers.
+cover_storage = 'uint8'
+cover_dtype, cover_nodata = cover_storage_type(cover_storage)
+cover_type = GDT_Byte if cover_dtype == 'uint8' else GDT_Int16
+
+# Set whether the 30 m ABoVE layers are warped on demand by later stages instead of being written at 10 m
+# Each layer is then described by a small view file that later stages read with the resampling of its warp job
+# Views are warped in tiles, so a small share of cells can differ by one from the rasters written at 10 m
+warp_30m_on_read = False
+
 # Configure GDAL
 gdal.UseExceptions()
 
+# Set preparation mode
+# 'direct' fills and masks each raster while it is warped and writes it once to the output folder; 'two_step' writes
+# warped rasters to the intermediate folder and then fills and masks them to the output folder; 'verify' writes the
+# intermediate rasters and checks that the outputs of the direct mode match the two step results.
+preparation_mode = 'direct'
+
+# Set whether input files are identified by content checksums instead of size and modification time
+use_checksums = False
+
+# Set number of concurrent warp jobs, GDAL threads per job, and warp memory per job in megabytes
+warp_workers = max(1, (os.cpu_count() or 2) // 2)
+warp_threads = 2
+warp_memory = 512
+
+# Set approximate edge length of processing blocks of the masking pass in cells
+# Blocks are whole multiples of the native tiles of the map domain raster or parts of its strips; None processes the
+# native blocks
+block_size = 512
+
 # Set root directory
 drive = 'C:/'
 root_folder = 'ACCS_Work'
@@ -41,6 +79,9 @@ intermediate_folder = os.path.join('D:/', root_folder,
 output_folder = os.path.join('D:/', root_folder,
                              'Projects/VegetationEcology/AKVEG_EVT_YukonFlats/Data',
                              'Data_Input/data_output')
+manifest_file = os.path.join('D:/', root_folder,
+                             'Projects/VegetationEcology/AKVEG_EVT_YukonFlats/Data',
+                             'Data_Input/build_manifest.json')
 
 # Define input files
 area_file = os.path.join('D:/', root_folder,
@@ -84,309 +125,155 @@ hydrography_names = ['river', 'stream', 'wetness']
 # Define area bounds
 area_bounds = raster_bounds(area_file)
 
-# Process vegetation 10 m
-count = 0
+# Create warp jobs for vegetation 10 m
+warp_list = []
 for name in veg10m_list:
-    # Define input file
     input_file = os.path.join(veg10m_folder, name, name + '_10m_3338.tif')
-    # Define output file
-    output_file = os.path.join(intermediate_folder, name + '_10m_3338.tif')
-    if os.path.exists(output_file) == 0:
-        print(f'Processing data for {name}...')
-        iteration_start = time.time()
-        # Resample and reproject
-        gdal.Warp(output_file,
-                  input_file,
-                  srcSRS='EPSG:3338',
-                  dstSRS='EPSG:3338',
-                  outputType=GDT_Int16,
-                  workingType=GDT_Byte,
-                  xRes=10,
-                  yRes=-10,
-                  srcNodata=255,
-                  dstNodata=nodata,
-                  outputBounds=area_bounds,
-                  resampleAlg='bilinear',
-                  targetAlignedPixels=False,
-                  creationOptions=['COMPRESS=LZW', 'BIGTIFF=YES'])
-        end_timing(iteration_start)
-    count += 1
+    output_name = name + '_10m_3338.tif'
+    warp_list.append(warp_job(name, input_file,
+                              os.path.join(intermediate_folder, output_name),
+                              os.path.join(output_folder, output_name),
+                              'EPSG:3338', GDT_Byte, 255, cover_type, cover_nodata))
 
-# Process vegetation 30 m
+# Create warp jobs or warped views for vegetation 30 m
+view_list = []
 count = 0
 for name in veg30m_list:
-    # Define input file
     input_file = os.path.join(veg30m_folder, 'ABoVE_PFT_Top_Cover_' + name + '_2020.tif')
-    # Define output file
-    output_name = veg30m_names[count]
-    output_file = os.path.join(intermediate_folder, output_name + '_10m_3338.tif')
-    if os.path.exists(output_file) == 0:
-        print(f'Processing data for {name}...')
-        iteration_start = time.time()
-        # Resample and reproject
-        gdal.Warp(output_file,
-                  input_file,
-                  srcSRS='ESRI:102001',
-                  dstSRS='EPSG:3338',
-                  outputType=GDT_Int16,
-                  workingType=GDT_Byte,
-                  xRes=10,
-                  yRes=-10,
-                  srcNodata=255,
-                  dstNodata=nodata,
-                  outputBounds=area_bounds,
-                  resampleAlg='bilinear',
-                  targetAlignedPixels=False,
-                  creationOptions=['COMPRESS=LZW', 'BIGTIFF=YES'])
-        end_timing(iteration_start)
+    output_name = veg30m_names[count] + '_10m_3338.tif'
+    job = warp_job(name, input_file,
+                   os.path.join(intermediate_folder, output_name),
+                   os.path.join(output_folder, output_name),
+                   'ESRI:102001', GDT_Byte, 255, cover_type, cover_nodata)
+    if warp_30m_on_read:
+        job['output_file'] = warped_view_file(job['output_file'])
+        view_list.append(job)
+    else:
+        warp_list.append(job)
     count += 1
 
-# Process topography data
+# Create warp jobs for topography data
 count = 0
 for name in topography_list:
-    # Define input file
     input_file = os.path.join(topography_folder, name + '_10m_3338.tif')
-    # Define output file
-    output_name = topography_names[count]
-    output_file = os.path.join(intermediate_folder, output_name + '_10m_3338.tif')
-    if os.path.exists(output_file) == 0:
-        print(f'Processing data for {name}...')
-        iteration_start = time.time()
-        # Resample and reproject
-        gdal.Warp(output_file,
-                  input_file,
-                  srcSRS='EPSG:3338',
-                  dstSRS='EPSG:3338',
-                  outputType=GDT_Int16,
-                  workingType=GDT_Int16,
-                  xRes=10,
-                  yRes=-10,
-                  srcNodata=nodata,
-                  dstNodata=nodata,
-                  outputBounds=area_bounds,
-                  resampleAlg='bilinear',
-                  targetAlignedPixels=False,
-                  creationOptions=['COMPRESS=LZW', 'BIGTIFF=YES'])
-        end_timing(iteration_start)
+    output_name = topography_names[count] + '_10m_3338.tif'
+    warp_list.append(warp_job(name, input_file,
+                              os.path.join(intermediate_folder, output_name),
+                              os.path.join(output_folder, output_name),
+                              'EPSG:3338', GDT_Int16, nodata))
     count += 1
 
-# Process hydrography data
+# Create warp jobs for hydrography data
 count = 0
 for name in hydrography_list:
-    # Define input file
     input_file = os.path.join(hydrography_folder, name + '_10m_3338.tif')
-    # Define output file
-    output_name = hydrography_names[count]
-    output_file = os.path.join(intermediate_folder, output_name + '_10m_3338.tif')
-    if os.path.exists(output_file) == 0:
-        print(f'Processing data for {name}...')
-        iteration_start = time.time()
-        # Resample and reproject
-        gdal.Warp(output_file,
-                  input_file,
-                  srcSRS='EPSG:3338',
-                  dstSRS='EPSG:3338',
-                  outputType=GDT_Int16,
-                  workingType=GDT_Int16,
-                  xRes=10,
-                  yRes=-10,
-                  srcNodata=nodata,
-                  dstNodata=nodata,
-                  outputBounds=area_bounds,
-                  resampleAlg='bilinear',
-                  targetAlignedPixels=False,
-                  creationOptions=['COMPRESS=LZW', 'BIGTIFF=YES'])
-        end_timing(iteration_start)
+    output_name = hydrography_names[count] + '_10m_3338.tif'
+    warp_list.append(warp_job(name, input_file,
+                              os.path.join(intermediate_folder, output_name),
+                              os.path.join(output_folder, output_name),
+                              'EPSG:3338', GDT_Int16, nodata))
     count += 1
 
-# Process floodplain raster
-output_file = os.path.join(intermediate_folder, 'floodplain_10m_3338.tif')
-if os.path.exists(output_file) == 0:
-    print(f'Processing data for floodplain...')
-    iteration_start = time.time()
-    # Resample and reproject
-    gdal.Warp(output_file,
-              floodplain_file,
-              srcSRS='EPSG:3338',
-              dstSRS='EPSG:3338',
-              outputType=GDT_Int16,
-              workingType=GDT_Int16,
-              xRes=10,
-              yRes=-10,
-              srcNodata=nodata,
-              dstNodata=nodata,
-              outputBounds=area_bounds,
-              resampleAlg='bilinear',
-              targetAlignedPixels=False,
-              creationOptions=['COMPRESS=LZW', 'BIGTIFF=YES'])
-    end_timing(iteration_start)
-
-# Process fire raster
-output_file = os.path.join(intermediate_folder, 'fireyear_10m_3338.tif')
-if os.path.exists(output_file) == 0:
-    print(f'Processing data for fire year...')
-    iteration_start = time.time()
-    # Resample and reproject
-    gdal.Warp(output_file,
-              fire_file,
-              srcSRS='EPSG:3338',
-              dstSRS='EPSG:3338',
-              outputType=GDT_Int16,
-              workingType=GDT_Int16,
-              xRes=10,
-              yRes=-10,
-              srcNodata=nodata,
-              dstNodata=nodata,
-              outputBounds=area_bounds,
-              resampleAlg='bilinear',
-              targetAlignedPixels=False,
-              creationOptions=['COMPRESS=LZW', 'BIGTIFF=YES'])
-    end_timing(iteration_start)
-
-# Process ESA World Cover raster
-output_file = os.path.join(intermediate_folder, 'esacover_10m_3338.tif')
-if os.path.exists(output_file) == 0:
-    print(f'Processing data for ESA world cover...')
-    iteration_start = time.time()
-    # Resample and reproject
-    gdal.Warp(output_file,
-              esa_file,
-              srcSRS='EPSG:3338',
-              dstSRS='EPSG:3338',
-              outputType=GDT_Int16,
-              workingType=GDT_Int16,
-              xRes=10,
-              yRes=-10,
-              srcNodata=nodata,
-              dstNodata=nodata,
-              outputBounds=area_bounds,
-              resampleAlg='bilinear',
-              targetAlignedPixels=False,
-              creationOptions=['COMPRESS=LZW', 'BIGTIFF=YES'])
-    end_timing(iteration_start)
-
-# Process ESRI World Cover raster
-output_file = os.path.join(intermediate_folder, 'esricover_10m_3338.tif')
-if os.path.exists(output_file) == 0:
-    print(f'Processing data for ESRI world cover...')
-    iteration_start = time.time()
-    # Resample and reproject
-    gdal.Warp(output_file,
-              esri_file,
-              srcSRS='EPSG:3338',
-              dstSRS='EPSG:3338',
-              outputType=GDT_Int16,
-              workingType=GDT_Byte,
-              xRes=10,
-              yRes=-10,
-              srcNodata=255,
-              dstNodata=nodata,
-              outputBounds=area_bounds,
-              resampleAlg='bilinear',
-              targetAlignedPixels=False,
-              creationOptions=['COMPRESS=LZW', 'BIGTIFF=YES'])
-    end_timing(iteration_start)
+# Create warp jobs for ancillary rasters
+warp_list.append(warp_job('floodplain', floodplain_file,
+                          os.path.join(intermediate_folder, 'floodplain_10m_3338.tif'),
+                          os.path.join(output_folder, 'floodplain_10m_3338.tif'),
+                          'EPSG:3338', GDT_Int16, nodata))
+warp_list.append(warp_job('fire year', fire_file,
+                          os.path.join(intermediate_folder, 'fireyear_10m_3338.tif'),
+                          os.path.join(output_folder, 'fireyear_10m_3338.tif'),
+                          'EPSG:3338', GDT_Int16, nodata))
+warp_list.append(warp_job('ESA world cover', esa_file,
+                          os.path.join(intermediate_folder, 'esacover_10m_3338.tif'),
+                          os.path.join(output_folder, 'esacover_10m_3338.tif'),
+                          'EPSG:3338', GDT_Int16, nodata))
+warp_list.append(warp_job('ESRI world cover', esri_file,
+                          os.path.join(intermediate_folder, 'esricover_10m_3338.tif'),
+                          os.path.join(output_folder, 'esricover_10m_3338.tif'),
+                          'EPSG:3338', GDT_Byte, 255))
+warp_list.append(warp_job('canopy height', height_file,
+                          os.path.join(intermediate_folder, 'height_10m_3338.tif'),
+                          os.path.join(output_folder, 'height_10m_3338.tif'),
+                          'EPSG:3338', GDT_Byte, 255))
+warp_list.append(warp_job('alkaline', alkaline_file,
+                          os.path.join(intermediate_folder, 'alkaline_10m_3338.tif'),
+                          os.path.join(output_folder, 'alkaline_10m_3338.tif'),
+                          'EPSG:3338', GDT_Byte, 255))
+warp_list.append(warp_job('correction', correction_file,
+                          os.path.join(intermediate_folder, 'correction_10m_3338.tif'),
+                          os.path.join(output_folder, 'correction_10m_3338.tif'),
+                          'EPSG:3338', GDT_Byte, 255))
 
-# Process height raster
-output_file = os.path.join(intermediate_folder, 'height_10m_3338.tif')
-if os.path.exists(output_file) == 0:
-    print(f'Processing data for canopy height...')
-    iteration_start = time.time()
-    # Resample and reproject
-    gdal.Warp(output_file,
-              height_file,
-              srcSRS='EPSG:3338',
-              dstSRS='EPSG:3338',
-              outputType=GDT_Int16,
-              workingType=GDT_Byte,
-              xRes=10,
-              yRes=-10,
-              srcNodata=255,
-              dstNodata=nodata,
-              outputBounds=area_bounds,
-              resampleAlg='bilinear',
-              targetAlignedPixels=False,
-              creationOptions=['COMPRESS=LZW', 'BIGTIFF=YES'])
-    end_timing(iteration_start)
+# Identify rasters whose inputs, parameters, or code changed since they were last built
+build_manifest = BuildManifest(manifest_file, checksum=use_checksums)
+code_key = code_signature(__file__)
+key_dictionary = {}
+for job in warp_list:
+    parameters = {'source_crs': job['source_crs'],
+                  'working_type': job['working_type'],
+                  'source_nodata': job['source_nodata'],
+                  'area_bounds': area_bounds,
+                  'output_type': job['output_type'],
+                  'nodata': warp_job_nodata(job, nodata),
+                  'resampling': job['resampling']}
+    key_dictionary[job['name']] = build_manifest.build_key([job['input_file'], area_file], parameters, code_key)
+if preparation_mode == 'verify':
+    pending_list = warp_list
+else:
+    pending_list = [job for job in warp_list
+                    if build_manifest.is_current(job['output_file'], key_dictionary[job['name']]) == 0]
 
-# Process alkaline raster
-output_file = os.path.join(intermediate_folder, 'alkaline_10m_3338.tif')
-if os.path.exists(output_file) == 0:
-    print(f'Processing data for alkaline...')
-    iteration_start = time.time()
-    # Resample and reproject
-    gdal.Warp(output_file,
-              alkaline_file,
-              srcSRS='EPSG:3338',
-              dstSRS='EPSG:3338',
-              outputType=GDT_Int16,
-              workingType=GDT_Byte,
-              xRes=10,
-              yRes=-10,
-              srcNodata=255,
-              dstNodata=nodata,
-              outputBounds=area_bounds,
-              resampleAlg='bilinear',
-              targetAlignedPixels=False,
-              creationOptions=['COMPRESS=LZW', 'BIGTIFF=YES'])
-    end_timing(iteration_start)
+# Write warped views of the 30 m layers whose inputs, parameters, or code changed
+for job in view_list:
+    parameters = {'source_crs': job['source_crs'],
+                  'source_nodata': job['source_nodata'],
+                  'area_bounds': area_bounds,
+                  'output_type': job['output_type'],
+                  'nodata': warp_job_nodata(job, nodata),
+                  'resampling': job['resampling']}
+    view_key = build_manifest.build_key([job['input_file'], area_file], parameters, code_key)
+    if build_manifest.is_current(job['output_file'], view_key) == 0:
+        print(f'Writing warped view of {job["name"]}...')
+        write_warped_view(job['output_file'], job['input_file'], area_file, job['source_crs'],
+                          job['source_nodata'], cover_dtype, cover_nodata, job['resampling'])
+        build_manifest.record(job['output_file'], view_key)
 
-# Process correction raster
-output_file = os.path.join(intermediate_folder, 'correction_10m_3338.tif')
-if os.path.exists(output_file) == 0:
-    print(f'Processing data for correction...')
-    iteration_start = time.time()
-    # Resample and reproject
-    gdal.Warp(output_file,
-              correction_file,
-              srcSRS='EPSG:3338',
-              dstSRS='EPSG:3338',
-              outputType=GDT_Int16,
-              workingType=GDT_Byte,
-              xRes=10,
-              yRes=-10,
-              srcNodata=255,
-              dstNodata=nodata,
-              outputBounds=area_bounds,
-              resampleAlg='bilinear',
-              targetAlignedPixels=False,
-              creationOptions=['COMPRESS=LZW', 'BIGTIFF=YES'])
+# Resample and reproject pending rasters in a bounded worker pool
+iteration_start = time.time()
+timing_dictionary = run_warp_jobs(pending_list, area_bounds, area_file, mode=preparation_mode, nodata=nodata,
+                                  worker_count=warp_workers,
+                                  threads_per_job=warp_threads,
+                                  memory_per_job=warp_memory,
+                                  overwrite=True,
+                                  block_size=block_size)
+if len(timing_dictionary) > 0:
     end_timing(iteration_start)
 
-# Create list of all intermediate datasets
-intermediate_files = glob.glob(f'{intermediate_folder}' + '/*.tif')
-
-# Update mask for output raster
-for file in intermediate_files:
-    # Define output file
-    file_name = os.path.split(file)[1]
-    output_file = os.path.join(output_folder, file_name)
-    if os.path.exists(output_file) == 0:
+# Update mask for output rasters in the two step mode
+if preparation_mode == 'two_step':
+    for job in pending_list:
+        file_name = os.path.split(job['intermediate_file'])[1]
         print(f'Updating mask for {file_name}...')
         iteration_start = time.time()
-        input_raster = rasterio.open(file)
-        input_profile = input_raster.profile.copy()
-        area_raster = rasterio.open(area_file)
-        with rasterio.open(output_file, 'w', **input_profile, BIGTIFF='YES') as dst:
-            # Find number of raster blocks
-            window_list = []
-            for block_index, window in area_raster.block_windows(1):
-                window_list.append(window)
-            # Iterate processing through raster blocks
-            count = 1
-            progress = 0
-            for block_index, window in area_raster.block_windows(1):
-                area_block = area_raster.read(window=window,
-                                              masked=False)
-                raster_block = input_raster.read(window=window,
-                                                 masked=False)
-                # Set no data values in input raster to 0
-                raster_block = np.where(raster_block == nodata, 0, raster_block)
-                # Set no data values from area raster to no data
-                raster_block = np.where(area_block != 1, nodata, raster_block)
-                # Write results
-                dst.write(raster_block,
-                          window=window)
-                # Report progress
-                count, progress = raster_block_progress(10, len(window_list), count, progress)
+        mask_warped_raster(job['intermediate_file'], area_file, job['output_file'],
+                           nodata=warp_job_nodata(job, nodata), block_size=block_size)
         end_timing(iteration_start)
+
+# Record build keys of the rebuilt output rasters
+if preparation_mode != 'verify':
+    for job in pending_list:
+        build_manifest.record(job['output_file'], key_dictionary[job['name']])
+
+# Compare two step results to the outputs of the direct mode in the verification mode
+if preparation_mode == 'verify':
+    mismatch_list = []
+    for job in warp_list:
+        file_name = os.path.split(job['intermediate_file'])[1]
+        print(f'Verifying {file_name}...')
+        mismatch_count = compare_masked_raster(job['intermediate_file'], area_file, job['output_file'],
+                                               nodata=warp_job_nodata(job, nodata), block_size=block_size)
+        print(f'\t{mismatch_count} cells differ from the direct output.')
+        if mismatch_count > 0:
+            mismatch_list.append(file_name)
+    if len(mismatch_list) > 0:
+        raise RuntimeError(f'Direct outputs differ from two step results for {", ".join(mismatch_list)}.')
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Build input cube
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Build input cube" packs the aligned 10 m foliar cover, canopy height, and ancillary rasters into tiled multi-band rasters that later stages read with one call per block and storage type. Compact uint8 foliar cover is kept in a uint8 companion cube next to the int16 cube. The cube records the signature of each layer, so later stages read layers that changed after the cube was built from their own rasters.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import os
+import time
+from akutils import *
+from stratification_utils import BuildManifest
+from stratification_utils import build_input_cube
+from stratification_utils import code_signature
+from stratification_utils import warped_view_file
+
+# Set no data value
+nodata = -32768
+
+# Set whether the 30 m ABoVE layers are read through the warped views written by 01_data_preparation.py
+# Views require warp_30m_on_read in 01_data_preparation.py and can change the types of a small share of cells
+use_warped_views = False
+
+# Set whether input files are identified by content checksums instead of size and modification time
+use_checksums = False
+
+# Set root directory
+drive = 'D:/'
+root_folder = 'ACCS_Work'
+
+# Define folder structure
+project_folder = os.path.join(drive, root_folder, 'Projects/VegetationEcology/AKVEG_EVT_YukonFlats/Data')
+foliar_folder = os.path.join(project_folder, 'Data_Input/foliar_cover')
+ancillary_folder = os.path.join(project_folder, 'Data_Input/ancillary_data')
+
+# Define input files
+area_input = os.path.join(project_folder, 'Data_Input/YukonFlats_MapDomain_10m_3338.tif')
+height_input = os.path.join(project_folder, 'Data_Input/canopy_height/height_10m_3338.tif')
+
+# Define output files
+cube_output = os.path.join(project_folder, 'Data_Input/input_cube_10m_3338.tif')
+manifest_file = os.path.join(project_folder, 'Data_Input/build_manifest.json')
+
+# Create input lists
+foliar_list = ['alnus', 'betshr', 'bettre', 'brotre', 'dryas', 'dsalix', 'empnig', 'erivag', 'forb',
+               'gramin', 'lichen', 'mwcalama', 'ndsalix', 'nerishr', 'picgla', 'picmar', 'poptre',
+               'populbt', 'rhoshr', 'sphagn', 'vaculi', 'vacvit', 'wetsed']
+view_list = ['lichen', 'gramin', 'forb']
+ancillary_list = ['esa', 'esri', 'fire', 'flood', 'alkaline', 'correction']
+ancillary_names = ['esacover', 'esricover', 'fireyear', 'floodplain', 'alkaline', 'correction']
+
+# Create input dictionary
+input_dictionary = {}
+for name in foliar_list:
+    input_path = os.path.join(foliar_folder, name + '_10m_3338.tif')
+    input_dictionary[name] = warped_view_file(input_path) if use_warped_views and name in view_list else input_path
+input_dictionary['height'] = height_input
+count = 0
+for name in ancillary_list:
+    input_dictionary[name] = os.path.join(ancillary_folder, ancillary_names[count] + '_10m_3338.tif')
+    count += 1
+
+# Calculate build key of the input cube
+build_manifest = BuildManifest(manifest_file, checksum=use_checksums)
+cube_key = build_manifest.build_key([area_input] + list(input_dictionary.values()),
+                                    {'layers': list(input_dictionary.keys()), 'nodata': nodata},
+                                    code_signature(__file__))
+
+# Build input cube
+if build_manifest.is_current(cube_output, cube_key) == 0:
+    print(f'Building input cube from {len(input_dictionary)} layers...')
+    iteration_start = time.time()
+    build_input_cube(area_input, input_dictionary, cube_output, nodata=nodata, build_manifest=build_manifest)
+    build_manifest.record(cube_output, cube_key)
+    end_timing(iteration_start)
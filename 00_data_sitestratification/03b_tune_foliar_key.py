@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Tune foliar cover key
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Tune foliar cover key" re-evaluates revised rules of the programmatic key on a cached sample of pixels stratified by parsed type and reports the estimated change in area of each type relative to the current key. The sample is only redrawn when its build key in the build manifest changes.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import os
+import time
+from akutils import *
+from stratification_utils import BuildManifest
+from stratification_utils import code_signature
+from stratification_utils import compare_key_sample
+from stratification_utils import derived_dependencies
+from stratification_utils import derived_registry
+from stratification_utils import draw_key_sample
+from stratification_utils import evaluate_key_sample
+from stratification_utils import foliar_key_overrides
+from stratification_utils import foliar_key_rules
+from stratification_utils import load_key_sample
+from stratification_utils import warped_view_file
+
+# Set approximate number of sampled pixels, smallest expected count per type, and seed
+sample_size = 2000000
+minimum_count = 2000
+sample_seed = 0
+
+# Set number of worker threads that read raster blocks while the sample is drawn
+worker_count = max(1, os.cpu_count() - 2)
+
+# Set approximate edge length of processing blocks in cells
+# Blocks are whole multiples of the native tiles of the map domain raster or parts of its strips; None processes the
+# native blocks
+block_size = 512
+
+# Set whether to calculate the derived indices from the foliar cover blocks of each window while sampling
+# The derived rasters of 02_calculate_derived_data.py are then not read
+derive_in_parse = True
+
+# Set whether the 30 m ABoVE layers are read through the warped views written by 01_data_preparation.py
+# Views require warp_30m_on_read in 01_data_preparation.py and can change the types of a small share of cells
+use_warped_views = False
+
+# Set whether input files are identified by content checksums instead of size and modification time
+use_checksums = False
+
+# Set whether to read layers from the input cube built by 01b_build_input_cube.py
+use_input_cube = False
+
+# Set whether to read intermediate rasters through the uncompressed working cache
+use_working_cache = False
+
+# Set root directory
+drive = 'D:/'
+root_folder = 'ACCS_Work'
+
+# Define folder structure
+project_folder = os.path.join(drive, root_folder, 'Projects/VegetationEcology/AKVEG_EVT_YukonFlats/Data')
+foliar_folder = os.path.join(project_folder, 'Data_Input/foliar_cover')
+derived_folder = os.path.join(project_folder, 'Data_Input/foliar_derived')
+ancillary_folder = os.path.join(project_folder, 'Data_Input/ancillary_data')
+output_folder = os.path.join(project_folder, 'Data_Input/stratification/intermediate')
+
+# Define input files
+area_input = os.path.join(project_folder, 'Data_Input/YukonFlats_MapDomain_10m_3338.tif')
+cube_input = os.path.join(project_folder, 'Data_Input/input_cube_10m_3338.tif')
+cache_folder = os.path.join(project_folder, 'Data_Input/working_cache')
+manifest_file = os.path.join(project_folder, 'Data_Input/build_manifest.json')
+parsed_input = os.path.join(output_folder, 'AKVEG_Parsed_10m_3338.tif')
+
+# Define output files
+sample_output = os.path.join(output_folder, 'AKVEG_KeySample.npz')
+
+# Create input lists
+foliar_list = ['alnus', 'betshr', 'bettre', 'brotre', 'dryas', 'dsalix', 'empnig', 'erivag', 'forb',
+               'gramin', 'lichen', 'mwcalama', 'ndsalix', 'nerishr', 'picgla', 'picmar', 'poptre',
+               'populbt', 'rhoshr', 'sphagn', 'vaculi', 'vacvit', 'wetsed']
+view_list = ['lichen', 'gramin', 'forb']
+derived_list = ['picratio', 'picsum', 'decratio', 'ndshrub', 'eridwarf', 'wetland', 'picwet', 'herbaceous']
+derived_names = ['picea_ratio', 'picea_sum', 'deciduous_ratio', 'alder_birch_willow', 'ericaceous_dwarf',
+                 'wetland_indicator', 'picmar_wet_indicator', 'herbaceous']
+ancillary_list = ['esa', 'esri', 'fire', 'flood', 'alkaline', 'correction']
+ancillary_names = ['esacover', 'esricover', 'fireyear', 'floodplain', 'alkaline', 'correction']
+
+# Create input dictionary for the programmatic key
+input_dictionary = {}
+for name in foliar_list:
+    input_path = os.path.join(foliar_folder, name + '_10m_3338.tif')
+    input_dictionary[name] = warped_view_file(input_path) if use_warped_views and name in view_list else input_path
+for name, file_name in zip(derived_list, derived_names):
+    input_dictionary[name] = os.path.join(derived_folder, file_name + '_10m_3338.tif')
+input_dictionary['height'] = os.path.join(project_folder, 'Data_Input/canopy_height/height_10m_3338.tif')
+for name, file_name in zip(ancillary_list, ancillary_names):
+    input_dictionary[name] = os.path.join(ancillary_folder, file_name + '_10m_3338.tif')
+
+# Define tuned rules as a copy of the rule table with revised predicates
+# Rules are addressed by their position in foliar_key_rules; print the table to find a rule
+tuned_overrides = list(foliar_key_overrides)
+tuned_rules = list(foliar_key_rules)
+tuned_rules[0] = tuned_rules[0]._replace(predicate=lambda b: (b['picsum'] >= 12) & (b['decratio'] < 40))
+
+# Define type labels from the first rule that assigns each type
+label_dictionary = {0: 'not assigned'}
+for rule in foliar_key_overrides + foliar_key_rules:
+    label_dictionary.setdefault(rule.code, rule.label)
+
+# Identify derived indices that are calculated while sampling instead of read
+if derive_in_parse:
+    calculated_names = list(derived_registry.keys())
+    evaluation_order, derived_layers = derived_dependencies(calculated_names)
+    read_dictionary = {name: path for name, path in input_dictionary.items() if name not in evaluation_order}
+    expression_list = [derived_registry[name]['expression'] for name in evaluation_order]
+else:
+    calculated_names = None
+    read_dictionary = input_dictionary
+    expression_list = []
+
+# Calculate build key of the sample
+build_manifest = BuildManifest(manifest_file, checksum=use_checksums)
+cube_list = [cube_input] if use_input_cube else []
+sample_key = build_manifest.build_key([area_input, parsed_input] + list(read_dictionary.values()) + cube_list,
+                                      {'layers': list(read_dictionary.keys()), 'expressions': expression_list,
+                                       'sample_size': sample_size,
+                                       'minimum_count': minimum_count, 'seed': sample_seed,
+                                       'block_size': block_size},
+                                      code_signature(__file__))
+
+# Draw or load the stratified sample
+if build_manifest.is_current(sample_output, sample_key) == 0:
+    print(f'Drawing stratified sample of about {sample_size} pixels...')
+    iteration_start = time.time()
+    key_sample = draw_key_sample(area_input, input_dictionary, parsed_input, sample_output,
+                                 sample_size=sample_size, minimum_count=minimum_count, seed=sample_seed,
+                                 worker_count=worker_count,
+                                 cube_input=cube_input if use_input_cube else None,
+                                 cache_folder=cache_folder if use_working_cache else None,
+                                 block_size=block_size, derived_names=calculated_names)
+    build_manifest.record(sample_output, sample_key)
+    end_timing(iteration_start)
+else:
+    key_sample = load_key_sample(sample_output)
+
+# Evaluate the tuned key on the sample and compare it to the parsed types stored in the sample
+print(f'Evaluating key on {len(key_sample["weight"])} sampled pixels...')
+evaluation_start = time.time()
+tuned_types = evaluate_key_sample(key_sample, tuned_rules, tuned_overrides)
+evaluation_seconds = time.time() - evaluation_start
+change_list, changed_share = compare_key_sample(key_sample, tuned_types, label_dictionary=label_dictionary)
+
+# Report the estimated change in area of each type
+print(f'\tEvaluated tuned key in {evaluation_seconds:.2f} seconds.')
+print(f'\tType changed for {100 * changed_share:.2f}% of the map domain.')
+for row in change_list:
+    if row['change_km2'] == 0:
+        continue
+    percent = f'{row["change_percent"]:+.1f}%' if row['change_percent'] is not None else 'new'
+    print(f'\t{row["type"]:>4} {row["label"]:<50} {row["baseline_km2"]:>10.2f} km2 -> '
+          f'{row["tuned_km2"]:>10.2f} km2 ({percent})')
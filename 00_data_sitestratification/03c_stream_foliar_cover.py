@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Stream foliar cover to types
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+ with GDAL.
+# Description: "Stream foliar cover to types" replaces 01_data_preparation.py, 02_calculate_derived_data.py, and 03_parse_foliar_cover.py for the layers of the programmatic key. Each processing window is warped from the original inputs, filled, derived, and parsed in memory, and only the parsed raster is written. The parsed raster is only rebuilt when its build key in the build manifest changes; the key is recorded under its own step, and a streamed build or a build of 03_parse_foliar_cover.py discards the key of the other.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import os
+import time
+from osgeo.gdalconst import GDT_Byte
+from osgeo.gdalconst import GDT_Int16
+from akutils import *
+from stratification_utils import BuildManifest
+from stratification_utils import code_signature
+from stratification_utils import cover_storage_type
+from stratification_utils import derived_registry
+from stratification_utils.streaming_pipeline import stream_foliar_cover
+from stratification_utils.warp_scheduler import warp_job
+from stratification_utils.warp_scheduler import warp_job_nodata
+
+# Set no data
+nodata = -32768
+
+# Set storage type of percent cover layers in memory
+cover_storage = 'uint8'
+cover_dtype, cover_nodata = cover_storage_type(cover_storage)
+cover_type = GDT_Byte if cover_dtype == 'uint8' else GDT_Int16
+
+# Set number of worker threads that process windows, GDAL threads per layer, and warp memory per layer in megabytes
+worker_count = max(1, os.cpu_count() - 2)
+warp_threads = 1
+warp_memory = 64
+
+# Set approximate edge length of processing blocks in cells
+# Blocks are whole multiples of the native tiles of the map domain raster or parts of its strips; None processes the
+# native blocks
+block_size = 512
+
+# Set implementation of the programmatic key ('rules', 'numba', or 'reference')
+key_engine = 'rules'
+
+# Set whether input files are identified by content checksums instead of size and modification time
+use_checksums = False
+
+# Set root directory
+drive = 'C:/'
+root_folder = 'ACCS_Work'
+
+# Define folder structure
+veg10m_folder = os.path.join(drive, root_folder,
+                             'Projects/VegetationEcology/AKVEG_Map/Data',
+                             'Data_Output/data_package/version_2.0_20250103')
+veg30m_folder = os.path.join('D:/', root_folder, 'Data/biota/vegetation/Alaska_PFT_TimeSeries/original')
+project_folder = os.path.join('D:/', root_folder, 'Projects/VegetationEcology/AKVEG_EVT_YukonFlats/Data')
+output_folder = os.path.join(project_folder, 'Data_Input/stratification/intermediate')
+
+# Define input files
+area_input = os.path.join(project_folder, 'Data_Input/YukonFlats_MapDomain_10m_3338.tif')
+manifest_file = os.path.join(project_folder, 'Data_Input/build_manifest.json')
+fire_file = os.path.join(drive, root_folder,
+                         'Projects/VegetationEcology/AKVEG_Map/Data',
+                         'Data_Input/ancillary_data/processed/AlaskaYukon_FireYear_10m_3338.tif')
+floodplain_file = os.path.join(project_folder, 'Data_Input/ancillary_data/unprocessed/floodplain_10m_3338.tif')
+esa_file = os.path.join(drive, root_folder,
+                        'Projects/VegetationEcology/AKVEG_Map/Data',
+                        'Data_Input/ancillary_data/processed/AlaskaYukon_ESAWorldCover2_10m_3338.tif')
+esri_file = os.path.join(project_folder, 'Data_Input/ancillary_data/unprocessed/esrilc_10m_3338.tif')
+height_file = os.path.join(project_folder, 'Data_Input/canopy_height/intermediate/height_10m_3338.tif')
+alkaline_file = os.path.join(project_folder, 'Data_Input/ancillary_data/unprocessed/alkaline_10m_3338.tif')
+correction_file = os.path.join(project_folder, 'Data_Input/ancillary_data/unprocessed/correction_10m_3338.tif')
+
+# Define output files
+parsed_output = os.path.join(output_folder, 'AKVEG_Parsed_10m_3338.tif')
+
+# Create input lists for vegetation
+veg10m_list = ['alnus', 'betshr', 'bettre', 'brotre', 'dryas', 'dsalix', 'empnig', 'erivag',
+               'mwcalama', 'ndsalix', 'nerishr', 'picgla', 'picmar', 'poptre', 'populbt',
+               'rhoshr', 'sphagn', 'vaculi', 'vacvit', 'wetsed']
+veg30m_list = ['tmLichenLight', 'Graminoid', 'Forb']
+veg30m_names = ['lichen', 'gramin', 'forb']
+
+# Create warp jobs for the layers of the programmatic key with the parameters of 01_data_preparation.py
+job_dictionary = {}
+for name in veg10m_list:
+    input_file = os.path.join(veg10m_folder, name, name + '_10m_3338.tif')
+    job_dictionary[name] = warp_job(name, input_file, None, None,
+                                    'EPSG:3338', GDT_Byte, 255, cover_type, cover_nodata)
+for name, layer_name in zip(veg30m_list, veg30m_names):
+    input_file = os.path.join(veg30m_folder, 'ABoVE_PFT_Top_Cover_' + name + '_2020.tif')
+    job_dictionary[layer_name] = warp_job(name, input_file, None, None,
+                                          'ESRI:102001', GDT_Byte, 255, cover_type, cover_nodata)
+job_dictionary['flood'] = warp_job('floodplain', floodplain_file, None, None, 'EPSG:3338', GDT_Int16, nodata)
+job_dictionary['fire'] = warp_job('fire year', fire_file, None, None, 'EPSG:3338', GDT_Int16, nodata)
+job_dictionary['esa'] = warp_job('ESA world cover', esa_file, None, None, 'EPSG:3338', GDT_Int16, nodata)
+job_dictionary['esri'] = warp_job('ESRI world cover', esri_file, None, None, 'EPSG:3338', GDT_Byte, 255)
+job_dictionary['height'] = warp_job('canopy height', height_file, None, None, 'EPSG:3338', GDT_Byte, 255)
+job_dictionary['alkaline'] = warp_job('alkaline', alkaline_file, None, None, 'EPSG:3338', GDT_Byte, 255)
+job_dictionary['correction'] = warp_job('correction', correction_file, None, None, 'EPSG:3338', GDT_Byte, 255)
+
+# Calculate build key of the parsed raster
+build_manifest = BuildManifest(manifest_file, checksum=use_checksums)
+parameters = {'layers': {name: [job['source_crs'], job['working_type'], job['source_nodata'],
+                                job['output_type'], warp_job_nodata(job, nodata), job['resampling']]
+                         for name, job in job_dictionary.items()},
+              'nodata': nodata,
+              'key_engine': key_engine,
+              'expressions': [definition['expression'] for definition in derived_registry.values()]}
+parsed_key = build_manifest.build_key([area_input] + [job['input_file'] for job in job_dictionary.values()],
+                                      parameters, code_signature(__file__))
+
+# Stream the original inputs to parsed types
+if build_manifest.is_current(parsed_output, parsed_key, step='stream') == 0:
+    print(f'Streaming inputs to types using {worker_count} worker threads...')
+    iteration_start = time.time()
+    stream_foliar_cover(area_input, job_dictionary, parsed_output, nodata=nodata,
+                        worker_count=worker_count, key_engine=key_engine, block_size=block_size,
+                        warp_threads=warp_threads, warp_memory=warp_memory)
+    build_manifest.record(parsed_output, parsed_key, step='stream')
+    build_manifest.discard(parsed_output)
+    end_timing(iteration_start)
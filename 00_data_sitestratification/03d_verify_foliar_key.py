@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Verify foliar cover key
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Verify foliar cover key" parses the full map domain with a baseline and a candidate implementation of the programmatic key, reading each block once for both, and reports the confusion between their types and the input values of the first mismatching pixels. The script raises an error if any type differs, so a rewrite of the key must reproduce the baseline exactly.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import os
+import time
+from akutils import *
+from stratification_utils import compare_key_engines
+from stratification_utils import confusion_rows
+from stratification_utils import derived_registry
+from stratification_utils import foliar_key_overrides
+from stratification_utils import foliar_key_rules
+from stratification_utils import warped_view_file
+from stratification_utils import write_key_comparison
+
+# Set no data
+nodata = -32768
+
+# Set number of worker threads that parse raster blocks
+worker_count = max(1, os.cpu_count() - 2)
+
+# Set approximate edge length of processing blocks in cells
+# Blocks are whole multiples of the native tiles of the map domain raster or parts of its strips; None processes the
+# native blocks
+block_size = 512
+
+# Set implementations of the programmatic key to compare ('rules', 'numba', or 'reference')
+# A key function can be compared as a tuple of a label and the function, such as a partial of parse_foliar_rules
+# with revised rules
+baseline_engine = 'reference'
+candidate_engine = 'rules'
+
+# Set maximum number of mismatching pixels whose input values are reported
+mismatch_limit = 100
+
+# Set whether to calculate the derived indices from the foliar cover blocks of each window while parsing
+derive_in_parse = True
+
+# Set whether the 30 m ABoVE layers are read through the warped views written by 01_data_preparation.py
+# Views require warp_30m_on_read in 01_data_preparation.py and can change the types of a small share of cells
+use_warped_views = False
+
+# Set whether to read layers from the input cube built by 01b_build_input_cube.py
+use_input_cube = False
+
+# Set whether to read intermediate rasters through the uncompressed working cache
+use_working_cache = False
+
+# Set root directory
+drive = 'D:/'
+root_folder = 'ACCS_Work'
+
+# Define folder structure
+project_folder = os.path.join(drive, root_folder, 'Projects/VegetationEcology/AKVEG_EVT_YukonFlats/Data')
+foliar_folder = os.path.join(project_folder, 'Data_Input/foliar_cover')
+derived_folder = os.path.join(project_folder, 'Data_Input/foliar_derived')
+ancillary_folder = os.path.join(project_folder, 'Data_Input/ancillary_data')
+output_folder = os.path.join(project_folder, 'Data_Input/stratification/verification')
+
+# Define input files
+area_input = os.path.join(project_folder, 'Data_Input/YukonFlats_MapDomain_10m_3338.tif')
+cube_input = os.path.join(project_folder, 'Data_Input/input_cube_10m_3338.tif')
+cache_folder = os.path.join(project_folder, 'Data_Input/working_cache')
+
+# Create input lists
+foliar_list = ['alnus', 'betshr', 'bettre', 'brotre', 'dryas', 'dsalix', 'empnig', 'erivag', 'forb',
+               'gramin', 'lichen', 'mwcalama', 'ndsalix', 'nerishr', 'picgla', 'picmar', 'poptre',
+               'populbt', 'rhoshr', 'sphagn', 'vaculi', 'vacvit', 'wetsed']
+view_list = ['lichen', 'gramin', 'forb']
+derived_list = ['picratio', 'picsum', 'decratio', 'ndshrub', 'eridwarf', 'wetland', 'picwet', 'herbaceous']
+derived_names = ['picea_ratio', 'picea_sum', 'deciduous_ratio', 'alder_birch_willow', 'ericaceous_dwarf',
+                 'wetland_indicator', 'picmar_wet_indicator', 'herbaceous']
+ancillary_list = ['esa', 'esri', 'fire', 'flood', 'alkaline', 'correction']
+ancillary_names = ['esacover', 'esricover', 'fireyear', 'floodplain', 'alkaline', 'correction']
+
+# Create input dictionary for the programmatic key
+input_dictionary = {}
+for name in foliar_list:
+    input_path = os.path.join(foliar_folder, name + '_10m_3338.tif')
+    input_dictionary[name] = warped_view_file(input_path) if use_warped_views and name in view_list else input_path
+for name, file_name in zip(derived_list, derived_names):
+    input_dictionary[name] = os.path.join(derived_folder, file_name + '_10m_3338.tif')
+input_dictionary['height'] = os.path.join(project_folder, 'Data_Input/canopy_height/height_10m_3338.tif')
+for name, file_name in zip(ancillary_list, ancillary_names):
+    input_dictionary[name] = os.path.join(ancillary_folder, file_name + '_10m_3338.tif')
+
+# Define type labels from the first rule that assigns each type
+label_dictionary = {0: 'not assigned'}
+for rule in foliar_key_overrides + foliar_key_rules:
+    label_dictionary.setdefault(rule.code, rule.label)
+
+# Compare the key implementations over the map domain
+print(f'Comparing key implementations using {worker_count} worker threads...')
+iteration_start = time.time()
+comparison = compare_key_engines(area_input, input_dictionary, baseline_engine=baseline_engine,
+                                 candidate_engine=candidate_engine, nodata=nodata, worker_count=worker_count,
+                                 cube_input=cube_input if use_input_cube else None,
+                                 cache_folder=cache_folder if use_working_cache else None,
+                                 block_size=block_size,
+                                 derived_names=list(derived_registry.keys()) if derive_in_parse else None,
+                                 mismatch_limit=mismatch_limit)
+confusion_file, comparison_file = write_key_comparison(comparison, output_folder, label_dictionary)
+end_timing(iteration_start)
+
+# Report the confusion of each type with mismatching cells
+baseline_label = comparison['baseline_engine']
+candidate_label = comparison['candidate_engine']
+print(f'\t{comparison["mismatch_count"]} of {comparison["cell_count"]} cells differ between '
+      f'{baseline_label} and {candidate_label}.')
+for row in confusion_rows(comparison, label_dictionary):
+    if row['matched_count'] == row['baseline_count']:
+        continue
+    candidate_text = ', '.join(f'{value}: {count}' for value, count in sorted(row['candidate_counts'].items()))
+    print(f'\t{row["type"]:>4} {row["label"]:<50} {row["baseline_count"] - row["matched_count"]:>10} of '
+          f'{row["baseline_count"]:>10} cells differ ({candidate_text})')
+
+# Report the first mismatching pixels with their input values
+for mismatch in comparison['mismatches']:
+    input_text = ', '.join(f'{name}={value}' for name, value in mismatch['inputs'].items())
+    print(f'\tRow {mismatch["row"]}, column {mismatch["col"]} ({mismatch["x"]:.1f}, {mismatch["y"]:.1f}): '
+          f'{baseline_label} {mismatch["baseline"]}, {candidate_label} {mismatch["candidate"]}; {input_text}')
+print(f'\tWrote confusion matrix to {confusion_file} and comparison to {comparison_file}.')
+
+# Fail on any difference
+if comparison['mismatch_count'] > 0:
+    raise RuntimeError(f'{candidate_label} differs from {baseline_label} for {comparison["mismatch_count"]} cells.')
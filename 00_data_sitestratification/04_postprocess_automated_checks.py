@@ -2,16 +2,23 @@
 # ---------------------------------------------------------------------------
 # Post-process automated checks
 # Author: Timm Nawrocki
-# Last Updated: 2025-04-09
-# Usage: Must be executed in an ArcGIS Pro Python 3.9+ distribution.
-# Description: "Post-process automated checks" creates attribute tables and pyramids for rasters that result from the automated checks.
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+ with GDAL. The arcpy engine must be executed in an ArcGIS Pro Python 3.9+ distribution.
+# Description: "Post-process automated checks" creates statistics, attribute tables, and pyramids for rasters that result from the automated checks. Post-processing is skipped when the build key of the parsed raster has not changed since it last ran.
 # ---------------------------------------------------------------------------
 
 # Import packages
 import os
 import time
 from akutils import *
-import arcpy
+from stratification_utils import BuildManifest
+from stratification_utils import code_signature
+from stratification_utils.raster_attributes import postprocess_raster
+
+# Set post-processing engine ('native' or 'arcpy')
+# 'native' counts the histogram in one pass, writes a labeled GDAL attribute table, and builds overviews with GDAL;
+# 'arcpy' requires an ArcGIS Pro distribution
+postprocess_engine = 'native'
 
 # Set root directory
 drive = 'D:/'
@@ -22,8 +29,12 @@ project_folder = os.path.join(drive, root_folder, 'Projects/VegetationEcology/AK
 work_geodatabase = os.path.join(project_folder, 'AKVEG_YukonFlats.gdb')
 output_folder = os.path.join(project_folder, 'Data_Input/stratification')
 
+# Set whether input files are identified by content checksums instead of size and modification time
+use_checksums = False
+
 # Define input datasets
 parsed_input = os.path.join(output_folder, 'intermediate/AKVEG_Parsed_10m_3338.tif')
+manifest_file = os.path.join(project_folder, 'Data_Input/build_manifest.json')
 
 # Define attribute dictionaries
 parsed_dictionary = {0: 'not assigned',
@@ -86,30 +97,46 @@ parsed_dictionary = {0: 'not assigned',
                      103: 'alder-willow active floodplain',
                      104: 'willow active floodplain'}
 
-# Retrieve attribute code block
-label_block = get_attribute_code_block()
+# Calculate build key of the post-processing step
+build_manifest = BuildManifest(manifest_file, checksum=use_checksums)
+postprocess_key = build_manifest.build_key([parsed_input],
+                                           {'labels': parsed_dictionary, 'engine': postprocess_engine},
+                                           code_signature(__file__))
 
 # Post-process parsed foliar cover results
-print('Post-processing parsed foliar cover results...')
-iteration_start = time.time()
-print('\tCalculating statistics...')
-arcpy.management.CalculateStatistics(parsed_input)
-arcpy.management.BuildRasterAttributeTable(parsed_input, 'Overwrite')
-# Calculate attribute label field
-print('\tBuilding attribute table...')
-label_expression = f'get_response(!VALUE!, {parsed_dictionary}, "value")'
-arcpy.management.CalculateField(parsed_input,
-                                'label',
-                                label_expression,
-                                'PYTHON3',
-                                label_block)
-# Build pyramids
-print('\tBuilding pyramids...')
-arcpy.management.BuildPyramids(parsed_input,
-                               -1,
-                               'NONE',
-                               'NEAREST',
-                               'LZ77',
-                               '',
-                               'OVERWRITE')
-end_timing(iteration_start)
+if build_manifest.is_current(parsed_input, postprocess_key, step='postprocess') == 0:
+    print(f'Post-processing parsed foliar cover results with the {postprocess_engine} engine...')
+    iteration_start = time.time()
+    if postprocess_engine == 'native':
+        # Build attribute table from the histogram written by the parse step and build pyramids
+        print('\tBuilding attribute table and pyramids...')
+        postprocess_raster(parsed_input, parsed_dictionary)
+    else:
+        # Import arcpy
+        import arcpy
+
+        # Retrieve attribute code block
+        label_block = get_attribute_code_block()
+
+        print('\tCalculating statistics...')
+        arcpy.management.CalculateStatistics(parsed_input)
+        arcpy.management.BuildRasterAttributeTable(parsed_input, 'Overwrite')
+        # Calculate attribute label field
+        print('\tBuilding attribute table...')
+        label_expression = f'get_response(!VALUE!, {parsed_dictionary}, "value")'
+        arcpy.management.CalculateField(parsed_input,
+                                        'label',
+                                        label_expression,
+                                        'PYTHON3',
+                                        label_block)
+        # Build pyramids
+        print('\tBuilding pyramids...')
+        arcpy.management.BuildPyramids(parsed_input,
+                                       -1,
+                                       'NONE',
+                                       'NEAREST',
+                                       'LZ77',
+                                       '',
+                                       'OVERWRITE')
+    build_manifest.record(parsed_input, postprocess_key, step='postprocess')
+    end_timing(iteration_start)
@@ -2,23 +2,34 @@
 # ---------------------------------------------------------------------------
 # Enforce minimum mapping unit
 # Author: Timm Nawrocki
-# Last Updated: 2025-04-09
-# Usage: Must be executed in an ArcGIS Pro Python 3.9+ distribution.
-# Description: "Enforce minimum mapping unit" removes and replaces map units less than 1 acre in area.
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+ with GDAL. The arcpy engine must be executed in an ArcGIS Pro Python 3.9+ distribution.
+# Description: "Enforce minimum mapping unit" removes and replaces map units less than 1 acre in area. The raster is only revised when its build key in the build manifest changes.
 # ---------------------------------------------------------------------------
 
 # Import packages
 import os
 import time
 from akutils import *
-import arcpy
-from arcpy.sa import Con
-from arcpy.sa import ExtractByAttributes
-from arcpy.sa import ExtractByMask
-from arcpy.sa import Nibble
-from arcpy.sa import Raster
-from arcpy.sa import RegionGroup
-from arcpy.sa import SetNull
+from stratification_utils import BuildManifest
+from stratification_utils import code_signature
+from stratification_utils.enforce_mmu import enforce_mmu
+from stratification_utils.raster_attributes import postprocess_raster
+
+# Set no data value
+nodata = -32768
+
+# Set minimum mapping unit engine ('native' or 'arcpy')
+# 'native' labels and replaces regions with NumPy and SciPy on any platform; 'arcpy' requires an ArcGIS Pro distribution
+# and writes the region, mask, and nibble rasters to the intermediate folder
+mmu_engine = 'native'
+
+# Set tile size in cells and number of worker threads for region labeling and replacement in the native engine
+mmu_tile_size = 4096
+mmu_workers = max(1, os.cpu_count() - 2)
+
+# Set number of cells searched around each tile for the nearest retained type before the search is expanded
+mmu_halo = 64
 
 # Set root directory
 drive = 'D:/'
@@ -30,7 +41,11 @@ work_geodatabase = os.path.join(project_folder, 'AKVEG_YukonFlats.gdb')
 input_folder = os.path.join(project_folder, 'Data_Input/stratification/intermediate')
 output_folder = os.path.join(project_folder, 'Data_Input/stratification')
 
+# Set whether input files are identified by content checksums instead of size and modification time
+use_checksums = False
+
 # Define input datasets
+manifest_file = os.path.join(project_folder, 'Data_Input/build_manifest.json')
 area_input = os.path.join(project_folder, 'Data_Input/YukonFlats_MapDomain_10m_3338.tif')
 preliminary_input = os.path.join(input_folder, 'AKVEG_Parsed_10m_3338.tif')
 
@@ -101,144 +116,170 @@ parsed_dictionary = {0: 'not assigned',
                      103: 'alder-willow active floodplain',
                      104: 'willow active floodplain'}
 
-# Retrieve attribute code block
-label_block = get_attribute_code_block()
+# Calculate build key of the revised raster
+build_manifest = BuildManifest(manifest_file, checksum=use_checksums)
+revised_key = build_manifest.build_key([preliminary_input, area_input],
+                                       {'labels': parsed_dictionary, 'engine': mmu_engine},
+                                       code_signature(__file__))
 
-# Set overwrite option
-arcpy.env.overwriteOutput = True
+# Enforce MMU
+if build_manifest.is_current(revised_output, revised_key) == 0:
+    print(f'Enforcing minimum mapping unit with the {mmu_engine} engine...')
+    iteration_start = time.time()
+    if mmu_engine == 'native':
+        # Label regions in tiles, replace regions below minimum mapping unit, and extract to map domain
+        enforce_mmu(area_input, preliminary_input, revised_output, nodata=nodata,
+                    tile_size=mmu_tile_size, worker_count=mmu_workers, halo=mmu_halo)
+        # Calculate statistics, build attribute table, and build pyramids
+        print('\tBuilding attribute table and pyramids...')
+        postprocess_raster(revised_output, parsed_dictionary)
+    else:
+        # Import arcpy
+        import arcpy
+        from arcpy.sa import Con
+        from arcpy.sa import ExtractByAttributes
+        from arcpy.sa import ExtractByMask
+        from arcpy.sa import Nibble
+        from arcpy.sa import Raster
+        from arcpy.sa import RegionGroup
+        from arcpy.sa import SetNull
 
-# Specify core usage
-arcpy.env.parallelProcessingFactor = '0'
+        # Retrieve attribute code block
+        label_block = get_attribute_code_block()
 
-# Set workspace
-arcpy.env.workspace = work_geodatabase
+        # Set overwrite option
+        arcpy.env.overwriteOutput = True
 
-# Set snap raster and extent
-arcpy.env.snapRaster = area_input
-arcpy.env.extent = Raster(area_input).extent
+        # Specify core usage
+        arcpy.env.parallelProcessingFactor = '0'
 
-# Set output coordinate system
-arcpy.env.outputCoordinateSystem = Raster(area_input)
+        # Set workspace
+        arcpy.env.workspace = work_geodatabase
 
-# Set cell size environment
-cell_size = arcpy.management.GetRasterProperties(area_input, 'CELLSIZEX', '').getOutput(0)
-arcpy.env.cellSize = int(cell_size)
+        # Set snap raster and extent
+        arcpy.env.snapRaster = area_input
+        arcpy.env.extent = Raster(area_input).extent
 
-# Enforce MMU
-print('Enforcing minimum mapping unit...')
-iteration_start = time.time()
-# Calculate regions
-print('\tCalculating contiguous value areas...')
-prelim_raster = Raster(preliminary_input)
-region_initial = RegionGroup(prelim_raster,
-                             'EIGHT',
-                             'WITHIN',
-                             'NO_LINK')
-print('\tExporting region raster...')
-arcpy.management.CopyRaster(region_initial,
-                            region_output,
-                            '',
-                            '',
-                            '-32768',
-                            'NONE',
-                            'NONE',
-                            '32_BIT_SIGNED',
-                            'NONE',
-                            'NONE',
-                            'TIFF',
-                            'NONE',
-                            'CURRENT_SLICE',
-                            'NO_TRANSPOSE')
-arcpy.management.CalculateStatistics(region_output)
-# Create mask
-print('\tCalculating mask...')
-criteria = f'COUNT > 4'
-mask_1 = ExtractByAttributes(region_initial, criteria)
-mask_2 = SetNull((((prelim_raster >= 0) & (prelim_raster <= 7))
-                 | (prelim_raster == 95) | (prelim_raster == 96)
-                 | (prelim_raster == 97) | (prelim_raster == 98)),
-                 mask_1)
-print('\tExporting mask raster...')
-mask_export = Con(mask_2 >= 32767, 32767, mask_2)
-arcpy.management.CopyRaster(mask_export,
-                            mask_output,
-                            '',
-                            '',
-                            '-32768',
-                            'NONE',
-                            'NONE',
-                            '16_BIT_SIGNED',
-                            'NONE',
-                            'NONE',
-                            'TIFF',
-                            'NONE',
-                            'CURRENT_SLICE',
-                            'NO_TRANSPOSE')
-arcpy.management.CalculateStatistics(mask_output)
-# Replace removed data
-print('\tReplacing contiguous areas below minimum mapping unit...')
-nibble_initial = Nibble(prelim_raster,
-                        mask_2,
-                        'DATA_ONLY',
-                        'PROCESS_NODATA')
-# Export nibble raster
-print('\tExporting modified raster...')
-arcpy.management.CopyRaster(nibble_initial,
-                            nibble_output,
-                            '',
-                            '',
-                            '-32768',
-                            'NONE',
-                            'NONE',
-                            '16_BIT_SIGNED',
-                            'NONE',
-                            'NONE',
-                            'TIFF',
-                            'NONE',
-                            'CURRENT_SLICE',
-                            'NO_TRANSPOSE')
-arcpy.management.CalculateStatistics(nibble_output)
-# Add removed data
-print('\tReplacing removed values for linear features...')
-replace_raster = Con(((prelim_raster == 95) | (prelim_raster == 96)
-                      | (prelim_raster == 97) | (prelim_raster == 98)),
-                     prelim_raster, nibble_initial)
-# Extract raster to study area
-print('\tExtracting raster to map domain...')
-extract_raster = ExtractByMask(replace_raster, area_input)
-# Export modified raster
-print('\tExporting modified raster...')
-arcpy.management.CopyRaster(extract_raster,
-                            revised_output,
-                            '',
-                            '',
-                            '-32768',
-                            'NONE',
-                            'NONE',
-                            '16_BIT_SIGNED',
-                            'NONE',
-                            'NONE',
-                            'TIFF',
-                            'NONE',
-                            'CURRENT_SLICE',
-                            'NO_TRANSPOSE')
-arcpy.management.CalculateStatistics(revised_output)
-arcpy.management.BuildRasterAttributeTable(revised_output, 'Overwrite')
-# Calculate attribute label field
-print('\tBuilding attribute table...')
-label_expression = f'get_response(!VALUE!, {parsed_dictionary}, "value")'
-arcpy.management.CalculateField(revised_output,
-                                'label',
-                                label_expression,
-                                'PYTHON3',
-                                label_block)
-# Build pyramids
-print('\tBuilding pyramids...')
-arcpy.management.BuildPyramids(revised_output,
-                               -1,
-                               'NONE',
-                               'NEAREST',
-                               'LZ77',
-                               '',
-                               'OVERWRITE')
-end_timing(iteration_start)
+        # Set output coordinate system
+        arcpy.env.outputCoordinateSystem = Raster(area_input)
+
+        # Set cell size environment
+        cell_size = arcpy.management.GetRasterProperties(area_input, 'CELLSIZEX', '').getOutput(0)
+        arcpy.env.cellSize = int(cell_size)
+
+        # Calculate regions
+        print('\tCalculating contiguous value areas...')
+        prelim_raster = Raster(preliminary_input)
+        region_initial = RegionGroup(prelim_raster,
+                                     'EIGHT',
+                                     'WITHIN',
+                                     'NO_LINK')
+        print('\tExporting region raster...')
+        arcpy.management.CopyRaster(region_initial,
+                                    region_output,
+                                    '',
+                                    '',
+                                    '-32768',
+                                    'NONE',
+                                    'NONE',
+                                    '32_BIT_SIGNED',
+                                    'NONE',
+                                    'NONE',
+                                    'TIFF',
+                                    'NONE',
+                                    'CURRENT_SLICE',
+                                    'NO_TRANSPOSE')
+        arcpy.management.CalculateStatistics(region_output)
+        # Create mask
+        print('\tCalculating mask...')
+        criteria = f'COUNT > 4'
+        mask_1 = ExtractByAttributes(region_initial, criteria)
+        mask_2 = SetNull((((prelim_raster >= 0) & (prelim_raster <= 7))
+                         | (prelim_raster == 95) | (prelim_raster == 96)
+                         | (prelim_raster == 97) | (prelim_raster == 98)),
+                         mask_1)
+        print('\tExporting mask raster...')
+        mask_export = Con(mask_2 >= 32767, 32767, mask_2)
+        arcpy.management.CopyRaster(mask_export,
+                                    mask_output,
+                                    '',
+                                    '',
+                                    '-32768',
+                                    'NONE',
+                                    'NONE',
+                                    '16_BIT_SIGNED',
+                                    'NONE',
+                                    'NONE',
+                                    'TIFF',
+                                    'NONE',
+                                    'CURRENT_SLICE',
+                                    'NO_TRANSPOSE')
+        arcpy.management.CalculateStatistics(mask_output)
+        # Replace removed data
+        print('\tReplacing contiguous areas below minimum mapping unit...')
+        nibble_initial = Nibble(prelim_raster,
+                                mask_2,
+                                'DATA_ONLY',
+                                'PROCESS_NODATA')
+        # Export nibble raster
+        print('\tExporting modified raster...')
+        arcpy.management.CopyRaster(nibble_initial,
+                                    nibble_output,
+                                    '',
+                                    '',
+                                    '-32768',
+                                    'NONE',
+                                    'NONE',
+                                    '16_BIT_SIGNED',
+                                    'NONE',
+                                    'NONE',
+                                    'TIFF',
+                                    'NONE',
+                                    'CURRENT_SLICE',
+                                    'NO_TRANSPOSE')
+        arcpy.management.CalculateStatistics(nibble_output)
+        # Add removed data
+        print('\tReplacing removed values for linear features...')
+        replace_raster = Con(((prelim_raster == 95) | (prelim_raster == 96)
+                              | (prelim_raster == 97) | (prelim_raster == 98)),
+                             prelim_raster, nibble_initial)
+        # Extract raster to study area
+        print('\tExtracting raster to map domain...')
+        extract_raster = ExtractByMask(replace_raster, area_input)
+        # Export modified raster
+        print('\tExporting modified raster...')
+        arcpy.management.CopyRaster(extract_raster,
+                                    revised_output,
+                                    '',
+                                    '',
+                                    '-32768',
+                                    'NONE',
+                                    'NONE',
+                                    '16_BIT_SIGNED',
+                                    'NONE',
+                                    'NONE',
+                                    'TIFF',
+                                    'NONE',
+                                    'CURRENT_SLICE',
+                                    'NO_TRANSPOSE')
+        arcpy.management.CalculateStatistics(revised_output)
+        arcpy.management.BuildRasterAttributeTable(revised_output, 'Overwrite')
+        # Calculate attribute label field
+        print('\tBuilding attribute table...')
+        label_expression = f'get_response(!VALUE!, {parsed_dictionary}, "value")'
+        arcpy.management.CalculateField(revised_output,
+                                        'label',
+                                        label_expression,
+                                        'PYTHON3',
+                                        label_block)
+        # Build pyramids
+        print('\tBuilding pyramids...')
+        arcpy.management.BuildPyramids(revised_output,
+                                       -1,
+                                       'NONE',
+                                       'NEAREST',
+                                       'LZ77',
+                                       '',
+                                       'OVERWRITE')
+    build_manifest.record(revised_output, revised_key)
+    end_timing(iteration_start)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Benchmark pipeline
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+. The preparation and streaming stages require the GDAL Python bindings and the minimum mapping unit stage requires SciPy.
+# Description: "Benchmark pipeline" runs the stages of the site stratification on synthetic inputs, reports the wall time, throughput, peak memory, and bytes read and written of each stage, verifies that the key engines parse identical types, and compares the timings to a baseline report to catch performance regressions.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import json
+import os
+import tempfile
+from stratification_utils.pipeline_benchmark import benchmark_pipeline
+from stratification_utils.pipeline_benchmark import compare_benchmark
+
+# Set size of the synthetic map domain in cells and seed
+grid_width = 4096
+grid_height = 4096
+synthetic_seed = 0
+
+# Set number of worker threads of each stage
+worker_count = max(1, os.cpu_count() - 2)
+
+# Set approximate edge length of processing blocks in cells
+block_size = 512
+
+# Set implementations of the programmatic key to compare; the first engine is the reference for the others
+key_engines = ['rules', 'numba', 'reference']
+
+# Set edge length of the tiles of the minimum mapping unit in cells
+mmu_tile_size = 2048
+
+# Set allowed increase in wall time relative to the baseline as a share of the baseline time
+regression_tolerance = 0.25
+
+# Define folder structure
+benchmark_folder = os.path.join(tempfile.gettempdir(), 'stratification_benchmark')
+
+# Define output files
+report_output = os.path.join(benchmark_folder, 'benchmark_report.json')
+
+# Define baseline report from an earlier run with the same settings or None
+baseline_input = None
+
+# Read the baseline before the report can replace it
+baseline = None
+if baseline_input is not None:
+    with open(baseline_input, 'r') as baseline_stream:
+        baseline = json.load(baseline_stream)
+
+# Run the benchmark
+print(f'Benchmarking pipeline on a synthetic {grid_width} x {grid_height} grid using {worker_count} worker threads...')
+report = benchmark_pipeline(benchmark_folder, grid_width, grid_height, seed=synthetic_seed, block_size=block_size,
+                            worker_count=worker_count, key_engines=key_engines, mmu_tile_size=mmu_tile_size)
+with open(report_output, 'w') as report_stream:
+    json.dump(report, report_stream, indent=2)
+
+# Report the measurements of each stage
+print(f'\t{"stage":<28} {"seconds":>9} {"Mcells/s":>9} {"peak MB":>9} {"read MB":>9} {"written MB":>10}')
+for measurement in report['stages']:
+    values = [measurement['seconds'], measurement['cells_per_second'], measurement['peak_rss_mb'],
+              measurement['read_mb'], measurement['write_mb']]
+    if values[1] is not None:
+        values[1] = values[1] / 1e6
+    columns = [f'{value:>9.2f}' if value is not None else f'{"n/a":>9}' for value in values]
+    print(f'\t{measurement["stage"]:<28} {" ".join(columns[:4])} {columns[4]:>10}')
+for stage in report['skipped']:
+    print(f'\tSkipped {stage}')
+print(f'\tWrote report to {report_output}.')
+
+# Report parsed cells that differ from the first key engine
+# Warping while streaming resamples in other chunks than the warped views, so the streamed types are only reported
+for label, difference_count in report['differences'].items():
+    print(f'\t{label}: {difference_count} cells differ from {key_engines[0]}')
+mismatch_list = [label for label, difference_count in report['differences'].items()
+                 if difference_count > 0 and label != 'stream']
+
+# Compare timings to the baseline
+regression_list = []
+if baseline is not None:
+    if baseline['settings'] != report['settings']:
+        print('\tBaseline was measured with other settings; timings are not compared.')
+    else:
+        regression_list = compare_benchmark(report, baseline, regression_tolerance)
+        for regression in regression_list:
+            print(f'\t{regression["stage"]} slowed from {regression["baseline_seconds"]:.2f} to '
+                  f'{regression["seconds"]:.2f} seconds')
+
+# Fail on engine mismatches or regressions
+if len(mismatch_list) > 0:
+    raise RuntimeError(f'Parsed types differ from {key_engines[0]} for {", ".join(mismatch_list)}.')
+if len(regression_list) > 0:
+    raise RuntimeError(f'{len(regression_list)} stages are more than {100 * regression_tolerance:.0f}% slower '
+                       f'than the baseline.')
+print('Benchmark finished.')
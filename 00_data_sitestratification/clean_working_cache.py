@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Clean working cache
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Clean working cache" reports the size of the uncompressed working cache and removes the least recently used entries until the cache fits within a size budget.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import os
+from stratification_utils import cache_size
+from stratification_utils import clean_cache
+
+# Set size budget for the working cache in gigabytes (0 removes all entries)
+cache_budget = 0
+
+# Set root directory
+drive = 'D:/'
+root_folder = 'ACCS_Work'
+
+# Define folder structure
+project_folder = os.path.join(drive, root_folder, 'Projects/VegetationEcology/AKVEG_EVT_YukonFlats/Data')
+cache_folder = os.path.join(project_folder, 'Data_Input/working_cache')
+
+# Report cache size
+total_bytes, entry_list = cache_size(cache_folder)
+print(f'Working cache holds {len(entry_list)} entries in {total_bytes / 1024 ** 3:.2f} GB.')
+for entry in entry_list:
+    print(f'\t{entry["name"]}: {entry["bytes"] / 1024 ** 3:.2f} GB')
+
+# Remove least recently used entries
+removed_list = clean_cache(cache_folder, int(cache_budget * 1024 ** 3))
+for entry_name in removed_list:
+    print(f'\tRemoved {entry_name}')
+total_bytes, entry_list = cache_size(cache_folder)
+print(f'Working cache now holds {len(entry_list)} entries in {total_bytes / 1024 ** 3:.2f} GB.')
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Initialization for stratification utilities
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: This initialization file imports modules in the package so that the contents are accessible. Modules that require the GDAL Python bindings (warp_scheduler, raster_attributes, streaming_pipeline) or SciPy (minimum_mapping_unit, tiled_regions, tiled_nibble, enforce_mmu) are imported directly from the module so that the other stages do not depend on them.
+# ---------------------------------------------------------------------------
+
+# Import functions from modules
+from stratification_utils.build_manifest import BuildManifest
+from stratification_utils.build_manifest import code_signature
+from stratification_utils.build_manifest import file_signature
+from stratification_utils.class_histogram import ClassHistogram
+from stratification_utils.class_histogram import raster_histogram
+from stratification_utils.class_histogram import read_histogram
+from stratification_utils.class_histogram import write_histogram
+from stratification_utils.cover_storage import cover_storage_type
+from stratification_utils.cover_storage import cover_storage_types
+from stratification_utils.cover_storage import widen_cover
+from stratification_utils.derived_indices import derived_registry
+from stratification_utils.derived_indices import derived_dependencies
+from stratification_utils.derived_indices import compile_derived_kernel
+from stratification_utils.derived_indices import compile_derived_blocks
+from stratification_utils.derived_indices import derived_source_layers
+from stratification_utils.input_cube import build_input_cube
+from stratification_utils.input_cube import cube_band_dictionary
+from stratification_utils.input_cube import cube_companion_file
+from stratification_utils.input_cube import cube_companions
+from stratification_utils.input_cube import stale_cube_layers
+from stratification_utils.processing_windows import build_coverage_index
+from stratification_utils.processing_windows import domain_coverage
+from stratification_utils.processing_windows import grid_windows
+from stratification_utils.processing_windows import nodata_block
+from stratification_utils.processing_windows import split_domain_windows
+from stratification_utils.processing_windows import tile_windows
+from stratification_utils.warped_views import WarpedView
+from stratification_utils.warped_views import is_warped_view
+from stratification_utils.warped_views import open_layer_raster
+from stratification_utils.warped_views import warped_view_file
+from stratification_utils.warped_views import write_warped_view
+from stratification_utils.working_cache import CachedRaster
+from stratification_utils.working_cache import CachedRasterWriter
+from stratification_utils.working_cache import cache_entry_name
+from stratification_utils.working_cache import cache_raster
+from stratification_utils.working_cache import cache_size
+from stratification_utils.working_cache import clean_cache
+from stratification_utils.working_cache import export_cached_raster
+from stratification_utils.working_cache import open_cached_raster
+from stratification_utils.working_cache import read_cache_header
+from stratification_utils.layer_sources import LayerSource
+from stratification_utils.calculate_derived_rasters import calculate_derived_rasters
+from stratification_utils.foliar_key import foliar_key_layers
+from stratification_utils.foliar_key import parse_foliar_key
+from stratification_utils.parallel_blocks import ThreadLocalHandles
+from stratification_utils.parallel_blocks import map_blocks
+from stratification_utils.foliar_key_rules import KeyRule
+from stratification_utils.foliar_key_rules import foliar_key_overrides
+from stratification_utils.foliar_key_rules import foliar_key_rules
+from stratification_utils.foliar_key_rules import parse_foliar_rules
+from stratification_utils.key_profile import RuleProfile
+from stratification_utils.foliar_key_numba import numba_available
+from stratification_utils.foliar_key_numba import parse_foliar_numba
+from stratification_utils.foliar_key_engines import foliar_key_engines
+from stratification_utils.foliar_key_engines import select_key_engine
+from stratification_utils.foliar_key_engines import synthetic_key_blocks
+from stratification_utils.foliar_key_engines import verify_key_engines
+from stratification_utils.parse_foliar_cover import parse_foliar_cover
+from stratification_utils.key_tuning import compare_key_sample
+from stratification_utils.key_tuning import draw_key_sample
+from stratification_utils.key_tuning import evaluate_key_sample
+from stratification_utils.key_tuning import load_key_sample
+from stratification_utils.key_verification import compare_key_engines
+from stratification_utils.key_verification import confusion_rows
+from stratification_utils.key_verification import write_key_comparison
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Build manifest
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Build manifest" records a key for each output that summarizes its inputs, processing parameters, and code so that stages only rebuild outputs whose key changed.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import ast
+import hashlib
+import json
+import os
+import time
+
+
+# Define a function to hash a file
+def file_checksum(file_path, chunk_size=16 * 1024 * 1024):
+    """
+    Description: calculates the SHA-256 checksum of a file in chunks
+    Inputs: 'file_path' -- a file path
+            'chunk_size' -- the number of bytes read per chunk
+    Returned Value: Returns the hexadecimal checksum
+    Preconditions: the file must exist
+    """
+
+    checksum = hashlib.sha256()
+    with open(file_path, 'rb') as file_stream:
+        chunk = file_stream.read(chunk_size)
+        while len(chunk) > 0:
+            checksum.update(chunk)
+            chunk = file_stream.read(chunk_size)
+    return checksum.hexdigest()
+
+
+# Define a function to describe a file
+def file_signature(file_path, checksum=False):
+    """
+    Description: summarizes a file by size and modification time or by checksum
+    Inputs: 'file_path' -- a file path
+            'checksum' -- a boolean that selects a content checksum instead of size and modification time
+    Returned Value: Returns a list that describes the file or None if the file does not exist
+    Preconditions: none
+    """
+
+    if os.path.exists(file_path) == 0:
+        return None
+    if checksum:
+        return ['sha256', file_checksum(file_path)]
+    status = os.stat(file_path)
+    return ['stat', status.st_size, status.st_mtime_ns]
+
+
+# Define a function to map the names exported by the package to their modules
+def package_exports(package_folder):
+    """
+    Description: reads the names that the package initialization imports from its modules
+    Inputs: 'package_folder' -- the folder of the stratification utilities package
+    Returned Value: Returns a dictionary of exported names and the modules that define them
+    Preconditions: none
+    """
+
+    package_name = os.path.basename(package_folder)
+    export_dictionary = {}
+    with open(os.path.join(package_folder, '__init__.py'), 'r', encoding='utf-8') as init_stream:
+        for node in ast.walk(ast.parse(init_stream.read())):
+            if isinstance(node, ast.ImportFrom) and (node.module or '').startswith(package_name + '.'):
+                for alias in node.names:
+                    export_dictionary[alias.asname or alias.name] = node.module.split('.')[1]
+    return export_dictionary
+
+
+# Define a function to list the package modules imported by a source file
+def package_imports(source_file, package_folder, export_dictionary):
+    """
+    Description: lists the modules of the stratification utilities package that a source file imports, resolving
+    names imported from the package to the modules that define them
+    Inputs: 'source_file' -- a file path to a Python source file
+            'package_folder' -- the folder of the stratification utilities package
+            'export_dictionary' -- a dictionary of exported names and their modules from package_exports
+    Returned Value: Returns a set of module names within the package
+    Preconditions: imports are read from the source without executing it, including imports inside functions
+    """
+
+    package_name = os.path.basename(package_folder)
+    module_names = set()
+    with open(source_file, 'r', encoding='utf-8') as source_stream:
+        tree = ast.parse(source_stream.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.level == 0 and node.module is not None:
+            if node.module == package_name:
+                for alias in node.names:
+                    if alias.name == '*':
+                        module_names.update(export_dictionary.values())
+                    elif alias.name in export_dictionary:
+                        module_names.add(export_dictionary[alias.name])
+                    elif os.path.exists(os.path.join(package_folder, alias.name + '.py')):
+                        module_names.add(alias.name)
+            elif node.module.startswith(package_name + '.'):
+                module_names.add(node.module.split('.')[1])
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.startswith(package_name + '.'):
+                    module_names.add(alias.name.split('.')[1])
+    return module_names
+
+
+# Define a function to summarize the code of a stage
+def code_signature(script_file):
+    """
+    Description: hashes the source of a stage script and of the package modules that it uses directly or through
+    other package modules
+    Inputs: 'script_file' -- a file path to the stage script, usually __file__
+    Returned Value: Returns the hexadecimal checksum of the source files
+    Preconditions: edits to package modules that the stage does not import, such as other stages or tools, do not
+    change the signature
+    """
+
+    # Collect the package modules reachable from the imports of the script
+    package_folder = os.path.dirname(os.path.abspath(__file__))
+    export_dictionary = package_exports(package_folder)
+    module_names = set()
+    pending_list = [os.path.abspath(script_file)]
+    while len(pending_list) > 0:
+        for module_name in package_imports(pending_list.pop(), package_folder, export_dictionary):
+            if module_name not in module_names:
+                module_names.add(module_name)
+                pending_list.append(os.path.join(package_folder, module_name + '.py'))
+
+    # Hash the script and the modules in a stable order
+    source_list = [os.path.abspath(script_file)] + [os.path.join(package_folder, module_name + '.py')
+                                                    for module_name in sorted(module_names)]
+    checksum = hashlib.sha256()
+    for source_file in source_list:
+        checksum.update(os.path.basename(source_file).encode('utf-8'))
+        with open(source_file, 'rb') as source_stream:
+            checksum.update(source_stream.read())
+    return checksum.hexdigest()
+
+
+# Define a class to track the build keys of outputs
+class BuildManifest:
+    """
+    Description: stores a build key for each output in a JSON file; inputs that were built by an earlier stage are
+    identified by their recorded key and all other inputs by their file signature
+    Inputs: 'manifest_file' -- a file path to the JSON manifest, which is created if it does not exist
+            'checksum' -- a boolean that selects content checksums instead of size and modification time for inputs
+    Preconditions: a manifest must only be updated by one process at a time
+    """
+
+    def __init__(self, manifest_file, checksum=False):
+        self.manifest_file = manifest_file
+        self.checksum = checksum
+        self.entries = {}
+        if os.path.exists(manifest_file):
+            with open(manifest_file, 'r') as manifest_stream:
+                self.entries = json.load(manifest_stream)
+
+    def entry_name(self, output_file, step):
+        return step + ':' + os.path.normcase(os.path.abspath(output_file))
+
+    def input_signature(self, input_file):
+        entry = self.entries.get(self.entry_name(input_file, 'build'))
+        if entry is not None:
+            return ['build', entry['key']]
+        return file_signature(input_file, self.checksum)
+
+    def build_key(self, input_list, parameters, code_key):
+        """
+        Description: combines inputs, parameters, and code into a build key
+        Inputs: 'input_list' -- a list of input file paths
+                'parameters' -- a dictionary of processing parameters that can be serialized to JSON
+                'code_key' -- a code signature from code_signature
+        Returned Value: Returns the hexadecimal build key
+        """
+
+        content = {'inputs': [[os.path.basename(input_file), self.input_signature(input_file)]
+                              for input_file in input_list],
+                   'parameters': parameters,
+                   'code': code_key}
+        content_text = json.dumps(content, sort_keys=True, default=str)
+        return hashlib.sha256(content_text.encode('utf-8')).hexdigest()
+
+    def is_current(self, output_file, build_key, step='build', output_exists=None):
+        """
+        Description: checks whether an output exists and was built with the same key
+        Inputs: 'output_file' -- a file path to the output
+                'build_key' -- the key of the current inputs, parameters, and code
+                'step' -- the name of the processing step that produces the output
+                'output_exists' -- a boolean that overrides the existence check or None to check the output file
+        Returned Value: Returns True if the output does not need to be rebuilt
+        """
+
+        if output_exists is None:
+            output_exists = os.path.exists(output_file)
+        entry = self.entries.get(self.entry_name(output_file, step))
+        return bool(output_exists) and entry is not None and entry['key'] == build_key
+
+    def record(self, output_file, build_key, step='build'):
+        """
+        Description: records the key of an output that was built successfully and saves the manifest
+        Inputs: 'output_file' -- a file path to the output
+                'build_key' -- the key of the inputs, parameters, and code used to build the output
+                'step' -- the name of the processing step that produced the output
+        Returned Value: No return value
+        """
+
+        self.entries[self.entry_name(output_file, step)] = {'key': build_key,
+                                                            'built': time.strftime('%Y-%m-%d %H:%M:%S')}
+        self.save()
+
+    def discard(self, output_file, step='build'):
+        """
+        Description: removes the key of an output that another processing step replaced and saves the manifest
+        Inputs: 'output_file' -- a file path to the output
+                'step' -- the name of the processing step whose key is removed
+        Returned Value: No return value
+        """
+
+        if self.entries.pop(self.entry_name(output_file, step), None) is not None:
+            self.save()
+
+    def save(self):
+        manifest_folder = os.path.dirname(os.path.abspath(self.manifest_file))
+        if os.path.exists(manifest_folder) == 0:
+            os.makedirs(manifest_folder)
+        temporary_file = self.manifest_file + '.tmp'
+        with open(temporary_file, 'w') as manifest_stream:
+            json.dump(self.entries, manifest_stream, indent=2, sort_keys=True)
+        os.replace(temporary_file, self.manifest_file)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Calculate derived rasters
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Calculate derived rasters" is a function that writes a set of derived indices in a single pass through the raster blocks.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import numpy as np
+import rasterio
+from akutils import raster_block_progress
+from stratification_utils.derived_indices import compile_derived_kernel
+from stratification_utils.derived_indices import derived_registry
+from stratification_utils.layer_sources import LayerSource
+from stratification_utils.processing_windows import nodata_block
+from stratification_utils.processing_windows import split_domain_windows
+from stratification_utils.processing_windows import window_offset
+from stratification_utils.warped_views import open_layer_raster
+from stratification_utils.working_cache import CachedRasterWriter
+from stratification_utils.working_cache import cache_entry_name
+
+
+# Define a function to calculate derived rasters
+def calculate_derived_rasters(area_input, input_dictionary, output_dictionary, nodata=-32768,
+                              registry=derived_registry, cube_input=None, cache_folder=None, block_size=None):
+    """
+    Description: calculates derived indices from foliar cover rasters, reading each required input block once
+    Inputs: 'area_input' -- a file path to the map domain raster where the domain has a value of 1
+            'input_dictionary' -- a dictionary of input layer names and raster or warped view file paths
+            'output_dictionary' -- a dictionary of derived index names and output raster file paths
+            'nodata' -- the no data value for the output rasters
+            'registry' -- a dictionary of derived index definitions
+            'cube_input' -- a file path to an input cube that stores some or all of the layers or None
+            'cache_folder' -- a working cache folder through which inputs are read and to which outputs are written
+            instead of GeoTIFF, or None
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+            of the area raster
+    Returned Value: Returns the list of input layer names that were read; writes the output rasters to disk or cache
+    Preconditions: all input rasters must share the grid of the area raster; blocks outside of the map domain are
+    written as no data without reading the inputs, and blocks inside of the map domain are not masked
+    """
+
+    # Compile requested indices and identify the required input layers
+    derived_kernel, layer_names = compile_derived_kernel(list(output_dictionary.keys()), registry)
+    missing_layers = [name for name in layer_names if name not in input_dictionary]
+    if len(missing_layers) > 0:
+        raise KeyError(f'Input rasters are not defined for {", ".join(missing_layers)}.')
+
+    # Look up the processing windows and their coverage of the map domain
+    window_list, empty_list, full_offsets = split_domain_windows(area_input, block_size)
+
+    # Open only the layers required by the requested indices
+    source_dictionary = {'area': area_input}
+    source_dictionary.update(input_dictionary)
+    layer_source = LayerSource(source_dictionary, ['area'] + layer_names, cube_input, cache_folder)
+    with open_layer_raster(input_dictionary[layer_names[0]]) as template_raster:
+        input_profile = template_raster.profile.copy()
+
+    # Open an output raster for each requested index
+    output_rasters = {}
+    try:
+        for name, output_file in output_dictionary.items():
+            output_profile = input_profile.copy()
+            output_profile.update(dtype=registry[name]['dtype'], nodata=nodata)
+            if cache_folder is None:
+                output_rasters[name] = rasterio.open(output_file, 'w', **output_profile, BIGTIFF='YES')
+            else:
+                output_rasters[name] = CachedRasterWriter(cache_folder, cache_entry_name(output_file),
+                                                          output_profile, output_file)
+        # Write no data to the blocks outside of the map domain
+        for window in empty_list:
+            for name, output_raster in output_rasters.items():
+                output_raster.write(nodata_block(window, nodata, registry[name]['dtype']), window=window)
+        # Iterate processing through raster blocks in the map domain
+        count = 1
+        progress = 0
+        for window in window_list:
+            # Read each input block once, skipping the area block of windows inside of the map domain
+            full_window = window_offset(window) in full_offsets
+            input_blocks = layer_source.read(window, skip_names=('area',) if full_window else ())
+            # Evaluate all derived indices on the shared blocks
+            derived_blocks = derived_kernel(input_blocks)
+            # Set no data values from area raster to no data and write results
+            for name, output_raster in output_rasters.items():
+                if full_window:
+                    raster_block = derived_blocks[name]
+                else:
+                    raster_block = np.where(input_blocks['area'] != 1, nodata, derived_blocks[name])
+                output_raster.write(raster_block, window=window)
+            # Report progress
+            count, progress = raster_block_progress(10, len(window_list), count, progress)
+    finally:
+        for output_raster in output_rasters.values():
+            output_raster.close()
+        layer_source.close()
+
+    return layer_names
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Class histogram
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Class histogram" accumulates cell counts per type while a raster is written and stores them with the band statistics in a sidecar so that post-processing does not read the raster again.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import json
+import os
+import numpy as np
+import rasterio
+from stratification_utils.build_manifest import file_signature
+
+
+# Define a class to accumulate a class histogram
+class ClassHistogram:
+    """
+    Description: accumulates cell counts per value of an integer raster block by block
+    Inputs: 'nodata' -- the no data value, which is not counted
+    Preconditions: blocks of 8 and 16 bit types are counted with a bincount over the value range of the block; wider
+    types are counted by their unique values
+    """
+
+    def __init__(self, nodata=-32768):
+        self.nodata = nodata
+        self.bin_counts = None
+        self.bin_offset = 0
+        self.value_counts = {}
+
+    def update(self, block):
+        block = np.asarray(block)
+        if self.nodata is not None:
+            block = block[block != self.nodata]
+        else:
+            block = block.ravel()
+        if block.size == 0:
+            return
+        if block.dtype.itemsize <= 2:
+            # Count values in bins offset by the smallest value of the type
+            if self.bin_counts is None:
+                type_info = np.iinfo(block.dtype)
+                self.bin_counts = np.zeros(int(type_info.max) - int(type_info.min) + 1, dtype='int64')
+                self.bin_offset = int(type_info.min)
+            block_minimum = int(block.min())
+            block_counts = np.bincount(block.astype('int32') - block_minimum)
+            start = block_minimum - self.bin_offset
+            self.bin_counts[start:start + len(block_counts)] += block_counts
+        else:
+            values, counts = np.unique(block, return_counts=True)
+            for value, count in zip(values.tolist(), counts.tolist()):
+                self.value_counts[value] = self.value_counts.get(value, 0) + count
+
+    def counts(self):
+        # Return sorted arrays of the values that occur and their cell counts
+        value_counts = dict(self.value_counts)
+        if self.bin_counts is not None:
+            present = np.flatnonzero(self.bin_counts)
+            for value, count in zip((present + self.bin_offset).tolist(), self.bin_counts[present].tolist()):
+                value_counts[value] = value_counts.get(value, 0) + count
+        values = np.array(sorted(value_counts), dtype='int64')
+        counts = np.array([value_counts[value] for value in values.tolist()], dtype='int64')
+        return values, counts
+
+    def statistics(self):
+        # Return the minimum, maximum, mean, standard deviation, and number of counted cells
+        values, counts = self.counts()
+        total = int(counts.sum())
+        if total == 0:
+            return None
+        mean = float(np.dot(values, counts) / total)
+        deviation = float(np.sqrt(np.dot((values - mean) ** 2, counts) / total))
+        return {'minimum': float(values[0]),
+                'maximum': float(values[-1]),
+                'mean': mean,
+                'std': deviation,
+                'count': total}
+
+    def statistics_tags(self, cell_count):
+        # Return the band statistics as GDAL metadata items
+        statistics = self.statistics()
+        if statistics is None:
+            return {}
+        return {'STATISTICS_MINIMUM': statistics['minimum'],
+                'STATISTICS_MAXIMUM': statistics['maximum'],
+                'STATISTICS_MEAN': statistics['mean'],
+                'STATISTICS_STDDEV': statistics['std'],
+                'STATISTICS_VALID_PERCENT': 100 * statistics['count'] / cell_count}
+
+
+# Define a function to calculate the class histogram of a raster
+def raster_histogram(raster_path):
+    """
+    Description: calculates the class histogram of a raster in one pass over its blocks
+    Inputs: 'raster_path' -- a file path to a single-band integer raster
+    Returned Value: Returns a ClassHistogram
+    Preconditions: cells equal to the no data value of the raster are not counted
+    """
+
+    with rasterio.open(raster_path) as input_raster:
+        histogram = ClassHistogram(input_raster.nodata)
+        for block_index, window in input_raster.block_windows(1):
+            histogram.update(input_raster.read(1, window=window, masked=False))
+    return histogram
+
+
+# Define a function to name the histogram sidecar of a raster
+def histogram_sidecar(raster_path):
+    """
+    Description: derives the file path of the histogram sidecar of a raster
+    Inputs: 'raster_path' -- a file path to a raster
+    Returned Value: Returns the file path of the sidecar
+    Preconditions: none
+    """
+
+    return os.path.splitext(raster_path)[0] + '_histogram.json'
+
+
+# Define a function to write the histogram sidecar of a raster
+def write_histogram(histogram, raster_path):
+    """
+    Description: writes the class histogram and statistics of a raster to its sidecar with the signature of the raster
+    Inputs: 'histogram' -- a ClassHistogram of the raster
+            'raster_path' -- a file path to the raster, which must be closed
+    Returned Value: No return value; writes the sidecar to disk
+    Preconditions: the sidecar is only valid while the raster is unchanged
+    """
+
+    values, counts = histogram.counts()
+    sidecar = {'raster_signature': file_signature(raster_path),
+               'nodata': histogram.nodata,
+               'values': values.tolist(),
+               'counts': counts.tolist(),
+               'statistics': histogram.statistics()}
+    with open(histogram_sidecar(raster_path), 'w') as sidecar_stream:
+        json.dump(sidecar, sidecar_stream, indent=2)
+
+
+# Define a function to read the histogram sidecar of a raster
+def read_histogram(raster_path):
+    """
+    Description: reads the class histogram of a raster from its sidecar
+    Inputs: 'raster_path' -- a file path to the raster
+    Returned Value: Returns a ClassHistogram or None if the sidecar does not exist or the raster changed after it was
+    written
+    Preconditions: none
+    """
+
+    sidecar_file = histogram_sidecar(raster_path)
+    if os.path.exists(sidecar_file) == 0:
+        return None
+    with open(sidecar_file, 'r') as sidecar_stream:
+        sidecar = json.load(sidecar_stream)
+    if sidecar['raster_signature'] != file_signature(raster_path):
+        return None
+    histogram = ClassHistogram(sidecar['nodata'])
+    histogram.value_counts = dict(zip(sidecar['values'], sidecar['counts']))
+    return histogram
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Cover storage
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Cover storage" defines the data types in which percent cover layers may be stored and widens compact cover blocks before arithmetic so that sums and integer cross-multiplications do not overflow.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import numpy as np
+
+# Define storage types of percent cover layers
+# Percent cover values range from 0 to 100, so they may be stored as uint8 with 255 as no data at half the size of
+# int16. Each entry lists the NumPy data type and the no data value.
+cover_storage_types = {'int16': ('int16', -32768),
+                       'uint8': ('uint8', 255)}
+
+
+# Define a function to look up the storage type of percent cover layers
+def cover_storage_type(cover_storage):
+    """
+    Description: looks up the data type and no data value of a storage type for percent cover layers
+    Inputs: 'cover_storage' -- a storage type from cover_storage_types
+    Returned Value: Returns a tuple of the NumPy data type name and the no data value
+    Preconditions: none
+    """
+
+    if cover_storage not in cover_storage_types:
+        raise ValueError(f'Cover storage must be one of {", ".join(cover_storage_types.keys())}.')
+    return cover_storage_types[cover_storage]
+
+
+# Define a function to widen a compact cover block
+def widen_cover(block):
+    """
+    Description: converts a block of an unsigned 8 bit type to int16 and returns blocks of other types unchanged
+    Inputs: 'block' -- an array of layer values
+    Returned Value: Returns an array that sums of several layers and small integer multiples do not overflow
+    Preconditions: the conversion copies the block, so it should be applied after the block is restricted to the
+    pixels that are evaluated
+    """
+
+    if block.dtype == np.uint8:
+        return block.astype('int16')
+    return block
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Derived indices
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Derived indices" defines the registry of metrics derived from the foliar cover maps and compiles requested metrics into a single block kernel.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import numpy as np
+from stratification_utils.cover_storage import widen_cover
+
+# Define registry of derived indices
+# Each entry lists the input layers, a NumPy expression of those layers, and the output data type. Inputs may be
+# foliar cover layers or other derived indices. Ratios are evaluated in float32, which truncates to the same integers
+# as float64 for every combination of cover values from 0 to 100.
+derived_registry = {'picratio': {'inputs': ['picgla', 'picmar'],
+                                 'expression': '(picgla / (picgla + picmar + np.float32(0.01))) * np.float32(100)',
+                                 'dtype': 'int16'},
+                    'picsum': {'inputs': ['picgla', 'picmar'],
+                               'expression': 'picgla + picmar',
+                               'dtype': 'int16'},
+                    'decratio': {'inputs': ['picgla', 'picmar', 'brotre'],
+                                 'expression': '(brotre / (picgla + picmar + brotre + np.float32(0.01))) * np.float32(100)',
+                                 'dtype': 'int16'},
+                    'ndshrub': {'inputs': ['alnus', 'ndsalix', 'betshr'],
+                                'expression': 'alnus + ndsalix + betshr',
+                                'dtype': 'int16'},
+                    'eridwarf': {'inputs': ['nerishr', 'rhoshr', 'vacvit'],
+                                 'expression': 'nerishr + rhoshr + vacvit',
+                                 'dtype': 'int16'},
+                    'wetland': {'inputs': ['sphagn', 'wetsed'],
+                                'expression': 'sphagn + wetsed',
+                                'dtype': 'int16'},
+                    'picwet': {'inputs': ['erivag', 'sphagn', 'wetsed'],
+                               'expression': 'erivag + sphagn + wetsed',
+                               'dtype': 'int16'},
+                    'herbaceous': {'inputs': ['forb', 'gramin', 'erivag', 'wetsed'],
+                                   'expression': 'np.maximum((forb + gramin) - (erivag + wetsed), 0)',
+                                   'dtype': 'int16'}}
+
+
+# Define a function to resolve the dependency closure of derived indices
+def derived_dependencies(index_names, registry=derived_registry):
+    """
+    Description: resolves the derived indices and input layers required to calculate a set of derived indices
+    Inputs: 'index_names' -- a list of derived index names from the registry
+            'registry' -- a dictionary of derived index definitions
+    Returned Value: Returns a tuple of the derived index names in evaluation order and the sorted list of input layer names
+    Preconditions: index definitions must not contain circular references
+    """
+
+    # Create empty lists
+    evaluation_order = []
+    layer_names = set()
+    visiting = set()
+
+    # Define recursive visit that places dependencies before dependents
+    def visit(name):
+        if name in evaluation_order:
+            return
+        if name in visiting:
+            raise ValueError(f'Derived index "{name}" has a circular definition.')
+        visiting.add(name)
+        for input_name in registry[name]['inputs']:
+            if input_name in registry:
+                visit(input_name)
+            else:
+                layer_names.add(input_name)
+        visiting.remove(name)
+        evaluation_order.append(name)
+
+    # Visit each requested index
+    for index_name in index_names:
+        if index_name not in registry:
+            raise KeyError(f'Derived index "{index_name}" is not defined in the registry.')
+        visit(index_name)
+
+    return evaluation_order, sorted(layer_names)
+
+
+# Define a function to compile derived indices into a block kernel
+def compile_derived_kernel(index_names, registry=derived_registry):
+    """
+    Description: compiles the expressions for a set of derived indices into a single function evaluated per block
+    Inputs: 'index_names' -- a list of derived index names from the registry
+            'registry' -- a dictionary of derived index definitions
+    Returned Value: Returns a tuple of the kernel function and the list of input layer names that it reads
+    Preconditions: the kernel must be called with a dictionary of blocks keyed by input layer name; uint8 cover blocks
+    are widened to int16 before evaluation
+    """
+
+    # Resolve dependencies
+    evaluation_order, layer_names = derived_dependencies(index_names, registry)
+
+    # Compile each expression once
+    compiled_list = []
+    for name in evaluation_order:
+        definition = registry[name]
+        code = compile(definition['expression'], f'<derived index {name}>', 'eval')
+        compiled_list.append((name, code, np.dtype(definition['dtype'])))
+
+    # Define kernel that evaluates all expressions on a shared block namespace
+    def derived_kernel(blocks):
+        namespace = {name: widen_cover(block) for name, block in blocks.items()}
+        for name, code, dtype in compiled_list:
+            namespace[name] = eval(code, {'np': np}, namespace).astype(dtype, copy=False)
+        return {name: namespace[name] for name in index_names}
+
+    return derived_kernel, layer_names
+
+
+# Define a class that evaluates derived indices on first access
+class DerivedBlocks:
+    """
+    Description: provides the layer blocks of a window and evaluates each derived index from them when it is first
+    requested, keeping the result for the rest of the window
+    Inputs: 'blocks' -- a mapping of layer names and block arrays read for the window
+            'compiled_dictionary' -- a dictionary of derived index names and tuples of input names, compiled
+            expression, and data type
+    Preconditions: a DerivedBlocks object holds the blocks of one window and must only be used by one thread
+    """
+
+    def __init__(self, blocks, compiled_dictionary):
+        self.blocks = blocks
+        self.compiled_dictionary = compiled_dictionary
+        self.cache = {}
+
+    def __getitem__(self, name):
+        if name not in self.compiled_dictionary:
+            return self.blocks[name]
+        if name not in self.cache:
+            input_names, code, dtype = self.compiled_dictionary[name]
+            namespace = {input_name: widen_cover(self[input_name]) for input_name in input_names}
+            self.cache[name] = eval(code, {'np': np}, namespace).astype(dtype, copy=False)
+        return self.cache[name]
+
+    def __contains__(self, name):
+        return name in self.compiled_dictionary or name in self.blocks
+
+
+# Define a function to compile derived indices for evaluation on first access
+def compile_derived_blocks(index_names, registry=derived_registry):
+    """
+    Description: compiles the expressions for a set of derived indices into a function that wraps the blocks of a
+    window so that each index is evaluated only when it is first requested
+    Inputs: 'index_names' -- a list of derived index names from the registry
+            'registry' -- a dictionary of derived index definitions
+    Returned Value: Returns a tuple of the wrapping function and the list of input layer names that it reads
+    Preconditions: the values of the indices are identical to the values written by compile_derived_kernel
+    """
+
+    # Resolve dependencies and compile each expression once
+    evaluation_order, layer_names = derived_dependencies(index_names, registry)
+    compiled_dictionary = {}
+    for name in evaluation_order:
+        definition = registry[name]
+        code = compile(definition['expression'], f'<derived index {name}>', 'eval')
+        compiled_dictionary[name] = (definition['inputs'], code, np.dtype(definition['dtype']))
+
+    # Define the function that wraps the blocks of a window
+    def derived_blocks(blocks):
+        return DerivedBlocks(blocks, compiled_dictionary)
+
+    return derived_blocks, layer_names
+
+
+# Define a function to list the layers read when derived indices are calculated from their inputs
+def derived_source_layers(layer_names, derived_names, registry=derived_registry):
+    """
+    Description: replaces the derived indices in a list of layers by the input layers they are calculated from
+    Inputs: 'layer_names' -- a list of layer names that a stage uses
+            'derived_names' -- a list of derived index names that are calculated instead of read
+            'registry' -- a dictionary of derived index definitions
+    Returned Value: Returns the list of layer names that must be read, in the order of the layer list followed by
+    the added input layers
+    Preconditions: none
+    """
+
+    evaluation_order, input_names = derived_dependencies(derived_names, registry)
+    source_names = [name for name in layer_names if name not in evaluation_order]
+    source_names += [name for name in input_names if name not in source_names]
+    return source_names
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Enforce minimum mapping unit
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Enforce minimum mapping unit" is a function that removes regions below the minimum mapping unit from a raster of types and writes the revised raster, either in memory or tile by tile.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import tempfile
+import rasterio
+from stratification_utils.minimum_mapping_unit import enforce_mmu_array
+from stratification_utils.minimum_mapping_unit import mmu_excluded_values
+from stratification_utils.minimum_mapping_unit import mmu_minimum_count
+from stratification_utils.minimum_mapping_unit import mmu_restored_values
+from stratification_utils.minimum_mapping_unit import restore_extract_array
+from stratification_utils.parallel_blocks import ThreadLocalHandles
+from stratification_utils.parallel_blocks import map_blocks
+from stratification_utils.processing_windows import tile_windows
+from stratification_utils.tiled_nibble import nibble_tile
+from stratification_utils.tiled_regions import retained_region_blocks
+from stratification_utils.working_cache import CachedRaster
+from stratification_utils.working_cache import CachedRasterWriter
+from stratification_utils.working_cache import cache_entry_name
+
+
+# Define a function to enforce the minimum mapping unit on a raster
+def enforce_mmu(area_input, class_input, output_file, nodata=-32768, minimum_count=mmu_minimum_count,
+                tile_size=None, worker_count=1, halo=32, cache_folder=None):
+    """
+    Description: enforces the minimum mapping unit on a raster of types and writes the revised raster
+    Inputs: 'area_input' -- a file path to the map domain raster where the domain has a value of 1
+            'class_input' -- a file path to the raster of types
+            'output_file' -- a file path for the revised output raster
+            'nodata' -- the no data value for the output raster
+            'minimum_count' -- the smallest number of cells in a retained region
+            'tile_size' -- the edge length of the tiles in which regions are labeled and replaced or None to process
+            the full raster in memory
+            'worker_count' -- the number of worker threads that process tiles
+            'halo' -- the number of cells searched around a tile for the nearest retained cell before the search is
+            expanded
+            'cache_folder' -- a folder for the memory-mapped retained flags or None to use a temporary folder
+    Returned Value: No return value; writes the revised raster to disk
+    Preconditions: the rasters must share a grid; with a tile size, memory is bounded by the tiles in flight and their
+    halos plus the edge labels of all tiles
+    """
+
+    if tile_size is None:
+        # Read the map domain and types
+        with rasterio.open(area_input) as area_raster:
+            area_array = area_raster.read(1, masked=False)
+        with rasterio.open(class_input) as class_raster:
+            output_profile = class_raster.profile.copy()
+            class_array = class_raster.read(1, masked=False)
+
+        # Replace removed cells, restore linear features, and extract to the map domain
+        revised_array = enforce_mmu_array(class_array, area_array, nodata, minimum_count)
+
+        # Write revised types
+        output_profile.update(dtype='int16', nodata=nodata, compress='lzw')
+        with rasterio.open(output_file, 'w', **output_profile, BIGTIFF='YES') as dst:
+            dst.write(revised_array, 1)
+    elif cache_folder is None:
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            enforce_mmu_tiles(area_input, class_input, output_file, nodata, minimum_count,
+                              tile_size, worker_count, halo, temporary_folder)
+    else:
+        enforce_mmu_tiles(area_input, class_input, output_file, nodata, minimum_count,
+                          tile_size, worker_count, halo, cache_folder)
+
+
+# Define a function to enforce the minimum mapping unit tile by tile
+def enforce_mmu_tiles(area_input, class_input, output_file, nodata, minimum_count, tile_size, worker_count, halo,
+                      cache_folder):
+    """
+    Description: flags retained regions tile by tile into a memory-mapped cache entry, then replaces, restores, and
+    extracts each tile with a halo search and writes the revised raster
+    Inputs: 'area_input' -- a file path to the map domain raster where the domain has a value of 1
+            'class_input' -- a file path to the raster of types
+            'output_file' -- a file path for the revised output raster
+            'nodata' -- the no data value for the output raster
+            'minimum_count' -- the smallest number of cells in a retained region
+            'tile_size' -- the edge length of the tiles in cells
+            'worker_count' -- the number of worker threads that process tiles
+            'halo' -- the number of cells searched around a tile before the search is expanded
+            'cache_folder' -- a folder for the memory-mapped retained flags
+    Returned Value: No return value; writes the revised raster to disk
+    Preconditions: the rasters must share a grid; the retained entry is overwritten on every run
+    """
+
+    # Define tile grid
+    with rasterio.open(class_input) as class_raster:
+        output_profile = class_raster.profile.copy()
+        width = class_raster.width
+        height = class_raster.height
+    window_list = tile_windows(width, height, tile_size)
+
+    # Flag cells of regions that meet the minimum mapping unit tile by tile
+    retained_entry = cache_entry_name(output_file) + '_retained'
+    retained_profile = output_profile.copy()
+    retained_profile.update(dtype='uint8', nodata=None)
+    with CachedRasterWriter(cache_folder, retained_entry, retained_profile) as writer:
+        for window, retained_block in retained_region_blocks(class_input, nodata, minimum_count,
+                                                             mmu_excluded_values, tile_size, worker_count):
+            writer.write(retained_block.astype('uint8'), window)
+    retained_raster = CachedRaster(cache_folder, retained_entry)
+    class_rasters = ThreadLocalHandles(lambda: rasterio.open(class_input))
+    area_rasters = ThreadLocalHandles(lambda: rasterio.open(area_input))
+
+    # Define the block function that replaces, restores, and extracts a tile
+    def revise_tile(window):
+        class_raster = class_rasters.get()
+        class_block = class_raster.read(1, window=window, masked=False)
+        area_block = area_rasters.get().read(1, window=window, masked=False)
+        # Only search for cells in the map domain whose types are not restored afterwards
+        nibble_block = nibble_tile(lambda search_window: class_raster.read(1, window=search_window, masked=False),
+                                   lambda search_window: retained_raster.read(1, window=search_window),
+                                   window, width, height, halo, class_block, area_block, mmu_restored_values)
+        return restore_extract_array(class_block, nibble_block, area_block, nodata)
+
+    # Write revised types tile by tile
+    output_profile.update(dtype='int16', nodata=nodata, compress='lzw')
+    try:
+        with rasterio.open(output_file, 'w', **output_profile, BIGTIFF='YES') as dst:
+            for window, revised_block in map_blocks(revise_tile, window_list, worker_count):
+                dst.write(revised_block, 1, window=window)
+    finally:
+        class_rasters.close()
+        area_rasters.close()
+        retained_raster.close()
@@ -0,0 +1,468 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Foliar cover key
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Foliar cover key" implements the programmatic key that parses foliar cover and ancillary data to discrete types.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import numpy as np
+
+# Define the input layers read by the programmatic key
+foliar_key_layers = ['alnus', 'betshr', 'bettre', 'brotre', 'dryas', 'dsalix', 'empnig', 'erivag', 'forb',
+                     'gramin', 'lichen', 'mwcalama', 'ndsalix', 'picgla', 'picmar', 'poptre', 'populbt',
+                     'sphagn', 'vaculi', 'wetsed',
+                     'picratio', 'picsum', 'decratio', 'ndshrub', 'eridwarf', 'wetland', 'picwet', 'herbaceous',
+                     'height', 'esa', 'esri', 'fire', 'flood', 'alkaline', 'correction']
+
+
+# Define a function to parse foliar cover blocks to types
+def parse_foliar_key(area_block, blocks, nodata=-32768):
+    """
+    Description: applies the programmatic key to a block of foliar cover and ancillary data
+    Inputs: 'area_block' -- an array of the map domain where the domain has a value of 1
+            'blocks' -- a dictionary of arrays for each layer in foliar_key_layers
+            'nodata' -- the no data value for the output
+    Returned Value: Returns an int16 array of type codes with no data outside of the map domain
+    Preconditions: all arrays must share the shape of the area block
+    """
+
+    #### UNPACK BLOCKS
+    alnus_block = blocks['alnus']
+    betshr_block = blocks['betshr']
+    bettre_block = blocks['bettre']
+    brotre_block = blocks['brotre']
+    dryas_block = blocks['dryas']
+    dsalix_block = blocks['dsalix']
+    empnig_block = blocks['empnig']
+    erivag_block = blocks['erivag']
+    forb_block = blocks['forb']
+    gramin_block = blocks['gramin']
+    lichen_block = blocks['lichen']
+    mwcalama_block = blocks['mwcalama']
+    ndsalix_block = blocks['ndsalix']
+    picgla_block = blocks['picgla']
+    picmar_block = blocks['picmar']
+    poptre_block = blocks['poptre']
+    populbt_block = blocks['populbt']
+    sphagn_block = blocks['sphagn']
+    vaculi_block = blocks['vaculi']
+    wetsed_block = blocks['wetsed']
+
+    picratio_block = blocks['picratio']
+    picsum_block = blocks['picsum']
+    decratio_block = blocks['decratio']
+    ndshrub_block = blocks['ndshrub']
+    eridwarf_block = blocks['eridwarf']
+    wetland_block = blocks['wetland']
+    picwet_block = blocks['picwet']
+    herbac_block = blocks['herbaceous']
+
+    height_block = blocks['height']
+
+    esa_block = blocks['esa']
+    esri_block = blocks['esri']
+    fire_block = blocks['fire']
+    flood_block = blocks['flood']
+    alkaline_block = blocks['alkaline']
+    correction_block = blocks['correction']
+
+    #### BEGIN PROGRAMMATIC KEY
+
+    # Set base value
+    out_block = np.where(area_block == 1, 0, nodata)
+
+    #### 0. GROWTH HABIT SPLITS
+
+    # 0.1 coniferous trees
+    out_block = np.where((picsum_block >= 10)
+                         & (decratio_block < 40),
+                         1, out_block)
+    out_block = np.where((out_block == 0) & (picsum_block >= 5) & (decratio_block < 40)
+                         & ((esa_block == 10) | (height_block > 3)),
+                         1, out_block)
+    # 0.1 apply correction
+    out_block = np.where((out_block == 1)
+                         & ((height_block <= 2) | (esa_block != 10))
+                         & ((fire_block >= 1975) & (fire_block < 2000) & (correction_block == 1))
+                         & (picwet_block < 20),
+                         0, out_block)
+    # 0.2 deciduous trees
+    out_block = np.where((out_block == 0) & (brotre_block >= 12) & (decratio_block >= 60)
+                         & (brotre_block >= (ndshrub_block * 0.5))
+                         & (((fire_block < 1975) & (height_block >= 2))
+                            | (fire_block >= 1975)
+                            | (brotre_block >= 25)),
+                         2, out_block)
+    # 0.3 mixed coniferous - deciduous trees
+    out_block = np.where((out_block == 0) & (brotre_block >= 10) & (picsum_block >= 10)
+                         & ((decratio_block >= 40) & (decratio_block < 60))
+                         & ((height_block >= 2) | ((brotre_block + picsum_block) >= 40)),
+                         3, out_block)
+    # 0.4 shrub mesic
+    out_block = np.where((out_block == 0)
+                         & ((ndshrub_block + eridwarf_block + vaculi_block
+                            + dryas_block + dsalix_block ) >= 15)
+                         & (wetland_block < 8),
+                         4, out_block)
+    # 0.5 shrub wet
+    out_block = np.where((out_block == 0)
+                         & ((ndshrub_block + eridwarf_block + vaculi_block
+                             + dryas_block + dsalix_block) >= 15)
+                         & (wetland_block >= 8),
+                         5, out_block)
+    # 0.6 herbaceous mesic
+    out_block = np.where((out_block == 0)
+                         & ((herbac_block + mwcalama_block) >= 15)
+                         & (wetland_block < 8) & (brotre_block < 5),
+                         6, out_block)
+    # 0.7 herbaceous wet
+    out_block = np.where((out_block == 0)
+                         & ((herbac_block + mwcalama_block) >= 15)
+                         & (wetland_block >= 8) & (brotre_block < 5),
+                         7, out_block)
+
+    #### 1. SPRUCE FOREST & WOODLAND
+
+    # 1.10 spruce-lichen woodland
+    out_block = np.where((out_block == 1) & (lichen_block >= 15) & (ndshrub_block <= 10)
+                         & ((picsum_block + brotre_block) < 20),
+                         10, out_block)
+    # 1.11 white spruce woodland
+    out_block = np.where((out_block == 1) & (picratio_block >= 60)
+                         & ((picsum_block + brotre_block) < 20),
+                         11, out_block)
+    # 1.12 white spruce forest
+    out_block = np.where((out_block == 1) & (picratio_block >= 60)
+                         & ((picsum_block + brotre_block) >= 20),
+                         12, out_block)
+    # 1.13 black spruce woodland
+    out_block = np.where((out_block == 1) & (picratio_block < 40)
+                         & ((picsum_block + brotre_block) < 20),
+                         13, out_block)
+    # 1.14 black spruce forest
+    out_block = np.where((out_block == 1) & (picratio_block < 40)
+                         & ((picsum_block + brotre_block) >= 20),
+                         14, out_block)
+    # 1.15 mixed spruce woodland
+    out_block = np.where((out_block == 1) & (picratio_block >= 40) & (picratio_block < 60)
+                         & ((picsum_block + brotre_block) < 20),
+                         15, out_block)
+    # 1.16 mixed spruce forest
+    out_block = np.where((out_block == 1) & (picratio_block >= 40) & (picratio_block < 60)
+                         & ((picsum_block + brotre_block) >= 20),
+                         16, out_block)
+    # 1.17 black spruce-tussock woodland
+    out_block = np.where(((out_block == 13) | (out_block == 14)
+                          | (out_block == 15) | (out_block == 16))
+                         & (erivag_block >= 20),
+                         17, out_block)
+    out_block = np.where(((out_block == 13) | (out_block == 14)
+                          | (out_block == 15) | (out_block == 16))
+                         & (erivag_block >= 15) & (ndshrub_block < 35),
+                         17, out_block)
+    # 1.18 black spruce peatland
+    out_block = np.where(((out_block == 13) | (out_block == 14)
+                          | (out_block == 15) | (out_block == 16))
+                         & (picwet_block >= 8) & (ndsalix_block < 30),
+                         18, out_block)
+
+    #### 2. DECIDUOUS FOREST
+
+    # 2.20 poplar forest
+    out_block = np.where((out_block == 2)
+                         & ((populbt_block + 0.1) > poptre_block)
+                         & ((populbt_block + 0.1) > bettre_block),
+                         20, out_block)
+    # 2.21 aspen forest
+    out_block = np.where((out_block == 2)
+                         & ((poptre_block + 0.1) > populbt_block)
+                         & ((poptre_block + 0.1) > bettre_block),
+                         21, out_block)
+    # 2.22 birch forest
+    out_block = np.where((out_block == 2)
+                         & ((bettre_block + 0.1) > populbt_block)
+                         & ((bettre_block + 0.1) > poptre_block),
+                         22, out_block)
+
+    #### 3. SPRUCE - HARDWOOD FOREST & WOODLAND
+
+    # 3.30 white spruce-poplar forest & woodland
+    out_block = np.where((out_block == 3) & (picratio_block >= 60)
+                         & ((populbt_block + 0.1) > poptre_block)
+                         & ((populbt_block + 0.1) > bettre_block),
+                         30, out_block)
+    out_block = np.where((out_block == 3) & (picratio_block >= 40) & (picratio_block < 60)
+                         & ((populbt_block + 0.1) > poptre_block)
+                         & ((populbt_block + 0.1) > bettre_block),
+                         30, out_block)
+    # 3.31 white spruce-aspen forest & woodland
+    out_block = np.where((out_block == 3) & (picratio_block >= 60)
+                         & ((poptre_block + 0.1) > populbt_block)
+                         & ((poptre_block + 0.1) > bettre_block),
+                         31, out_block)
+    out_block = np.where((out_block == 3) & (picratio_block >= 40) & (picratio_block < 60)
+                         & ((poptre_block + 0.1) > populbt_block)
+                         & ((poptre_block + 0.1) > bettre_block),
+                         31, out_block)
+    # 3.32 white spruce-birch forest & woodland
+    out_block = np.where((out_block == 3) & (picratio_block >= 60)
+                         & ((bettre_block + 0.1) > populbt_block)
+                         & ((bettre_block + 0.1) > poptre_block),
+                         32, out_block)
+    # 3.33 black spruce-deciduous forest & woodland
+    out_block = np.where((out_block == 3) & (picratio_block < 40)
+                         & ((populbt_block + 0.1) > poptre_block)
+                         & ((populbt_block + 0.1) > bettre_block),
+                         33, out_block)
+    out_block = np.where((out_block == 3) & (picratio_block < 40)
+                         & ((poptre_block + 0.1) > populbt_block)
+                         & ((poptre_block + 0.1) > bettre_block),
+                         33, out_block)
+    out_block = np.where((out_block == 3) & (picratio_block < 40)
+                         & ((bettre_block + 0.1) > populbt_block)
+                         & ((bettre_block + 0.1) > poptre_block),
+                         33, out_block)
+    # 3.34 mixed spruce-birch forest & woodland
+    out_block = np.where((out_block == 3) & (picratio_block >= 40) & (picratio_block < 60)
+                         & ((bettre_block + 0.1) > populbt_block)
+                         & ((bettre_block + 0.1) > poptre_block),
+                         34, out_block)
+
+    #### 8. TUSSOCK TUNDRA TYPES
+
+    # 8.40 tussock tundra low shrub
+    out_block = np.where(((out_block == 0) | (out_block == 4) | (out_block == 5)
+                          | (out_block == 6) | (out_block == 7))
+                         & (erivag_block >= 20),
+                         40, out_block)
+    out_block = np.where(((out_block == 0) | (out_block == 4) | (out_block == 5)
+                          | (out_block == 6) | (out_block == 7))
+                         & (erivag_block >= 15) & (ndshrub_block < 35),
+                         40, out_block)
+    # 8.41 tussock tundra dwarf shrub
+    out_block = np.where((out_block == 26) & (ndshrub_block < 8),
+                         41, out_block)
+
+    #### 4. SHRUB MESIC
+
+    # 4.50 alder mesic
+    out_block = np.where((out_block == 4)
+                         & (alnus_block >= 12)
+                         & ((alnus_block / (alnus_block + ndsalix_block  + 0.1)) >= 0.3),
+                         50, out_block)
+    # 4.51 alder-willow mesic
+    out_block = np.where(((out_block == 4) | (out_block == 50))
+                         & ((alnus_block + ndsalix_block) >= 12)
+                         & (((alnus_block / (alnus_block + ndsalix_block  + 0.1)) >= 0.3)
+                            & ((alnus_block / (alnus_block + ndsalix_block  + 0.1)) < 0.7)),
+                         51, out_block)
+    # 4.52 willow mesic
+    out_block = np.where((out_block == 4)
+                         & (ndsalix_block >= 10)
+                         & ((ndsalix_block / (betshr_block + ndsalix_block  + 0.1)) >= 0.3),
+                         52, out_block)
+    # 4.53 birch-willow mesic
+    out_block = np.where(((out_block == 4) | (out_block == 52))
+                         & ((betshr_block + ndsalix_block) >= 12)
+                         & (((ndsalix_block / (betshr_block + ndsalix_block  + 0.1)) >= 0.3)
+                            & ((ndsalix_block / (betshr_block + ndsalix_block  + 0.1)) < 0.7)),
+                         53, out_block)
+    # 4.54 birch shrub / birch-ericaceous mesic
+    out_block = np.where((out_block == 4)
+                         & ((betshr_block + eridwarf_block + vaculi_block) >= 15)
+                         & (betshr_block >= 5),
+                         54, out_block)
+    # 4.55 dwarf shrub-lichen
+    out_block = np.where((out_block == 4)
+                         & ((dsalix_block + dryas_block + eridwarf_block) >= 15)
+                         & (lichen_block >= 20)
+                         & (height_block < 1)
+                         & (brotre_block < 5),
+                         55, out_block)
+    # 4.56 ericaceous dwarf shrub
+    out_block = np.where((out_block == 4)
+                         & ((dsalix_block + dryas_block + eridwarf_block) >= 15)
+                         & (eridwarf_block >= 10)
+                         & ((eridwarf_block / (eridwarf_block + dryas_block  + 0.1)) >= 0.3)
+                         & (height_block < 1)
+                         & (brotre_block < 5),
+                         56, out_block)
+    # 4.57 dryas-ericaceous dwarf shrub
+    out_block = np.where(((out_block == 4) | (out_block == 56))
+                         & ((dsalix_block + dryas_block + eridwarf_block) >= 15)
+                         & (dryas_block >= 10)
+                         & (((eridwarf_block / (eridwarf_block + dryas_block  + 0.1)) >= 0.3)
+                            & ((eridwarf_block / (eridwarf_block + dryas_block  + 0.1)) < 0.7))
+                         & (height_block < 1)
+                         & (brotre_block < 5),
+                         57, out_block)
+    # 4.58 dryas-dwarf willow
+    out_block = np.where(((out_block == 4))
+                         & ((dsalix_block + dryas_block + eridwarf_block) >= 15)
+                         & (dryas_block >= 10)
+                         & (height_block < 1)
+                         & (brotre_block < 5),
+                         58, out_block)
+
+    #### 5. SHRUB WET
+
+    # 5.60 shrub-sphagnum wet
+    out_block = np.where((out_block == 5)
+                         & (sphagn_block >= 12),
+                         60, out_block)
+    # 5.61 dwarf shrub-sphagnum wet
+    out_block = np.where((out_block == 60)
+                         & (ndshrub_block < 15),
+                         61, out_block)
+    # 5.62 alder-willow wet
+    out_block = np.where((out_block == 5)
+                         & (alnus_block >= 10),
+                         62, out_block)
+    # 5.63 willow wet
+    out_block = np.where((out_block == 5) & (ndsalix_block >= 10),
+                         63, out_block)
+    # 5.64 birch-willow wet
+    out_block = np.where(((out_block == 5) | (out_block == 63))
+                         & (betshr_block >= 10)
+                         & (ndsalix_block < (betshr_block * 1.5)),
+                         64, out_block)
+
+    #### 6. HERBACEOUS MESIC
+
+    # 6.70 Calamagrostis meadow mesic
+    out_block = np.where((out_block == 6) & (mwcalama_block >= 8),
+                         70, out_block)
+
+    # 6.71 forb-graminoid meadow mesic alkaline
+    out_block = np.where((out_block == 6) & (alkaline_block == 1),
+                         71, out_block)
+
+    # 6.72 forb-graminoid meadow mesic acidic
+    out_block = np.where((out_block == 6) & (alkaline_block == 0),
+                         72, out_block)
+
+    #### 7. HERBACEOUS WET
+
+    # 7.80 sedge meadow wet
+    out_block = np.where((out_block == 7) & (wetsed_block >= 8),
+                         80, out_block)
+
+    # 7.81 sedge-Calamagrostis meadow wet
+    out_block = np.where(((out_block == 80) |
+                          ((out_block == 7) & ((wetland_block + mwcalama_block) >= 12)))
+                         & ((mwcalama_block / (mwcalama_block + wetsed_block + 0.1)) >= 0.3),
+                         81, out_block)
+
+    # 7.82 forb-graminoid meadow wet
+    out_block = np.where(out_block == 7,
+                         82, out_block)
+
+    #### CORRECTIONS
+
+    # Apply corrections to willow wet
+    out_block = np.where(((out_block == 0) | (out_block == 4) | (out_block == 5))
+                         & ((brotre_block >= 3) | (poptre_block >= 3) | (ndsalix_block >= 3))
+                         & (wetland_block >= 5),
+                         63, out_block)
+    # Apply corrections to birch-willow wet
+    out_block = np.where((out_block == 5)
+                         & (betshr_block >= 3),
+                         64, out_block)
+    # Apply corrections to aspen forest
+    out_block = np.where(((out_block == 0) | (out_block == 4))
+                         & ((brotre_block >= 3) | (poptre_block >= 3) | (ndsalix_block >= 3))
+                         & (wetland_block < 5)
+                         & (poptre_block > (ndsalix_block + 0.1)),
+                         21, out_block)
+    # Apply corrections to willow mesic
+    out_block = np.where(((out_block == 0) | (out_block == 4))
+                         & ((brotre_block >= 3) | (poptre_block >= 3) | (ndsalix_block >= 3))
+                         & (wetland_block < 5),
+                         52, out_block)
+    # Apply corrections to birch-ericaceous mesic
+    out_block = np.where((out_block == 4)
+                         & (betshr_block >= 3),
+                         54, out_block)
+
+    #### 9. FIRE TYPES
+
+    # 9.90 burned
+    out_block = np.where(fire_block >= 2019,
+                         90, out_block)
+
+    # 9.91 recent burn recovering birch-willow mesic
+    out_block = np.where((fire_block >= 2000) & (fire_block < 2019)
+                         & ((out_block == 52) | (out_block == 53)),
+                         91, out_block)
+    out_block = np.where((fire_block >= 2000) & (fire_block < 2019)
+                         & (out_block == 0)
+                         & ((esa_block == 20) | (esa_block == 30))
+                         & (wetland_block < 5),
+                         91, out_block)
+
+    # 9.92 recent burn recovering birch-willow wet
+    out_block = np.where((fire_block >= 2000) & (fire_block < 2019)
+                         & ((out_block == 62) | (out_block == 63) | (out_block == 64)),
+                         92, out_block)
+    out_block = np.where((fire_block >= 2000) & (fire_block < 2019)
+                         & (out_block == 0)
+                         & ((esa_block == 20) | (esa_block == 30))
+                         & (wetland_block >= 5),
+                         92, out_block)
+
+    #### 10. FLOODPLAIN TYPES
+
+    # 10.100 white spruce active floodplain
+    out_block = np.where((flood_block == 1)
+                         & ((out_block == 11) | (out_block == 12)
+                            | (out_block == 15) | (out_block == 16)),
+                         100, out_block)
+
+    # 10.101 poplar (white spruce) active floodplain
+    out_block = np.where((flood_block == 1) &
+                         ((out_block == 20) | (out_block == 30)),
+                         101, out_block)
+    out_block = np.where((flood_block == 1) & (out_block == 21)
+                         & (populbt_block >= (poptre_block * 0.75)),
+                         101, out_block)
+
+    # 10.102 birch (white spruce) active floodplain
+    out_block = np.where((flood_block == 1) &
+                         ((out_block == 22) | (out_block == 32) | (out_block == 34)),
+                         102, out_block)
+
+    # 10.103 alder-willow active floodplain
+    out_block = np.where((flood_block == 1)
+                         & ((out_block == 50) | (out_block == 51) | (out_block == 62)),
+                         103, out_block)
+
+    # 10.104 willow active floodplain
+    out_block = np.where((flood_block == 1)
+                         & (out_block == 52),
+                         104, out_block)
+
+    #### 12. SPARSE OR BARREN
+
+    # 12.95 Developed
+    out_block = np.where(esa_block == 50,
+                         95, out_block)
+
+    # 12.96 Barren / sparse
+    out_block = np.where(esa_block == 60,
+                         96, out_block)
+
+    # 12.97 Snow / ice
+    out_block = np.where((out_block == 0) & (esa_block == 70),
+                         97, out_block)
+
+    # 12.98 Water
+    out_block = np.where((esa_block == 80) | (esri_block == 1),
+                         98, out_block)
+
+    # Set no data values from area raster to no data
+    out_block = np.where(area_block != 1, nodata, out_block)
+
+    return out_block.astype('int16')
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Foliar cover key engines
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Foliar cover key engines" registers the implementations of the programmatic key and checks that they produce identical types on synthetic data.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import numpy as np
+from stratification_utils.cover_storage import cover_storage_type
+from stratification_utils.derived_indices import derived_registry
+from stratification_utils.foliar_key import foliar_key_layers
+from stratification_utils.foliar_key import parse_foliar_key
+from stratification_utils.foliar_key_numba import numba_available
+from stratification_utils.foliar_key_numba import parse_foliar_numba
+from stratification_utils.foliar_key_rules import parse_foliar_rules
+
+# Define the available implementations of the programmatic key
+foliar_key_engines = {'rules': parse_foliar_rules,
+                      'numba': parse_foliar_numba,
+                      'reference': parse_foliar_key}
+
+
+# Define a function to select a key implementation
+def select_key_engine(key_engine):
+    """
+    Description: returns the function for a key implementation, falling back to the rule table when numba is not installed
+    Inputs: 'key_engine' -- the name of the key implementation in foliar_key_engines
+    Returned Value: Returns a tuple of the selected engine name and key function
+    Preconditions: none
+    """
+
+    if key_engine not in foliar_key_engines:
+        raise ValueError(f'Key engine must be one of {", ".join(foliar_key_engines.keys())}.')
+    if key_engine == 'numba' and numba_available is False:
+        print('\tNumba is not installed; using the rules key engine.')
+        key_engine = 'rules'
+    return key_engine, foliar_key_engines[key_engine]
+
+
+# Define a function to create synthetic blocks for the programmatic key
+def synthetic_key_blocks(shape, seed=0, cover_storage='int16'):
+    """
+    Description: creates random foliar cover, derived, and ancillary blocks that exercise the branches of the key
+    Inputs: 'shape' -- the shape of each block
+            'seed' -- the seed for the random number generator
+            'cover_storage' -- the storage type of the foliar cover blocks from cover_storage_types
+    Returned Value: Returns a tuple of the area block and a dictionary of layer blocks
+    Preconditions: the values of the blocks are identical for every storage type except that compact foliar cover is
+    set to its no data value outside of the map domain
+    """
+
+    # Create random number generator
+    generator = np.random.default_rng(seed)
+
+    # Create foliar cover with many low values and few high values
+    blocks = {}
+    for name in foliar_key_layers:
+        blocks[name] = np.clip(generator.gamma(0.5, 15, shape), 0, 100).astype('int16')
+
+    # Create ratios and ancillary categories
+    blocks['picratio'] = generator.integers(0, 100, shape).astype('int16')
+    blocks['decratio'] = generator.integers(0, 100, shape).astype('int16')
+    blocks['height'] = generator.integers(0, 15, shape).astype('int16')
+    blocks['esa'] = generator.choice([10, 20, 30, 40, 50, 60, 70, 80, 90], shape).astype('int16')
+    blocks['esri'] = generator.choice([0, 1, 2, 5], shape, p=[0.4, 0.05, 0.3, 0.25]).astype('int16')
+    blocks['fire'] = generator.choice([0, 1960, 1980, 1990, 2005, 2015, 2020], shape).astype('int16')
+    for name in ['flood', 'alkaline', 'correction']:
+        blocks[name] = generator.integers(0, 2, shape).astype('int16')
+
+    # Create map domain with scattered gaps
+    area_block = (generator.random(shape) < 0.9).astype('uint8')
+
+    # Convert foliar cover to the storage type
+    cover_dtype, cover_nodata = cover_storage_type(cover_storage)
+    if cover_dtype != 'int16':
+        ancillary_names = ['height', 'esa', 'esri', 'fire', 'flood', 'alkaline', 'correction']
+        for name in foliar_key_layers:
+            if name not in derived_registry and name not in ancillary_names:
+                blocks[name] = np.where(area_block == 1, blocks[name], cover_nodata).astype(cover_dtype)
+
+    return area_block, blocks
+
+
+# Define a function to verify that key implementations are equivalent
+def verify_key_engines(engine_names, shape=(1, 256, 256), seeds=(0, 1, 2), nodata=-32768,
+                       cover_storages=('int16', 'uint8')):
+    """
+    Description: compares key implementations against the reference key on synthetic blocks
+    Inputs: 'engine_names' -- a list of key implementation names to verify
+            'shape' -- the shape of each synthetic block
+            'seeds' -- a list of seeds for synthetic blocks
+            'nodata' -- the no data value for the output
+            'cover_storages' -- a list of storage types of foliar cover on which each implementation is evaluated
+    Returned Value: No return value; raises a RuntimeError if any implementation differs from the reference key
+    Preconditions: none
+    """
+
+    for seed in seeds:
+        area_block, blocks = synthetic_key_blocks(shape, seed)
+        reference_block = parse_foliar_key(area_block, blocks, nodata)
+        for cover_storage in cover_storages:
+            area_block, blocks = synthetic_key_blocks(shape, seed, cover_storage)
+            for engine_name in engine_names:
+                out_block = foliar_key_engines[engine_name](area_block, blocks, nodata)
+                mismatch_count = int(np.count_nonzero(out_block != reference_block))
+                if mismatch_count > 0:
+                    raise RuntimeError(f'Key engine "{engine_name}" differs from the reference key '
+                                       f'for {mismatch_count} synthetic pixels (seed {seed}, {cover_storage} cover).')
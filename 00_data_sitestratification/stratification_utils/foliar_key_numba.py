@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Foliar cover key numba kernel
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+. Compilation requires numba; without numba the kernel runs as slow pure Python.
+# Description: "Foliar cover key numba kernel" evaluates the entire programmatic key per pixel in a single loop over the stacked input layers.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import numpy as np
+from stratification_utils.foliar_key import foliar_key_layers
+
+# Import numba if available
+try:
+    from numba import njit
+    numba_available = True
+except ImportError:
+    numba_available = False
+
+    def njit(*args, **kwargs):
+        def decorator(function):
+            return function
+        return decorator
+
+# Define positions of layers in the stacked input
+(ALNUS, BETSHR, BETTRE, BROTRE, DRYAS, DSALIX, EMPNIG, ERIVAG, FORB, GRAMIN, LICHEN, MWCALAMA, NDSALIX,
+ PICGLA, PICMAR, POPTRE, POPULBT, SPHAGN, VACULI, WETSED,
+ PICRATIO, PICSUM, DECRATIO, NDSHRUB, ERIDWARF, WETLAND, PICWET, HERBACEOUS,
+ HEIGHT, ESA, ESRI, FIRE, FLOOD, ALKALINE, CORRECTION) = range(len(foliar_key_layers))
+
+
+# Define the per-pixel kernel of the programmatic key
+@njit(nogil=True, cache=True)
+def foliar_key_kernel(area, stack, nodata, out):
+    """
+    Description: applies the programmatic key to each pixel of the stacked layers
+    Inputs: 'area' -- a one-dimensional array of the map domain where the domain has a value of 1
+            'stack' -- a two-dimensional array of layers in the order of foliar_key_layers by pixels
+            'nodata' -- the no data value for the output
+            'out' -- a one-dimensional int16 array that receives the type codes
+    Returned Value: No return value; writes type codes to the out array
+    Preconditions: rules must be kept in the same order as the reference key
+    """
+
+    for i in range(area.shape[0]):
+        if area[i] != 1:
+            out[i] = nodata
+            continue
+        esa = np.int64(stack[ESA, i])
+        esri = np.int64(stack[ESRI, i])
+
+        #### 12. SPARSE OR BARREN (overrides that take precedence over all other types)
+        if esa == 80 or esri == 1:
+            out[i] = 98
+            continue
+        if esa == 60:
+            out[i] = 96
+            continue
+        if esa == 50:
+            out[i] = 95
+            continue
+
+        # Load pixel values
+        alnus = np.int64(stack[ALNUS, i])
+        betshr = np.int64(stack[BETSHR, i])
+        bettre = np.int64(stack[BETTRE, i])
+        brotre = np.int64(stack[BROTRE, i])
+        dryas = np.int64(stack[DRYAS, i])
+        dsalix = np.int64(stack[DSALIX, i])
+        erivag = np.int64(stack[ERIVAG, i])
+        lichen = np.int64(stack[LICHEN, i])
+        mwcalama = np.int64(stack[MWCALAMA, i])
+        ndsalix = np.int64(stack[NDSALIX, i])
+        poptre = np.int64(stack[POPTRE, i])
+        populbt = np.int64(stack[POPULBT, i])
+        sphagn = np.int64(stack[SPHAGN, i])
+        vaculi = np.int64(stack[VACULI, i])
+        wetsed = np.int64(stack[WETSED, i])
+        picratio = np.int64(stack[PICRATIO, i])
+        picsum = np.int64(stack[PICSUM, i])
+        decratio = np.int64(stack[DECRATIO, i])
+        ndshrub = np.int64(stack[NDSHRUB, i])
+        eridwarf = np.int64(stack[ERIDWARF, i])
+        wetland = np.int64(stack[WETLAND, i])
+        picwet = np.int64(stack[PICWET, i])
+        herbaceous = np.int64(stack[HERBACEOUS, i])
+        height = np.int64(stack[HEIGHT, i])
+        fire = np.int64(stack[FIRE, i])
+        flood = np.int64(stack[FLOOD, i])
+        alkaline = np.int64(stack[ALKALINE, i])
+        correction = np.int64(stack[CORRECTION, i])
+
+        # Set base value
+        c = 0
+
+        #### 0. GROWTH HABIT SPLITS
+        if picsum >= 10 and decratio < 40:
+            c = 1
+        if c == 0 and picsum >= 5 and decratio < 40 and (esa == 10 or height > 3):
+            c = 1
+        if (c == 1 and (height <= 2 or esa != 10)
+                and fire >= 1975 and fire < 2000 and correction == 1
+                and picwet < 20):
+            c = 0
+        if (c == 0 and brotre >= 12 and decratio >= 60
+                and brotre >= ndshrub * 0.5
+                and ((fire < 1975 and height >= 2) or fire >= 1975 or brotre >= 25)):
+            c = 2
+        if (c == 0 and brotre >= 10 and picsum >= 10
+                and decratio >= 40 and decratio < 60
+                and (height >= 2 or (brotre + picsum) >= 40)):
+            c = 3
+        shrub_sum = ndshrub + eridwarf + vaculi + dryas + dsalix
+        if c == 0 and shrub_sum >= 15 and wetland < 8:
+            c = 4
+        if c == 0 and shrub_sum >= 15 and wetland >= 8:
+            c = 5
+        herbaceous_sum = herbaceous + mwcalama
+        if c == 0 and herbaceous_sum >= 15 and wetland < 8 and brotre < 5:
+            c = 6
+        if c == 0 and herbaceous_sum >= 15 and wetland >= 8 and brotre < 5:
+            c = 7
+
+        #### 1. SPRUCE FOREST & WOODLAND
+        tree_sum = picsum + brotre
+        if c == 1 and lichen >= 15 and ndshrub <= 10 and tree_sum < 20:
+            c = 10
+        if c == 1 and picratio >= 60 and tree_sum < 20:
+            c = 11
+        if c == 1 and picratio >= 60 and tree_sum >= 20:
+            c = 12
+        if c == 1 and picratio < 40 and tree_sum < 20:
+            c = 13
+        if c == 1 and picratio < 40 and tree_sum >= 20:
+            c = 14
+        if c == 1 and picratio >= 40 and picratio < 60 and tree_sum < 20:
+            c = 15
+        if c == 1 and picratio >= 40 and picratio < 60 and tree_sum >= 20:
+            c = 16
+        if c >= 13 and c <= 16 and erivag >= 20:
+            c = 17
+        if c >= 13 and c <= 16 and erivag >= 15 and ndshrub < 35:
+            c = 17
+        if c >= 13 and c <= 16 and picwet >= 8 and ndsalix < 30:
+            c = 18
+
+        #### 2. DECIDUOUS FOREST
+        populbt_dominant = (populbt + 0.1) > poptre and (populbt + 0.1) > bettre
+        poptre_dominant = (poptre + 0.1) > populbt and (poptre + 0.1) > bettre
+        bettre_dominant = (bettre + 0.1) > populbt and (bettre + 0.1) > poptre
+        if c == 2 and populbt_dominant:
+            c = 20
+        if c == 2 and poptre_dominant:
+            c = 21
+        if c == 2 and bettre_dominant:
+            c = 22
+
+        #### 3. SPRUCE - HARDWOOD FOREST & WOODLAND
+        if c == 3 and picratio >= 60 and populbt_dominant:
+            c = 30
+        if c == 3 and picratio >= 40 and picratio < 60 and populbt_dominant:
+            c = 30
+        if c == 3 and picratio >= 60 and poptre_dominant:
+            c = 31
+        if c == 3 and picratio >= 40 and picratio < 60 and poptre_dominant:
+            c = 31
+        if c == 3 and picratio >= 60 and bettre_dominant:
+            c = 32
+        if c == 3 and picratio < 40 and populbt_dominant:
+            c = 33
+        if c == 3 and picratio < 40 and poptre_dominant:
+            c = 33
+        if c == 3 and picratio < 40 and bettre_dominant:
+            c = 33
+        if c == 3 and picratio >= 40 and picratio < 60 and bettre_dominant:
+            c = 34
+
+        #### 8. TUSSOCK TUNDRA TYPES
+        if (c == 0 or (c >= 4 and c <= 7)) and erivag >= 20:
+            c = 40
+        if (c == 0 or (c >= 4 and c <= 7)) and erivag >= 15 and ndshrub < 35:
+            c = 40
+        if c == 26 and ndshrub < 8:
+            c = 41
+
+        #### 4. SHRUB MESIC
+        alnus_ratio = alnus / (alnus + ndsalix + 0.1)
+        if c == 4 and alnus >= 12 and alnus_ratio >= 0.3:
+            c = 50
+        if (c == 4 or c == 50) and (alnus + ndsalix) >= 12 and alnus_ratio >= 0.3 and alnus_ratio < 0.7:
+            c = 51
+        salix_ratio = ndsalix / (betshr + ndsalix + 0.1)
+        if c == 4 and ndsalix >= 10 and salix_ratio >= 0.3:
+            c = 52
+        if (c == 4 or c == 52) and (betshr + ndsalix) >= 12 and salix_ratio >= 0.3 and salix_ratio < 0.7:
+            c = 53
+        if c == 4 and (betshr + eridwarf + vaculi) >= 15 and betshr >= 5:
+            c = 54
+        dwarf_sum = dsalix + dryas + eridwarf
+        dwarf_stature = height < 1 and brotre < 5
+        if c == 4 and dwarf_sum >= 15 and lichen >= 20 and dwarf_stature:
+            c = 55
+        ericaceous_ratio = eridwarf / (eridwarf + dryas + 0.1)
+        if c == 4 and dwarf_sum >= 15 and eridwarf >= 10 and ericaceous_ratio >= 0.3 and dwarf_stature:
+            c = 56
+        if ((c == 4 or c == 56) and dwarf_sum >= 15 and dryas >= 10
+                and ericaceous_ratio >= 0.3 and ericaceous_ratio < 0.7 and dwarf_stature):
+            c = 57
+        if c == 4 and dwarf_sum >= 15 and dryas >= 10 and dwarf_stature:
+            c = 58
+
+        #### 5. SHRUB WET
+        if c == 5 and sphagn >= 12:
+            c = 60
+        if c == 60 and ndshrub < 15:
+            c = 61
+        if c == 5 and alnus >= 10:
+            c = 62
+        if c == 5 and ndsalix >= 10:
+            c = 63
+        if (c == 5 or c == 63) and betshr >= 10 and ndsalix < (betshr * 1.5):
+            c = 64
+
+        #### 6. HERBACEOUS MESIC
+        if c == 6 and mwcalama >= 8:
+            c = 70
+        if c == 6 and alkaline == 1:
+            c = 71
+        if c == 6 and alkaline == 0:
+            c = 72
+
+        #### 7. HERBACEOUS WET
+        if c == 7 and wetsed >= 8:
+            c = 80
+        if ((c == 80 or (c == 7 and (wetland + mwcalama) >= 12))
+                and (mwcalama / (mwcalama + wetsed + 0.1)) >= 0.3):
+            c = 81
+        if c == 7:
+            c = 82
+
+        #### CORRECTIONS
+        deciduous_present = brotre >= 3 or poptre >= 3 or ndsalix >= 3
+        if (c == 0 or c == 4 or c == 5) and deciduous_present and wetland >= 5:
+            c = 63
+        if c == 5 and betshr >= 3:
+            c = 64
+        if (c == 0 or c == 4) and deciduous_present and wetland < 5 and poptre > (ndsalix + 0.1):
+            c = 21
+        if (c == 0 or c == 4) and deciduous_present and wetland < 5:
+            c = 52
+        if c == 4 and betshr >= 3:
+            c = 54
+
+        #### 9. FIRE TYPES
+        if fire >= 2019:
+            c = 90
+        recent_fire = fire >= 2000 and fire < 2019
+        if recent_fire and (c == 52 or c == 53):
+            c = 91
+        if recent_fire and c == 0 and (esa == 20 or esa == 30) and wetland < 5:
+            c = 91
+        if recent_fire and (c == 62 or c == 63 or c == 64):
+            c = 92
+        if recent_fire and c == 0 and (esa == 20 or esa == 30) and wetland >= 5:
+            c = 92
+
+        #### 10. FLOODPLAIN TYPES
+        if flood == 1 and (c == 11 or c == 12 or c == 15 or c == 16):
+            c = 100
+        if flood == 1 and (c == 20 or c == 30):
+            c = 101
+        if flood == 1 and c == 21 and populbt >= (poptre * 0.75):
+            c = 101
+        if flood == 1 and (c == 22 or c == 32 or c == 34):
+            c = 102
+        if flood == 1 and (c == 50 or c == 51 or c == 62):
+            c = 103
+        if flood == 1 and c == 52:
+            c = 104
+
+        #### 12. SPARSE OR BARREN
+        if c == 0 and esa == 70:
+            c = 97
+
+        out[i] = c
+
+
+# Define a function to parse foliar cover blocks to types with the numba kernel
+def parse_foliar_numba(area_block, blocks, nodata=-32768):
+    """
+    Description: applies the compiled programmatic key to a block of foliar cover and ancillary data
+    Inputs: 'area_block' -- an array of the map domain where the domain has a value of 1
+            'blocks' -- a mapping of arrays for each layer in foliar_key_layers
+            'nodata' -- the no data value for the output
+    Returned Value: Returns an int16 array of type codes with no data outside of the map domain
+    Preconditions: cover values in the map domain must be valid (not no data) for results to match the reference key
+    """
+
+    # Stack the input layers
+    stack = np.empty((len(foliar_key_layers), area_block.size), dtype='int16')
+    for position, name in enumerate(foliar_key_layers):
+        stack[position] = blocks[name].reshape(-1)
+
+    # Evaluate the key for each pixel
+    out_block = np.empty(area_block.shape, dtype='int16')
+    foliar_key_kernel(area_block.reshape(-1), stack, nodata, out_block.reshape(-1))
+
+    return out_block
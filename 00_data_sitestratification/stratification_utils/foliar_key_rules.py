@@ -0,0 +1,498 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Foliar cover key rules
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Foliar cover key rules" expresses the programmatic key as an ordered rule table and evaluates each rule only on the pixels that its guard classes allow.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import time
+from collections import namedtuple
+import numpy as np
+from stratification_utils.cover_storage import widen_cover
+
+# Define a key rule
+# The guard is a tuple of the current classes a rule may change or None for all pixels in the map domain. The
+# predicate receives a mapping of layer arrays restricted to the guarded pixels, including the current classes as
+# 'out', and returns a boolean array. A predicate of None assigns the code to all guarded pixels.
+KeyRule = namedtuple('KeyRule', ['label', 'guard', 'predicate', 'code'])
+
+# Define the override rules that take precedence over every class assigned by the key
+# Pixels matched by an override are finalized before the key is evaluated. Later overrides take precedence over
+# earlier overrides.
+foliar_key_overrides = [
+    KeyRule('12.95 Developed', None,
+            lambda b: b['esa'] == 50,
+            95),
+    KeyRule('12.96 Barren / sparse', None,
+            lambda b: b['esa'] == 60,
+            96),
+    KeyRule('12.98 Water', None,
+            lambda b: (b['esa'] == 80) | (b['esri'] == 1),
+            98),
+]
+
+# Define the ordered rules of the programmatic key
+# Comparisons that the reference key evaluates in floating point are written as exact integer comparisons of the
+# integer layers: a / (a + b + 0.1) >= 0.3 is a * 10 > (a + b) * 3, a / (a + b + 0.1) < 0.7 is
+# a * 10 <= (a + b) * 7, (a + 0.1) > b is a >= b, and multiples such as b * 1.5 are cleared of their fractions.
+foliar_key_rules = [
+    #### 0. GROWTH HABIT SPLITS
+    KeyRule('0.1 coniferous trees', None,
+            lambda b: (b['picsum'] >= 10) & (b['decratio'] < 40),
+            1),
+    KeyRule('0.1 coniferous trees', (0,),
+            lambda b: ((b['picsum'] >= 5) & (b['decratio'] < 40)
+                       & ((b['esa'] == 10) | (b['height'] > 3))),
+            1),
+    KeyRule('0.1 apply correction', (1,),
+            lambda b: (((b['height'] <= 2) | (b['esa'] != 10))
+                       & ((b['fire'] >= 1975) & (b['fire'] < 2000) & (b['correction'] == 1))
+                       & (b['picwet'] < 20)),
+            0),
+    KeyRule('0.2 deciduous trees', (0,),
+            lambda b: ((b['brotre'] >= 12) & (b['decratio'] >= 60)
+                       & ((b['brotre'] * 2) >= b['ndshrub'])
+                       & (((b['fire'] < 1975) & (b['height'] >= 2))
+                          | (b['fire'] >= 1975)
+                          | (b['brotre'] >= 25))),
+            2),
+    KeyRule('0.3 mixed coniferous - deciduous trees', (0,),
+            lambda b: ((b['brotre'] >= 10) & (b['picsum'] >= 10)
+                       & ((b['decratio'] >= 40) & (b['decratio'] < 60))
+                       & ((b['height'] >= 2) | ((b['brotre'] + b['picsum']) >= 40))),
+            3),
+    KeyRule('0.4 shrub mesic', (0,),
+            lambda b: (((b['ndshrub'] + b['eridwarf'] + b['vaculi'] + b['dryas'] + b['dsalix']) >= 15)
+                       & (b['wetland'] < 8)),
+            4),
+    KeyRule('0.5 shrub wet', (0,),
+            lambda b: (((b['ndshrub'] + b['eridwarf'] + b['vaculi'] + b['dryas'] + b['dsalix']) >= 15)
+                       & (b['wetland'] >= 8)),
+            5),
+    KeyRule('0.6 herbaceous mesic', (0,),
+            lambda b: (((b['herbaceous'] + b['mwcalama']) >= 15)
+                       & (b['wetland'] < 8) & (b['brotre'] < 5)),
+            6),
+    KeyRule('0.7 herbaceous wet', (0,),
+            lambda b: (((b['herbaceous'] + b['mwcalama']) >= 15)
+                       & (b['wetland'] >= 8) & (b['brotre'] < 5)),
+            7),
+    #### 1. SPRUCE FOREST & WOODLAND
+    KeyRule('1.10 spruce-lichen woodland', (1,),
+            lambda b: ((b['lichen'] >= 15) & (b['ndshrub'] <= 10)
+                       & ((b['picsum'] + b['brotre']) < 20)),
+            10),
+    KeyRule('1.11 white spruce woodland', (1,),
+            lambda b: (b['picratio'] >= 60) & ((b['picsum'] + b['brotre']) < 20),
+            11),
+    KeyRule('1.12 white spruce forest', (1,),
+            lambda b: (b['picratio'] >= 60) & ((b['picsum'] + b['brotre']) >= 20),
+            12),
+    KeyRule('1.13 black spruce woodland', (1,),
+            lambda b: (b['picratio'] < 40) & ((b['picsum'] + b['brotre']) < 20),
+            13),
+    KeyRule('1.14 black spruce forest', (1,),
+            lambda b: (b['picratio'] < 40) & ((b['picsum'] + b['brotre']) >= 20),
+            14),
+    KeyRule('1.15 mixed spruce woodland', (1,),
+            lambda b: ((b['picratio'] >= 40) & (b['picratio'] < 60)
+                       & ((b['picsum'] + b['brotre']) < 20)),
+            15),
+    KeyRule('1.16 mixed spruce forest', (1,),
+            lambda b: ((b['picratio'] >= 40) & (b['picratio'] < 60)
+                       & ((b['picsum'] + b['brotre']) >= 20)),
+            16),
+    KeyRule('1.17 black spruce-tussock woodland', (13, 14, 15, 16),
+            lambda b: b['erivag'] >= 20,
+            17),
+    KeyRule('1.17 black spruce-tussock woodland', (13, 14, 15, 16),
+            lambda b: (b['erivag'] >= 15) & (b['ndshrub'] < 35),
+            17),
+    KeyRule('1.18 black spruce peatland', (13, 14, 15, 16),
+            lambda b: (b['picwet'] >= 8) & (b['ndsalix'] < 30),
+            18),
+    #### 2. DECIDUOUS FOREST
+    KeyRule('2.20 poplar forest', (2,),
+            lambda b: (b['populbt'] >= b['poptre']) & (b['populbt'] >= b['bettre']),
+            20),
+    KeyRule('2.21 aspen forest', (2,),
+            lambda b: (b['poptre'] >= b['populbt']) & (b['poptre'] >= b['bettre']),
+            21),
+    KeyRule('2.22 birch forest', (2,),
+            lambda b: (b['bettre'] >= b['populbt']) & (b['bettre'] >= b['poptre']),
+            22),
+    #### 3. SPRUCE - HARDWOOD FOREST & WOODLAND
+    KeyRule('3.30 white spruce-poplar forest & woodland', (3,),
+            lambda b: ((b['picratio'] >= 60)
+                       & (b['populbt'] >= b['poptre']) & (b['populbt'] >= b['bettre'])),
+            30),
+    KeyRule('3.30 white spruce-poplar forest & woodland', (3,),
+            lambda b: ((b['picratio'] >= 40) & (b['picratio'] < 60)
+                       & (b['populbt'] >= b['poptre']) & (b['populbt'] >= b['bettre'])),
+            30),
+    KeyRule('3.31 white spruce-aspen forest & woodland', (3,),
+            lambda b: ((b['picratio'] >= 60)
+                       & (b['poptre'] >= b['populbt']) & (b['poptre'] >= b['bettre'])),
+            31),
+    KeyRule('3.31 white spruce-aspen forest & woodland', (3,),
+            lambda b: ((b['picratio'] >= 40) & (b['picratio'] < 60)
+                       & (b['poptre'] >= b['populbt']) & (b['poptre'] >= b['bettre'])),
+            31),
+    KeyRule('3.32 white spruce-birch forest & woodland', (3,),
+            lambda b: ((b['picratio'] >= 60)
+                       & (b['bettre'] >= b['populbt']) & (b['bettre'] >= b['poptre'])),
+            32),
+    KeyRule('3.33 black spruce-deciduous forest & woodland', (3,),
+            lambda b: ((b['picratio'] < 40)
+                       & (b['populbt'] >= b['poptre']) & (b['populbt'] >= b['bettre'])),
+            33),
+    KeyRule('3.33 black spruce-deciduous forest & woodland', (3,),
+            lambda b: ((b['picratio'] < 40)
+                       & (b['poptre'] >= b['populbt']) & (b['poptre'] >= b['bettre'])),
+            33),
+    KeyRule('3.33 black spruce-deciduous forest & woodland', (3,),
+            lambda b: ((b['picratio'] < 40)
+                       & (b['bettre'] >= b['populbt']) & (b['bettre'] >= b['poptre'])),
+            33),
+    KeyRule('3.34 mixed spruce-birch forest & woodland', (3,),
+            lambda b: ((b['picratio'] >= 40) & (b['picratio'] < 60)
+                       & (b['bettre'] >= b['populbt']) & (b['bettre'] >= b['poptre'])),
+            34),
+    #### 8. TUSSOCK TUNDRA TYPES
+    KeyRule('8.40 tussock tundra low shrub', (0, 4, 5, 6, 7),
+            lambda b: b['erivag'] >= 20,
+            40),
+    KeyRule('8.40 tussock tundra low shrub', (0, 4, 5, 6, 7),
+            lambda b: (b['erivag'] >= 15) & (b['ndshrub'] < 35),
+            40),
+    KeyRule('8.41 tussock tundra dwarf shrub', (26,),
+            lambda b: b['ndshrub'] < 8,
+            41),
+    #### 4. SHRUB MESIC
+    KeyRule('4.50 alder mesic', (4,),
+            lambda b: ((b['alnus'] >= 12)
+                       & ((b['alnus'] * 10) > ((b['alnus'] + b['ndsalix']) * 3))),
+            50),
+    KeyRule('4.51 alder-willow mesic', (4, 50),
+            lambda b: (((b['alnus'] + b['ndsalix']) >= 12)
+                       & ((b['alnus'] * 10) > ((b['alnus'] + b['ndsalix']) * 3))
+                       & ((b['alnus'] * 10) <= ((b['alnus'] + b['ndsalix']) * 7))),
+            51),
+    KeyRule('4.52 willow mesic', (4,),
+            lambda b: ((b['ndsalix'] >= 10)
+                       & ((b['ndsalix'] * 10) > ((b['betshr'] + b['ndsalix']) * 3))),
+            52),
+    KeyRule('4.53 birch-willow mesic', (4, 52),
+            lambda b: (((b['betshr'] + b['ndsalix']) >= 12)
+                       & ((b['ndsalix'] * 10) > ((b['betshr'] + b['ndsalix']) * 3))
+                       & ((b['ndsalix'] * 10) <= ((b['betshr'] + b['ndsalix']) * 7))),
+            53),
+    KeyRule('4.54 birch shrub / birch-ericaceous mesic', (4,),
+            lambda b: ((b['betshr'] + b['eridwarf'] + b['vaculi']) >= 15) & (b['betshr'] >= 5),
+            54),
+    KeyRule('4.55 dwarf shrub-lichen', (4,),
+            lambda b: (((b['dsalix'] + b['dryas'] + b['eridwarf']) >= 15)
+                       & (b['lichen'] >= 20) & (b['height'] < 1) & (b['brotre'] < 5)),
+            55),
+    KeyRule('4.56 ericaceous dwarf shrub', (4,),
+            lambda b: (((b['dsalix'] + b['dryas'] + b['eridwarf']) >= 15)
+                       & (b['eridwarf'] >= 10)
+                       & ((b['eridwarf'] * 10) > ((b['eridwarf'] + b['dryas']) * 3))
+                       & (b['height'] < 1) & (b['brotre'] < 5)),
+            56),
+    KeyRule('4.57 dryas-ericaceous dwarf shrub', (4, 56),
+            lambda b: (((b['dsalix'] + b['dryas'] + b['eridwarf']) >= 15)
+                       & (b['dryas'] >= 10)
+                       & ((b['eridwarf'] * 10) > ((b['eridwarf'] + b['dryas']) * 3))
+                       & ((b['eridwarf'] * 10) <= ((b['eridwarf'] + b['dryas']) * 7))
+                       & (b['height'] < 1) & (b['brotre'] < 5)),
+            57),
+    KeyRule('4.58 dryas-dwarf willow', (4,),
+            lambda b: (((b['dsalix'] + b['dryas'] + b['eridwarf']) >= 15)
+                       & (b['dryas'] >= 10) & (b['height'] < 1) & (b['brotre'] < 5)),
+            58),
+    #### 5. SHRUB WET
+    KeyRule('5.60 shrub-sphagnum wet', (5,),
+            lambda b: b['sphagn'] >= 12,
+            60),
+    KeyRule('5.61 dwarf shrub-sphagnum wet', (60,),
+            lambda b: b['ndshrub'] < 15,
+            61),
+    KeyRule('5.62 alder-willow wet', (5,),
+            lambda b: b['alnus'] >= 10,
+            62),
+    KeyRule('5.63 willow wet', (5,),
+            lambda b: b['ndsalix'] >= 10,
+            63),
+    KeyRule('5.64 birch-willow wet', (5, 63),
+            lambda b: (b['betshr'] >= 10) & ((b['ndsalix'] * 2) < (b['betshr'] * 3)),
+            64),
+    #### 6. HERBACEOUS MESIC
+    KeyRule('6.70 Calamagrostis meadow mesic', (6,),
+            lambda b: b['mwcalama'] >= 8,
+            70),
+    KeyRule('6.71 forb-graminoid meadow mesic alkaline', (6,),
+            lambda b: b['alkaline'] == 1,
+            71),
+    KeyRule('6.72 forb-graminoid meadow mesic acidic', (6,),
+            lambda b: b['alkaline'] == 0,
+            72),
+    #### 7. HERBACEOUS WET
+    KeyRule('7.80 sedge meadow wet', (7,),
+            lambda b: b['wetsed'] >= 8,
+            80),
+    KeyRule('7.81 sedge-Calamagrostis meadow wet', (7, 80),
+            lambda b: (((b['out'] == 80) | ((b['wetland'] + b['mwcalama']) >= 12))
+                       & ((b['mwcalama'] * 10) > ((b['mwcalama'] + b['wetsed']) * 3))),
+            81),
+    KeyRule('7.82 forb-graminoid meadow wet', (7,),
+            None,
+            82),
+    #### CORRECTIONS
+    KeyRule('Apply corrections to willow wet', (0, 4, 5),
+            lambda b: (((b['brotre'] >= 3) | (b['poptre'] >= 3) | (b['ndsalix'] >= 3))
+                       & (b['wetland'] >= 5)),
+            63),
+    KeyRule('Apply corrections to birch-willow wet', (5,),
+            lambda b: b['betshr'] >= 3,
+            64),
+    KeyRule('Apply corrections to aspen forest', (0, 4),
+            lambda b: (((b['brotre'] >= 3) | (b['poptre'] >= 3) | (b['ndsalix'] >= 3))
+                       & (b['wetland'] < 5)
+                       & (b['poptre'] > b['ndsalix'])),
+            21),
+    KeyRule('Apply corrections to willow mesic', (0, 4),
+            lambda b: (((b['brotre'] >= 3) | (b['poptre'] >= 3) | (b['ndsalix'] >= 3))
+                       & (b['wetland'] < 5)),
+            52),
+    KeyRule('Apply corrections to birch-ericaceous mesic', (4,),
+            lambda b: b['betshr'] >= 3,
+            54),
+    #### 9. FIRE TYPES
+    KeyRule('9.90 burned', None,
+            lambda b: b['fire'] >= 2019,
+            90),
+    KeyRule('9.91 recent burn recovering birch-willow mesic', (52, 53),
+            lambda b: (b['fire'] >= 2000) & (b['fire'] < 2019),
+            91),
+    KeyRule('9.91 recent burn recovering birch-willow mesic', (0,),
+            lambda b: ((b['fire'] >= 2000) & (b['fire'] < 2019)
+                       & ((b['esa'] == 20) | (b['esa'] == 30))
+                       & (b['wetland'] < 5)),
+            91),
+    KeyRule('9.92 recent burn recovering birch-willow wet', (62, 63, 64),
+            lambda b: (b['fire'] >= 2000) & (b['fire'] < 2019),
+            92),
+    KeyRule('9.92 recent burn recovering birch-willow wet', (0,),
+            lambda b: ((b['fire'] >= 2000) & (b['fire'] < 2019)
+                       & ((b['esa'] == 20) | (b['esa'] == 30))
+                       & (b['wetland'] >= 5)),
+            92),
+    #### 10. FLOODPLAIN TYPES
+    KeyRule('10.100 white spruce active floodplain', (11, 12, 15, 16),
+            lambda b: b['flood'] == 1,
+            100),
+    KeyRule('10.101 poplar (white spruce) active floodplain', (20, 30),
+            lambda b: b['flood'] == 1,
+            101),
+    KeyRule('10.101 poplar (white spruce) active floodplain', (21,),
+            lambda b: (b['flood'] == 1) & ((b['populbt'] * 4) >= (b['poptre'] * 3)),
+            101),
+    KeyRule('10.102 birch (white spruce) active floodplain', (22, 32, 34),
+            lambda b: b['flood'] == 1,
+            102),
+    KeyRule('10.103 alder-willow active floodplain', (50, 51, 62),
+            lambda b: b['flood'] == 1,
+            103),
+    KeyRule('10.104 willow active floodplain', (52,),
+            lambda b: b['flood'] == 1,
+            104),
+    #### 12. SPARSE OR BARREN
+    KeyRule('12.97 Snow / ice', (0,),
+            lambda b: b['esa'] == 70,
+            97),
+]
+
+
+# Define a class that restricts layer arrays to a subset of pixels
+class PixelSubset:
+    """
+    Description: provides layer arrays restricted to the pixels selected by a rule guard, gathering each layer on
+    first access
+    Inputs: 'columns' -- a PixelColumns object for the active pixels of a block
+            'index' -- an array of positions within the active pixels or None for all active pixels
+            'out' -- the current classes of the active pixels
+    """
+
+    def __init__(self, columns, index, out):
+        self.columns = columns
+        self.index = index
+        self.out = out
+        self.cache = {}
+
+    def __getitem__(self, name):
+        if name not in self.cache:
+            column = self.out if name == 'out' else self.columns[name]
+            self.cache[name] = column if self.index is None else column[self.index]
+        return self.cache[name]
+
+
+# Define a class that gathers layer blocks at the active pixels
+class PixelColumns:
+    """
+    Description: provides one-dimensional arrays of each layer at the active pixels of a block, gathering each layer
+    on first access and widening uint8 cover layers to int16
+    Inputs: 'blocks' -- a mapping of layer names and block arrays
+            'active' -- an array of flat pixel positions within the block
+    """
+
+    def __init__(self, blocks, active):
+        self.blocks = blocks
+        self.active = active
+        self.cache = {}
+
+    def __getitem__(self, name):
+        if name not in self.cache:
+            self.cache[name] = widen_cover(self.blocks[name].reshape(-1)[self.active])
+        return self.cache[name]
+
+
+# Define a function to select the pixels allowed by a rule guard
+def select_guard(out, guard):
+    """
+    Description: finds the active pixels whose current class matches a rule guard
+    Inputs: 'out' -- the current classes of the active pixels
+            'guard' -- a tuple of classes or None for all pixels
+    Returned Value: Returns an array of positions or None when the guard allows all pixels
+    Preconditions: none
+    """
+
+    if guard is None:
+        return None
+    if len(guard) == 1:
+        return np.flatnonzero(out == guard[0])
+    return np.flatnonzero(np.isin(out, guard))
+
+
+# Define a function to match a rule on the active pixels
+def match_key_rule(rule, columns, out):
+    """
+    Description: evaluates a rule on the pixels allowed by its guard without assigning its code
+    Inputs: 'rule' -- a KeyRule
+            'columns' -- a PixelColumns object for the active pixels
+            'out' -- the current classes of the active pixels
+    Returned Value: Returns the positions of the active pixels that match the rule
+    Preconditions: none
+    """
+
+    # Restrict the rule to the guarded pixels
+    index = select_guard(out, rule.guard)
+    if index is not None and index.size == 0:
+        return index
+    # Evaluate the predicate on the guarded pixels
+    if rule.predicate is None:
+        return np.arange(out.size) if index is None else index
+    hit = rule.predicate(PixelSubset(columns, index, out))
+    return np.flatnonzero(hit) if index is None else index[hit]
+
+
+# Define a function to apply a rule to the active pixels
+def apply_key_rule(rule, columns, out):
+    """
+    Description: evaluates a rule on the pixels allowed by its guard and assigns its code in place
+    Inputs: 'rule' -- a KeyRule
+            'columns' -- a PixelColumns object for the active pixels
+            'out' -- the current classes of the active pixels, modified in place
+    Returned Value: Returns the positions of the active pixels that matched the rule
+    Preconditions: none
+    """
+
+    matched = match_key_rule(rule, columns, out)
+    out[matched] = rule.code
+    return matched
+
+
+# Define a function to apply a rule to the active pixels and record its effect
+def profile_key_rule(rule, columns, out):
+    """
+    Description: applies a rule like apply_key_rule and measures its evaluation time and class transitions
+    Inputs: 'rule' -- a KeyRule
+            'columns' -- a PixelColumns object for the active pixels
+            'out' -- the current classes of the active pixels, modified in place
+    Returned Value: Returns a dictionary of matched pixels, changed pixels, transitions from previous classes, and
+    evaluation seconds
+    Preconditions: none
+    """
+
+    start = time.perf_counter()
+    matched = match_key_rule(rule, columns, out)
+    previous = out[matched]
+    out[matched] = rule.code
+    seconds = time.perf_counter() - start
+    from_values, from_counts = np.unique(previous[previous != rule.code], return_counts=True)
+    return {'matched': int(matched.size),
+            'changed': int(from_counts.sum()),
+            'transitions': dict(zip(from_values.tolist(), from_counts.tolist())),
+            'seconds': seconds}
+
+
+# Define a function to parse foliar cover blocks to types with the rule table
+def parse_foliar_rules(area_block, blocks, nodata=-32768, rules=foliar_key_rules, overrides=foliar_key_overrides,
+                       profile=None):
+    """
+    Description: applies the programmatic key rule table to a block of foliar cover and ancillary data
+    Inputs: 'area_block' -- an array of the map domain where the domain has a value of 1
+            'blocks' -- a mapping of arrays for each layer in foliar_key_layers
+            'nodata' -- the no data value for the output
+            'rules' -- an ordered list of KeyRule
+            'overrides' -- an ordered list of KeyRule that finalize pixels before the rules are evaluated
+            'profile' -- a RuleProfile that accumulates the effect and time of each rule or None
+    Returned Value: Returns an int16 array of type codes with no data outside of the map domain
+    Preconditions: override predicates must not depend on the current classes; profiling does not change the types;
+    overrides are evaluated before the rules, so their profiled transitions only count pixels taken from an earlier
+    override and not the unassigned pixels they finalize
+    """
+
+    # Start from no data and identify the pixels in the map domain
+    out_block = np.full(area_block.shape, nodata, dtype='int16')
+    out_flat = out_block.reshape(-1)
+    active = np.flatnonzero(area_block.reshape(-1) == 1)
+    if active.size == 0:
+        return out_block
+
+    # Finalize the override classes and remove them from the active pixels
+    columns = PixelColumns(blocks, active)
+    final = np.zeros(active.size, dtype='int16')
+    override_records = []
+    for rule in overrides:
+        if profile is None:
+            apply_key_rule(rule, columns, final)
+        else:
+            # Exclude pixels that were unassigned from the transitions, because no rule has evaluated them yet
+            override_record = profile_key_rule(rule, columns, final)
+            override_record['changed'] -= override_record['transitions'].pop(0, 0)
+            override_records.append(override_record)
+    finalized = final != 0
+    if finalized.any():
+        out_flat[active[finalized]] = final[finalized]
+        active = active[~finalized]
+        columns = PixelColumns(blocks, active)
+
+    # Apply each rule to the pixels allowed by its guard
+    out = np.zeros(active.size, dtype='int16')
+    rule_records = []
+    for rule in rules:
+        if profile is None:
+            apply_key_rule(rule, columns, out)
+        else:
+            rule_records.append(profile_key_rule(rule, columns, out))
+    out_flat[active] = out
+
+    # Add the measurements of the block to the profile
+    if profile is not None:
+        profile.record_block(override_records, rule_records)
+
+    return out_block
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Input cube
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Input cube" packs aligned single-band rasters into tiled, pixel-interleaved multi-band rasters, one per storage type, so that a window of all layers is read with one call per storage type.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import json
+import os
+import numpy as np
+import rasterio
+from akutils import raster_block_progress
+from stratification_utils.build_manifest import BuildManifest
+from stratification_utils.build_manifest import file_signature
+from stratification_utils.processing_windows import tile_windows
+from stratification_utils.warped_views import open_layer_raster
+
+
+# Define the no data values of the storage types of input cubes
+cube_storage_nodata = {'uint8': 255}
+
+
+# Define a function to name the companion cube of a storage type
+def cube_companion_file(cube_output, dtype):
+    """
+    Description: derives the file path of the cube that stores the layers of a storage type next to the main cube
+    Inputs: 'cube_output' -- a file path to the main input cube
+            'dtype' -- the NumPy data type of the companion cube
+    Returned Value: Returns the file path of the companion cube
+    Preconditions: none
+    """
+
+    return os.path.splitext(cube_output)[0] + '_' + dtype + '.tif'
+
+
+# Define a function to build a multi-band input cube
+def build_input_cube(area_input, input_dictionary, cube_output, nodata=-32768, block_size=512, build_manifest=None):
+    """
+    Description: writes the map domain and a set of aligned layers to tiled, pixel-interleaved multi-band rasters,
+    keeping uint8 layers such as compact foliar cover in a uint8 companion cube
+    Inputs: 'area_input' -- a file path to the map domain raster, stored as the band named 'area'
+            'input_dictionary' -- a dictionary of layer names and raster or warped view file paths
+            'cube_output' -- a file path for the main multi-band output raster
+            'nodata' -- the no data value for the int16 cube
+            'block_size' -- the tile size of the output rasters in pixels, must be a multiple of 16
+            'build_manifest' -- a BuildManifest whose input signatures identify the layers or None to identify them
+            by file signature
+    Returned Value: Returns the list of band names in the order of the input dictionary; writes the cubes to disk
+    Preconditions: all input rasters must share the grid of the area raster; uint8 layers are stored as uint8 with no
+    data of 255 and all other layers must fit in int16; the main cube holds the int16 layers when there are any and
+    lists its companion cubes and the signature of each layer in its metadata, so readers only need the main cube path
+    and can detect layers that changed after the cube was built
+    """
+
+    # Define band order with the map domain first
+    band_names = ['area'] + list(input_dictionary.keys())
+    raster_dictionary = {'area': area_input}
+    raster_dictionary.update(input_dictionary)
+
+    # Open input rasters
+    input_rasters = {name: open_layer_raster(path) for name, path in raster_dictionary.items()}
+    output_rasters = {}
+    try:
+        # Group bands by storage type, storing the group with int16 layers in the main cube
+        group_dictionary = {}
+        for name in band_names:
+            dtype = 'uint8' if input_rasters[name].dtypes[0] == 'uint8' else 'int16'
+            group_dictionary.setdefault(dtype, []).append(name)
+        main_dtype = 'int16' if 'int16' in group_dictionary else 'uint8'
+        file_dictionary = {dtype: cube_output if dtype == main_dtype else cube_companion_file(cube_output, dtype)
+                           for dtype in group_dictionary}
+        # Define output profiles
+        width = input_rasters['area'].width
+        height = input_rasters['area'].height
+        for dtype, group_names in group_dictionary.items():
+            cube_profile = input_rasters['area'].profile.copy()
+            cube_profile.update(driver='GTiff',
+                                count=len(group_names),
+                                dtype=dtype,
+                                nodata=cube_storage_nodata.get(dtype, nodata),
+                                tiled=True,
+                                blockxsize=block_size,
+                                blockysize=block_size,
+                                interleave='pixel',
+                                compress='lzw',
+                                BIGTIFF='YES')
+            output_rasters[dtype] = rasterio.open(file_dictionary[dtype], 'w', **cube_profile)
+            output_rasters[dtype].descriptions = tuple(group_names)
+        companion_list = [os.path.basename(file_dictionary[dtype]) for dtype in group_dictionary
+                          if dtype != main_dtype]
+        output_rasters[main_dtype].update_tags(companion_cubes=json.dumps(companion_list))
+        # Record the signature of each layer and the manifest that resolves the signatures of built layers
+        if build_manifest is not None:
+            signature_dictionary = {name: build_manifest.input_signature(path)
+                                    for name, path in raster_dictionary.items()}
+            output_rasters[main_dtype].update_tags(
+                signature_manifest=json.dumps([os.path.abspath(build_manifest.manifest_file), build_manifest.checksum]))
+        else:
+            signature_dictionary = {name: file_signature(path) for name, path in raster_dictionary.items()}
+        output_rasters[main_dtype].update_tags(layer_signatures=json.dumps(signature_dictionary))
+        # Define windows that match the output tiles
+        window_list = tile_windows(width, height, block_size)
+        # Write all bands of each storage type in each tile at once
+        count = 1
+        progress = 0
+        for window in window_list:
+            for dtype, group_names in group_dictionary.items():
+                stack = np.empty((len(group_names), int(window.height), int(window.width)), dtype=dtype)
+                for position, name in enumerate(group_names):
+                    stack[position] = input_rasters[name].read(1, window=window, masked=False)
+                output_rasters[dtype].write(stack, window=window)
+            # Report progress
+            count, progress = raster_block_progress(10, len(window_list), count, progress)
+    finally:
+        for output_raster in output_rasters.values():
+            output_raster.close()
+        for input_raster in input_rasters.values():
+            input_raster.close()
+
+    return band_names
+
+
+# Define a function to list the companion cubes of an input cube
+def cube_companions(cube_input):
+    """
+    Description: lists the companion cubes that store the layers of other storage types with an input cube
+    Inputs: 'cube_input' -- a file path to the main input cube
+    Returned Value: Returns a list of file paths of the companion cubes
+    Preconditions: the cube must have been written by build_input_cube
+    """
+
+    with rasterio.open(cube_input) as cube_raster:
+        companion_list = json.loads(cube_raster.tags().get('companion_cubes', '[]'))
+    return [os.path.join(os.path.dirname(os.path.abspath(cube_input)), file_name) for file_name in companion_list]
+
+
+# Define a function to find the layers of an input cube that changed after it was built
+def stale_cube_layers(cube_input, input_dictionary):
+    """
+    Description: lists the layers whose rasters changed after an input cube stored them
+    Inputs: 'cube_input' -- a file path to the main input cube
+            'input_dictionary' -- a dictionary of layer names and the raster or warped view file paths that the cube
+            should store
+    Returned Value: Returns a list of the layer names whose current signature differs from the signature recorded in
+    the cube or that the cube stores without a signature
+    Preconditions: signatures are resolved with the build manifest that the cube was built with, so a layer that an
+    earlier stage rebuilt is stale even when the cube was written later
+    """
+
+    with rasterio.open(cube_input) as cube_raster:
+        cube_tags = cube_raster.tags()
+    signature_dictionary = json.loads(cube_tags.get('layer_signatures', '{}'))
+    if 'signature_manifest' in cube_tags:
+        manifest_file, checksum = json.loads(cube_tags['signature_manifest'])
+        signature_function = BuildManifest(manifest_file, checksum=checksum).input_signature
+    else:
+        signature_function = file_signature
+    return [name for name, input_file in input_dictionary.items()
+            if name not in signature_dictionary or signature_dictionary[name] != signature_function(input_file)]
+
+
+# Define a function to read the band names of an input cube
+def cube_band_dictionary(cube_raster):
+    """
+    Description: maps the layer names stored in the band descriptions of an input cube to band indices
+    Inputs: 'cube_raster' -- an open rasterio dataset of an input cube
+    Returned Value: Returns a dictionary of layer names and one-based band indices
+    Preconditions: the cube must have been written by build_input_cube
+    """
+
+    band_dictionary = {}
+    for index, description in enumerate(cube_raster.descriptions, start=1):
+        if description:
+            band_dictionary[description] = index
+    return band_dictionary
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Key profile
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Key profile" aggregates the pixels matched, the pixels changed with their class transitions, and the evaluation time of each rule of the programmatic key across blocks and writes them as CSV and JSON reports.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import csv
+import json
+import threading
+from stratification_utils.foliar_key_rules import foliar_key_overrides
+from stratification_utils.foliar_key_rules import foliar_key_rules
+
+
+# Define a class to aggregate rule measurements across blocks
+class RuleProfile:
+    """
+    Description: sums the measurements of each override and rule in table order across the blocks of a run
+    Inputs: 'rules' -- the ordered list of KeyRule evaluated by the key
+            'overrides' -- the ordered list of KeyRule that finalize pixels before the rules
+    Preconditions: blocks may be recorded from several worker threads; rules with the same label are reported
+    separately by their position in the table; overrides finalize pixels before any rule is evaluated, so their
+    changed pixels and transitions only count pixels taken from an earlier override
+    """
+
+    def __init__(self, rules=foliar_key_rules, overrides=foliar_key_overrides):
+        self.lock = threading.Lock()
+        self.block_count = 0
+        self.entries = []
+        for stage, rule_list in [('override', overrides), ('rule', rules)]:
+            for position, rule in enumerate(rule_list):
+                self.entries.append({'stage': stage,
+                                     'position': position,
+                                     'label': rule.label,
+                                     'guard': list(rule.guard) if rule.guard is not None else None,
+                                     'code': rule.code,
+                                     'matched': 0,
+                                     'changed': 0,
+                                     'seconds': 0.0,
+                                     'transitions': {}})
+        self.override_count = len(overrides)
+
+    def record_block(self, override_records, rule_records):
+        with self.lock:
+            self.block_count += 1
+            for entry, record in zip(self.entries[:self.override_count], override_records):
+                self.add_record(entry, record)
+            for entry, record in zip(self.entries[self.override_count:], rule_records):
+                self.add_record(entry, record)
+
+    @staticmethod
+    def add_record(entry, record):
+        entry['matched'] += record['matched']
+        entry['changed'] += record['changed']
+        entry['seconds'] += record['seconds']
+        for from_value, count in record['transitions'].items():
+            entry['transitions'][from_value] = entry['transitions'].get(from_value, 0) + count
+
+    def total_seconds(self):
+        return sum(entry['seconds'] for entry in self.entries)
+
+    def slowest(self, count=10):
+        # Return the entries with the largest cumulative evaluation time
+        return sorted(self.entries, key=lambda entry: entry['seconds'], reverse=True)[:count]
+
+    def write_csv(self, report_file):
+        # Write one row per rule with transitions formatted as from>to:count pairs
+        field_names = ['stage', 'position', 'label', 'guard', 'code', 'matched', 'changed', 'seconds', 'transitions']
+        with open(report_file, 'w', newline='') as report_stream:
+            writer = csv.DictWriter(report_stream, fieldnames=field_names)
+            writer.writeheader()
+            for entry in self.entries:
+                row = dict(entry)
+                row['guard'] = ' '.join(str(value) for value in entry['guard']) if entry['guard'] else ''
+                row['seconds'] = round(entry['seconds'], 6)
+                row['transitions'] = ';'.join(f'{from_value}>{entry["code"]}:{count}'
+                                              for from_value, count in sorted(entry['transitions'].items()))
+                writer.writerow(row)
+
+    def write_json(self, report_file):
+        # Write the block count, total time, and every entry with its transitions
+        report = {'blocks': self.block_count,
+                  'seconds': self.total_seconds(),
+                  'entries': [dict(entry, transitions=[{'from': from_value, 'to': entry['code'], 'pixels': count}
+                                                       for from_value, count in sorted(entry['transitions'].items())])
+                              for entry in self.entries]}
+        with open(report_file, 'w') as report_stream:
+            json.dump(report, report_stream, indent=2)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Key tuning
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Key tuning" draws a sample of pixels stratified by parsed type from all key layers into a compact columnar file and re-evaluates the programmatic key on the sample to estimate changes in type area when rules or thresholds change.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import os
+import numpy as np
+import rasterio
+from stratification_utils.class_histogram import raster_histogram
+from stratification_utils.class_histogram import read_histogram
+from stratification_utils.derived_indices import compile_derived_blocks
+from stratification_utils.derived_indices import derived_source_layers
+from stratification_utils.foliar_key import foliar_key_layers
+from stratification_utils.foliar_key_rules import foliar_key_overrides
+from stratification_utils.foliar_key_rules import foliar_key_rules
+from stratification_utils.foliar_key_rules import parse_foliar_rules
+from stratification_utils.layer_sources import LayerSource
+from stratification_utils.parallel_blocks import ThreadLocalHandles
+from stratification_utils.parallel_blocks import map_blocks
+from stratification_utils.processing_windows import split_domain_windows
+
+
+# Define a function to allocate a sample among types
+def sample_probabilities(histogram, sample_size=2000000, minimum_count=2000):
+    """
+    Description: allocates a sample among types in proportion to their area with a minimum count for rare types
+    Inputs: 'histogram' -- a ClassHistogram of the parsed types
+            'sample_size' -- the approximate total number of sampled pixels
+            'minimum_count' -- the smallest expected number of sampled pixels of each type
+    Returned Value: Returns a dictionary of types and their pixel selection probabilities
+    Preconditions: types with fewer pixels than the minimum count are sampled in full
+    """
+
+    values, counts = histogram.counts()
+    total = counts.sum()
+    probability_dictionary = {}
+    for value, count in zip(values.tolist(), counts.tolist()):
+        allocation = max(sample_size * count / total, minimum_count)
+        probability_dictionary[value] = min(1.0, allocation / count)
+    return probability_dictionary
+
+
+# Define a function to draw a stratified sample of the key layers
+def draw_key_sample(area_input, input_dictionary, baseline_input, sample_file, sample_size=2000000,
+                    minimum_count=2000, seed=0, worker_count=1, cube_input=None, cache_folder=None, block_size=None,
+                    derived_names=None):
+    """
+    Description: samples pixels of the map domain stratified by their parsed type and stores every key layer at the
+    sampled pixels as one column of a compact array file
+    Inputs: 'area_input' -- a file path to the map domain raster where the domain has a value of 1
+            'input_dictionary' -- a dictionary of layer names and raster or warped view file paths for the key layers
+            'baseline_input' -- a file path to the parsed types that define the strata
+            'sample_file' -- a file path for the uncompressed NumPy archive of sample columns
+            'sample_size' -- the approximate total number of sampled pixels
+            'minimum_count' -- the smallest expected number of sampled pixels of each type
+            'seed' -- the seed for the random number generator
+            'worker_count' -- the number of worker threads that read blocks
+            'cube_input' -- a file path to an input cube that stores some or all of the layers or None
+            'cache_folder' -- a working cache folder through which single-band rasters are read or None
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+            of the area raster
+            'derived_names' -- a list of derived indices that are calculated from the foliar cover blocks instead of
+            read from rasters, or None to read all derived indices
+    Returned Value: Returns a dictionary of sample columns; writes the sample file to disk
+    Preconditions: the sample is identical for any worker count because each block draws from its own seeded
+    generator, but it changes with the block size; each pixel carries the inverse of its selection probability as
+    its weight
+    """
+
+    # Allocate the sample among the parsed types
+    histogram = read_histogram(baseline_input)
+    if histogram is None:
+        histogram = raster_histogram(baseline_input)
+    probability_dictionary = sample_probabilities(histogram, sample_size, minimum_count)
+    probability_lookup = np.zeros(65536, dtype='float64')
+    for value, probability in probability_dictionary.items():
+        probability_lookup[value + 32768] = probability
+
+    # Define the layers read for each block, replacing calculated derived indices by their inputs
+    if derived_names:
+        derived_blocks = compile_derived_blocks(derived_names)[0]
+        layer_names = ['area', 'baseline'] + derived_source_layers(foliar_key_layers, derived_names)
+    else:
+        derived_blocks = None
+        layer_names = ['area', 'baseline'] + foliar_key_layers
+    source_dictionary = {'area': area_input, 'baseline': baseline_input}
+    source_dictionary.update(input_dictionary)
+    if cache_folder is not None:
+        LayerSource(source_dictionary, layer_names, cube_input, cache_folder).close()
+    thread_sources = ThreadLocalHandles(lambda: LayerSource(source_dictionary, layer_names,
+                                                            cube_input, cache_folder))
+
+    # Define the block function that selects pixels and gathers their layer values
+    def sample_block(window):
+        blocks = thread_sources.get().read(window)
+        baseline = blocks['baseline'].reshape(-1).astype('int32')
+        probability = probability_lookup[baseline + 32768]
+        probability[blocks['area'].reshape(-1) != 1] = 0
+        generator = np.random.default_rng([seed, int(window.row_off), int(window.col_off)])
+        selected = np.flatnonzero(generator.random(baseline.size) < probability)
+        columns = {name: blocks[name].reshape(-1)[selected] for name in layer_names if name != 'area'}
+        # Calculate derived indices only at the selected pixels
+        if derived_blocks is not None:
+            selected_blocks = derived_blocks(columns)
+            columns = {name: selected_blocks[name] for name in ['baseline'] + foliar_key_layers}
+        columns['weight'] = 1 / probability[selected]
+        return columns
+
+    # Gather sample columns block by block
+    window_list, empty_list, full_offsets = split_domain_windows(area_input, block_size)
+    with rasterio.open(area_input) as area_raster:
+        cell_area = abs(area_raster.transform.a * area_raster.transform.e)
+    column_lists = {}
+    try:
+        for window, columns in map_blocks(sample_block, window_list, worker_count):
+            for name, column in columns.items():
+                column_lists.setdefault(name, []).append(column)
+    finally:
+        thread_sources.close()
+    sample = {name: np.concatenate(column_list) for name, column_list in column_lists.items()}
+    sample['cell_area'] = np.array(cell_area)
+
+    # Write the sample columns without compression so that they load quickly
+    sample_folder = os.path.dirname(os.path.abspath(sample_file))
+    os.makedirs(sample_folder, exist_ok=True)
+    with open(sample_file, 'wb') as sample_stream:
+        np.savez(sample_stream, **sample)
+    return sample
+
+
+# Define a function to load a stratified sample of the key layers
+def load_key_sample(sample_file):
+    """
+    Description: reads the sample columns written by draw_key_sample
+    Inputs: 'sample_file' -- a file path to the NumPy archive of sample columns
+    Returned Value: Returns a dictionary of sample columns
+    Preconditions: none
+    """
+
+    with np.load(sample_file) as sample_archive:
+        return {name: sample_archive[name] for name in sample_archive.files}
+
+
+# Define a function to evaluate the key on a sample
+def evaluate_key_sample(sample, rules=foliar_key_rules, overrides=foliar_key_overrides, profile=None):
+    """
+    Description: applies a rule table to the sampled pixels
+    Inputs: 'sample' -- a dictionary of sample columns from draw_key_sample or load_key_sample
+            'rules' -- an ordered list of KeyRule, such as a copy of foliar_key_rules with revised predicates
+            'overrides' -- an ordered list of KeyRule that finalize pixels before the rules are evaluated
+            'profile' -- a RuleProfile that accumulates the effect and time of each rule or None
+    Returned Value: Returns an int16 array of types for the sampled pixels
+    Preconditions: all sampled pixels are in the map domain
+    """
+
+    area_block = np.ones(len(sample['weight']), dtype='uint8')
+    return parse_foliar_rules(area_block, sample, rules=rules, overrides=overrides, profile=profile)
+
+
+# Define a function to compare type areas between two evaluations of a sample
+def compare_key_sample(sample, tuned_types, baseline_types=None, label_dictionary=None):
+    """
+    Description: estimates the area of each type for the baseline and tuned key from the sample weights
+    Inputs: 'sample' -- a dictionary of sample columns
+            'tuned_types' -- the types of the sampled pixels from the tuned key
+            'baseline_types' -- the types of the sampled pixels from the baseline key or None for the parsed types
+            stored in the sample
+            'label_dictionary' -- a dictionary of types and labels or None
+    Returned Value: Returns a list of dictionaries with the baseline area, tuned area, and change in square kilometers
+    per type, sorted by the absolute change, and the share of the estimated area whose type changed
+    Preconditions: areas are estimates whose precision depends on the number of sampled pixels of each type; the
+    stored parsed types are the current key when the sample is redrawn after the parsed raster is rebuilt
+    """
+
+    if baseline_types is None:
+        baseline_types = sample['baseline']
+    weight = sample['weight'] * float(sample['cell_area']) / 1000000
+    values = np.union1d(np.unique(baseline_types), np.unique(tuned_types))
+    baseline_area = np.bincount(np.searchsorted(values, baseline_types), weights=weight, minlength=len(values))
+    tuned_area = np.bincount(np.searchsorted(values, tuned_types), weights=weight, minlength=len(values))
+    change_list = []
+    for position, value in enumerate(values.tolist()):
+        change = tuned_area[position] - baseline_area[position]
+        change_list.append({'type': value,
+                            'label': label_dictionary.get(value, '') if label_dictionary else '',
+                            'baseline_km2': float(baseline_area[position]),
+                            'tuned_km2': float(tuned_area[position]),
+                            'change_km2': float(change),
+                            'change_percent': float(100 * change / baseline_area[position])
+                            if baseline_area[position] > 0 else None})
+    change_list.sort(key=lambda row: abs(row['change_km2']), reverse=True)
+    changed_share = float(weight[baseline_types != tuned_types].sum() / weight.sum()) if weight.size > 0 else 0.0
+    return change_list, changed_share
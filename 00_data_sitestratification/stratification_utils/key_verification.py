@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Key verification
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Key verification" evaluates two implementations of the programmatic key on the same input layers block by block and accumulates the confusion between their types and the first mismatching pixels with their input values.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import csv
+import json
+import os
+import numpy as np
+import rasterio
+from stratification_utils.derived_indices import compile_derived_blocks
+from stratification_utils.derived_indices import derived_source_layers
+from stratification_utils.foliar_key import foliar_key_layers
+from stratification_utils.foliar_key_engines import select_key_engine
+from stratification_utils.foliar_key_engines import verify_key_engines
+from stratification_utils.layer_sources import LayerSource
+from stratification_utils.parallel_blocks import ThreadLocalHandles
+from stratification_utils.parallel_blocks import map_blocks
+from stratification_utils.processing_windows import split_domain_windows
+from stratification_utils.processing_windows import window_offset
+
+
+# Define a function to resolve a key implementation for verification
+def verification_engine(key_engine):
+    """
+    Description: returns the label and key function of a key implementation without falling back to another engine
+    Inputs: 'key_engine' -- the name of a key implementation in foliar_key_engines or a tuple of a label and a key
+            function with the arguments of parse_foliar_key
+    Returned Value: Returns a tuple of the label and key function
+    Preconditions: raises a RuntimeError if a named engine is not available, because a fallback would compare an
+    implementation to itself
+    """
+
+    if isinstance(key_engine, tuple):
+        return key_engine
+    selected_engine, key_function = select_key_engine(key_engine)
+    if selected_engine != key_engine:
+        raise RuntimeError(f'Key engine "{key_engine}" is not available for verification.')
+    return key_engine, key_function
+
+
+# Define a function to compare two key implementations over the map domain
+def compare_key_engines(area_input, input_dictionary, baseline_engine='reference', candidate_engine='rules',
+                        nodata=-32768, worker_count=1, cube_input=None, cache_folder=None, block_size=None,
+                        derived_names=None, mismatch_limit=100):
+    """
+    Description: parses every processing window of the map domain with a baseline and a candidate key implementation
+    and compares their types cell by cell
+    Inputs: 'area_input' -- a file path to the map domain raster where the domain has a value of 1
+            'input_dictionary' -- a dictionary of layer names and raster or warped view file paths for the key layers
+            'baseline_engine' -- the name of a key implementation or a tuple of a label and a key function that
+            defines the expected types
+            'candidate_engine' -- the name of a key implementation or a tuple of a label and a key function that is
+            verified
+            'nodata' -- the no data value passed to both key implementations
+            'worker_count' -- the number of worker threads that process blocks
+            'cube_input' -- a file path to an input cube that stores some or all of the layers or None
+            'cache_folder' -- a working cache folder through which single-band rasters are read or None
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+            of the area raster
+            'derived_names' -- a list of derived indices that are calculated from the foliar cover blocks of each
+            window instead of read from rasters, or None to read all derived indices
+            'mismatch_limit' -- the maximum number of mismatching pixels whose input values are recorded
+    Returned Value: Returns a dictionary with the engine labels, the number of cells in the map domain, the number of
+    mismatching cells, a confusion dictionary of baseline and candidate type pairs and cell counts, and a list of
+    the first mismatching pixels in window order with their row, column, coordinates, types, and input values
+    Preconditions: both implementations read the same blocks of each window; memory is bounded by four windows per
+    worker and the recorded mismatches, so the comparison runs on the full map domain
+    """
+
+    # Select the key implementations and verify compiled kernels against the reference key
+    baseline_label, baseline_function = verification_engine(baseline_engine)
+    candidate_label, candidate_function = verification_engine(candidate_engine)
+    if 'numba' in [baseline_label, candidate_label]:
+        verify_key_engines(['numba'])
+
+    # Define the layers read for each block, replacing calculated derived indices by their inputs
+    if derived_names:
+        derived_blocks = compile_derived_blocks(derived_names)[0]
+        layer_names = ['area'] + derived_source_layers(foliar_key_layers, derived_names)
+    else:
+        derived_blocks = None
+        layer_names = ['area'] + foliar_key_layers
+    source_dictionary = {'area': area_input}
+    source_dictionary.update(input_dictionary)
+    if cache_folder is not None:
+        LayerSource(source_dictionary, layer_names, cube_input, cache_folder).close()
+    thread_sources = ThreadLocalHandles(lambda: LayerSource(source_dictionary, layer_names,
+                                                            cube_input, cache_folder))
+
+    # Look up the processing windows that overlap the map domain and the transform of the grid
+    window_list, empty_list, full_offsets = split_domain_windows(area_input, block_size)
+    with rasterio.open(area_input) as area_raster:
+        transform = area_raster.transform
+
+    # Define the block function that parses a window with both implementations and summarizes the differences
+    def compare_block(window):
+        if window_offset(window) in full_offsets:
+            blocks = thread_sources.get().read(window, skip_names=('area',))
+            area_block = np.ones((1, int(window.height), int(window.width)), dtype='uint8')
+        else:
+            blocks = thread_sources.get().read(window)
+            area_block = blocks['area']
+        if derived_blocks is not None:
+            blocks = derived_blocks(blocks)
+        baseline_block = baseline_function(area_block, blocks, nodata).reshape(-1)
+        candidate_block = candidate_function(area_block, blocks, nodata).reshape(-1)
+        domain = area_block.reshape(-1) == 1
+        # Count matching cells per type and mismatching cells per pair of types
+        matched = domain & (baseline_block == candidate_block)
+        matched_values, matched_counts = np.unique(baseline_block[matched], return_counts=True)
+        mismatched = np.flatnonzero(domain & (baseline_block != candidate_block))
+        pair_values, pair_counts = np.unique(np.stack([baseline_block[mismatched], candidate_block[mismatched]]),
+                                             axis=1, return_counts=True)
+        confusion = {(value, value): count for value, count in zip(matched_values.tolist(), matched_counts.tolist())}
+        for (baseline_value, candidate_value), count in zip(pair_values.T.tolist(), pair_counts.tolist()):
+            confusion[(baseline_value, candidate_value)] = count
+        # Record the input values of the first mismatching cells of the window
+        mismatch_list = []
+        for position in mismatched[:mismatch_limit].tolist():
+            row = int(window.row_off) + position // int(window.width)
+            col = int(window.col_off) + position % int(window.width)
+            x, y = transform * (col + 0.5, row + 0.5)
+            mismatch_list.append({'row': row, 'col': col, 'x': x, 'y': y,
+                                  'baseline': int(baseline_block[position]),
+                                  'candidate': int(candidate_block[position]),
+                                  'inputs': {name: int(blocks[name].reshape(-1)[position])
+                                             for name in foliar_key_layers}})
+        return int(np.count_nonzero(domain)), int(mismatched.size), confusion, mismatch_list
+
+    # Accumulate the comparison in window order
+    comparison = {'baseline_engine': baseline_label,
+                  'candidate_engine': candidate_label,
+                  'cell_count': 0,
+                  'mismatch_count': 0,
+                  'confusion': {},
+                  'mismatches': []}
+    try:
+        for window, (cell_count, mismatch_count, confusion, mismatch_list) in map_blocks(compare_block, window_list,
+                                                                                         worker_count):
+            comparison['cell_count'] += cell_count
+            comparison['mismatch_count'] += mismatch_count
+            for pair, count in confusion.items():
+                comparison['confusion'][pair] = comparison['confusion'].get(pair, 0) + count
+            remaining = mismatch_limit - len(comparison['mismatches'])
+            comparison['mismatches'].extend(mismatch_list[:remaining])
+    finally:
+        thread_sources.close()
+    return comparison
+
+
+# Define a function to summarize the confusion between two key implementations per type
+def confusion_rows(comparison, label_dictionary=None):
+    """
+    Description: summarizes the confusion of a key comparison for each baseline type
+    Inputs: 'comparison' -- a dictionary returned by compare_key_engines
+            'label_dictionary' -- a dictionary of types and labels or None
+    Returned Value: Returns a list of dictionaries with the baseline cell count, matched cell count, and a dictionary
+    of candidate types and cell counts for the mismatching cells of each baseline type, sorted by type
+    Preconditions: none
+    """
+
+    row_dictionary = {}
+    for (baseline_value, candidate_value), count in comparison['confusion'].items():
+        row = row_dictionary.setdefault(baseline_value,
+                                        {'type': baseline_value,
+                                         'label': label_dictionary.get(baseline_value, '') if label_dictionary else '',
+                                         'baseline_count': 0,
+                                         'matched_count': 0,
+                                         'candidate_counts': {}})
+        row['baseline_count'] += count
+        if baseline_value == candidate_value:
+            row['matched_count'] += count
+        else:
+            row['candidate_counts'][candidate_value] = count
+    return [row_dictionary[value] for value in sorted(row_dictionary)]
+
+
+# Define a function to write a key comparison
+def write_key_comparison(comparison, output_folder, label_dictionary=None):
+    """
+    Description: writes the confusion matrix of a key comparison as a CSV table and the full comparison as JSON
+    Inputs: 'comparison' -- a dictionary returned by compare_key_engines
+            'output_folder' -- a folder for the output files
+            'label_dictionary' -- a dictionary of types and labels or None
+    Returned Value: Returns a tuple of the file paths of the confusion table and the comparison file
+    Preconditions: the confusion table has one row per baseline type and one column per candidate type
+    """
+
+    os.makedirs(output_folder, exist_ok=True)
+    prefix = f'key_comparison_{comparison["baseline_engine"]}_{comparison["candidate_engine"]}'
+    confusion_file = os.path.join(output_folder, prefix + '_confusion.csv')
+    comparison_file = os.path.join(output_folder, prefix + '.json')
+
+    # Write the confusion matrix with baseline types as rows and candidate types as columns
+    candidate_values = sorted({pair[1] for pair in comparison['confusion']})
+    with open(confusion_file, 'w', newline='') as confusion_stream:
+        writer = csv.writer(confusion_stream)
+        writer.writerow(['type', 'label'] + candidate_values)
+        for row in confusion_rows(comparison, label_dictionary):
+            writer.writerow([row['type'], row['label']]
+                            + [comparison['confusion'].get((row['type'], value), 0) for value in candidate_values])
+
+    # Write the comparison with the confusion as a list of pairs
+    output_comparison = dict(comparison)
+    output_comparison['confusion'] = [{'baseline': pair[0], 'candidate': pair[1], 'count': count}
+                                      for pair, count in sorted(comparison['confusion'].items())]
+    with open(comparison_file, 'w') as comparison_stream:
+        json.dump(output_comparison, comparison_stream, indent=2)
+    return confusion_file, comparison_file
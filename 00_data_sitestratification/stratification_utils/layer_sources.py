@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Layer sources
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Layer sources" reads blocks of named layers from input cubes and single-band rasters.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import os
+import threading
+import rasterio
+from stratification_utils.build_manifest import file_signature
+from stratification_utils.input_cube import cube_band_dictionary
+from stratification_utils.input_cube import cube_companions
+from stratification_utils.input_cube import stale_cube_layers
+from stratification_utils.warped_views import is_warped_view
+from stratification_utils.warped_views import open_layer_raster
+from stratification_utils.working_cache import open_cached_raster
+
+
+# Define the stale layers of input cubes found by earlier layer sources of the run
+stale_layer_cache = {}
+stale_layer_lock = threading.Lock()
+
+
+# Define a function to find the stale layers of an input cube once per run
+def cached_stale_layers(cube_input, input_dictionary):
+    """
+    Description: lists the stale layers of an input cube like stale_cube_layers, reusing the result while the cube and
+    the layer files are unchanged so that the worker threads of a run compare the signatures once
+    Inputs: 'cube_input' -- a file path to the main input cube
+            'input_dictionary' -- a dictionary of layer names and raster file paths
+    Returned Value: Returns a list of the stale layer names
+    Preconditions: the result is reused by size and modification time, so the cube and layers are compared again
+    when any of their files is rewritten
+    """
+
+    cache_key = (os.path.abspath(cube_input), str(file_signature(cube_input)),
+                 tuple((name, input_file, str(file_signature(input_file)))
+                       for name, input_file in sorted(input_dictionary.items())))
+    with stale_layer_lock:
+        if cache_key not in stale_layer_cache:
+            stale_layer_cache[cache_key] = stale_cube_layers(cube_input, input_dictionary)
+        return stale_layer_cache[cache_key]
+
+
+# Define a class to read blocks of named layers
+class LayerSource:
+    """
+    Description: reads windows of named layers, taking layers stored in an input cube and its companion cubes from
+    one read per cube and all other layers, including layers that changed after the cube was built, from their own
+    rasters
+    Inputs: 'input_dictionary' -- a dictionary of layer names and raster file paths
+            'layer_names' -- a list of the layer names to read
+            'cube_input' -- a file path to a main input cube or None to read every layer from its own raster
+            'cache_folder' -- a working cache folder through which single-band rasters are read or None
+    Preconditions: a LayerSource must only be used by one thread; the first LayerSource for a cache folder should be
+    created before worker threads so that missing cache entries are created once; warped views are always read
+    directly so that they are not copied into the cache at 10 m; layers keep the storage type of their cube
+    """
+
+    def __init__(self, input_dictionary, layer_names, cube_input=None, cache_folder=None):
+        self.layer_names = list(layer_names)
+        self.cube_rasters = []
+        self.cube_names = []
+        self.cube_layers = []
+        self.stale_names = []
+        # Assign layers stored in the cubes to one read per cube, except layers whose rasters changed
+        if cube_input is not None:
+            self.stale_names = cached_stale_layers(cube_input, {name: input_dictionary[name]
+                                                                for name in self.layer_names})
+            for cube_file in [cube_input] + cube_companions(cube_input):
+                cube_raster = rasterio.open(cube_file)
+                band_dictionary = cube_band_dictionary(cube_raster)
+                names = [name for name in self.layer_names if name in band_dictionary
+                         and name not in self.cube_names and name not in self.stale_names]
+                if len(names) == 0:
+                    cube_raster.close()
+                    continue
+                self.cube_rasters.append(cube_raster)
+                self.cube_layers.append((names, [band_dictionary[name] for name in names]))
+                self.cube_names.extend(names)
+        # Open single-band rasters for the remaining layers
+        self.rasters = {}
+        for name in self.layer_names:
+            if name not in self.cube_names:
+                if cache_folder is None or is_warped_view(input_dictionary[name]):
+                    self.rasters[name] = open_layer_raster(input_dictionary[name])
+                else:
+                    self.rasters[name] = open_cached_raster(input_dictionary[name], cache_folder)
+
+    def read(self, window, skip_names=()):
+        # Read every layer except the skipped layers
+        blocks = {}
+        # Read the layers of each cube with one call and return views of each band
+        for cube_raster, (names, indexes) in zip(self.cube_rasters, self.cube_layers):
+            cube_names = [name for name in names if name not in skip_names]
+            if len(cube_names) == 0:
+                continue
+            cube_indexes = [index for name, index in zip(names, indexes) if name in cube_names]
+            stack = cube_raster.read(cube_indexes, window=window, masked=False)
+            for position, name in enumerate(cube_names):
+                blocks[name] = stack[position:position + 1]
+        # Read remaining layers
+        for name, raster in self.rasters.items():
+            if name not in skip_names:
+                blocks[name] = raster.read(window=window, masked=False)
+        return blocks
+
+    def close(self):
+        for cube_raster in self.cube_rasters:
+            cube_raster.close()
+        for raster in self.rasters.values():
+            raster.close()
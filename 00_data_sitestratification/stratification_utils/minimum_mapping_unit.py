@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Minimum mapping unit
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Minimum mapping unit" removes contiguous areas of a type that are smaller than the minimum mapping unit and replaces them with the nearest retained type using NumPy and SciPy instead of arcpy.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import numpy as np
+from scipy import ndimage
+
+# Define types that are never retained as regions and are replaced by the nearest retained type
+mmu_excluded_values = [0, 1, 2, 3, 4, 5, 6, 7, 95, 96, 97, 98]
+
+# Define linear feature types that are restored after the replacement
+mmu_restored_values = [95, 96, 97, 98]
+
+# Define the smallest number of cells in a retained region
+mmu_minimum_count = 5
+
+
+# Define a function to identify cells of retained regions
+def retained_regions(class_array, nodata=-32768, minimum_count=mmu_minimum_count,
+                     excluded_values=mmu_excluded_values):
+    """
+    Description: labels 8-connected regions of equal type and flags the cells of regions that meet the minimum count
+    Inputs: 'class_array' -- a two-dimensional array of types
+            'nodata' -- the no data value of the types
+            'minimum_count' -- the smallest number of cells in a retained region
+            'excluded_values' -- a list of types whose regions are never retained
+    Returned Value: Returns a boolean array that is True for cells of retained regions
+    Preconditions: equivalent to RegionGroup with EIGHT and WITHIN followed by ExtractByAttributes with COUNT greater
+    than minimum_count - 1 and SetNull of the excluded values
+    """
+
+    structure = np.ones((3, 3), dtype=bool)
+    retained = np.zeros(class_array.shape, dtype=bool)
+    class_values = np.unique(class_array)
+    for value in class_values:
+        if value == nodata or value in excluded_values:
+            continue
+        # Label regions of the type and count the cells in each region
+        region_array, region_count = ndimage.label(class_array == value, structure=structure)
+        region_sizes = np.bincount(region_array.ravel(), minlength=region_count + 1)
+        keep_regions = region_sizes >= minimum_count
+        keep_regions[0] = False
+        retained |= keep_regions[region_array]
+    return retained
+
+
+# Define a function to replace cells with the nearest retained value
+def nibble_array(class_array, retained):
+    """
+    Description: replaces each cell that is not retained with the value of the nearest retained cell
+    Inputs: 'class_array' -- a two-dimensional array of types
+            'retained' -- a boolean array that is True for cells whose values are kept and may be used as replacements
+    Returned Value: Returns a new array of types
+    Preconditions: equivalent to Nibble with DATA_ONLY and PROCESS_NODATA when retained cells all contain data;
+    distances are Euclidean between cell centers and ties may resolve to a different neighbor than arcpy
+    """
+
+    if retained.all() or not retained.any():
+        return class_array.copy()
+    nearest_index = ndimage.distance_transform_edt(~retained, return_distances=False, return_indices=True)
+    return class_array[nearest_index[0], nearest_index[1]]
+
+
+# Define a function to enforce the minimum mapping unit on an array
+def enforce_mmu_array(class_array, area_array, nodata=-32768, minimum_count=mmu_minimum_count,
+                      excluded_values=mmu_excluded_values, restored_values=mmu_restored_values, retained=None):
+    """
+    Description: removes regions smaller than the minimum mapping unit, replaces them with the nearest retained type,
+    restores linear features, and extracts the result to the map domain
+    Inputs: 'class_array' -- a two-dimensional array of types
+            'area_array' -- a two-dimensional array of the map domain where the domain has a value of 1
+            'nodata' -- the no data value of the types
+            'minimum_count' -- the smallest number of cells in a retained region
+            'excluded_values' -- a list of types whose regions are never retained
+            'restored_values' -- a list of types restored from the input after the replacement
+            'retained' -- a boolean array of retained cells or None to label regions of the class array
+    Returned Value: Returns an int16 array of revised types
+    Preconditions: the arrays must share a grid
+    """
+
+    if retained is None:
+        retained = retained_regions(class_array, nodata, minimum_count, excluded_values)
+    revised_array = nibble_array(class_array, retained)
+    return restore_extract_array(class_array, revised_array, area_array, nodata, restored_values)
+
+
+# Define a function to restore linear features and extract replaced types to the map domain
+def restore_extract_array(class_array, revised_array, area_array, nodata=-32768, restored_values=mmu_restored_values):
+    """
+    Description: restores linear features from the input types and sets cells outside the map domain to no data
+    Inputs: 'class_array' -- a two-dimensional array of input types
+            'revised_array' -- a two-dimensional array of replaced types
+            'area_array' -- a two-dimensional array of the map domain where the domain has a value of 1
+            'nodata' -- the no data value of the types
+            'restored_values' -- a list of types restored from the input after the replacement
+    Returned Value: Returns an int16 array of revised types
+    Preconditions: the arrays must share a grid, which may be a tile of the raster
+    """
+
+    revised_array = np.where(np.isin(class_array, restored_values), class_array, revised_array)
+    revised_array = np.where(area_array != 1, nodata, revised_array)
+    return revised_array.astype('int16', copy=False)
+
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Parallel blocks
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Parallel blocks" provides per-thread data handles and an ordered thread pool map over raster block windows.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Define a class to hold data handles for each worker thread
+class ThreadLocalHandles:
+    """
+    Description: opens a separate data handle in each thread that requests one
+    Inputs: 'open_function' -- a function without arguments that returns a handle with a close method
+    Preconditions: rasterio datasets must not be shared between threads, so each worker calls get() for its own handle
+    """
+
+    def __init__(self, open_function):
+        self.open_function = open_function
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.opened = []
+
+    def get(self):
+        handle = getattr(self.local, 'handle', None)
+        if handle is None:
+            handle = self.open_function()
+            self.local.handle = handle
+            with self.lock:
+                self.opened.append(handle)
+        return handle
+
+    def close(self):
+        with self.lock:
+            for handle in self.opened:
+                handle.close()
+            self.opened = []
+
+
+# Define a function to map a block function over windows in a thread pool
+def map_blocks(block_function, window_list, worker_count=1, max_pending=None):
+    """
+    Description: applies a function to each window and yields the results in window order
+    Inputs: 'block_function' -- a function that accepts a window and returns the processed block
+            'window_list' -- a list of rasterio windows
+            'worker_count' -- the number of worker threads; 1 processes windows serially in the calling thread
+            'max_pending' -- the maximum number of windows submitted ahead of the writer, defaults to four per worker
+    Returned Value: Yields tuples of window and result in the order of the window list
+    Preconditions: block functions run concurrently and must only use per-thread raster handles
+    """
+
+    # Process serially when a single worker is requested
+    if worker_count <= 1:
+        for window in window_list:
+            yield window, block_function(window)
+        return
+
+    # Bound the number of finished blocks held in memory
+    if max_pending is None:
+        max_pending = worker_count * 4
+
+    # Submit windows to the pool and release results in order
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        pending = deque()
+        for window in window_list:
+            pending.append((window, executor.submit(block_function, window)))
+            if len(pending) >= max_pending:
+                next_window, future = pending.popleft()
+                yield next_window, future.result()
+        while len(pending) > 0:
+            next_window, future = pending.popleft()
+            yield next_window, future.result()
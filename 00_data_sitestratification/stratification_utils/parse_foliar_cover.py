@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Parse foliar cover
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Parse foliar cover" is a function that applies the programmatic key to all raster blocks and writes the parsed types with their class histogram and statistics.
+# ---------------------------------------------------------------------------
+
+# Import packages
+from functools import partial
+import numpy as np
+import rasterio
+from akutils import raster_block_progress
+from stratification_utils.class_histogram import ClassHistogram
+from stratification_utils.class_histogram import write_histogram
+from stratification_utils.derived_indices import compile_derived_blocks
+from stratification_utils.derived_indices import derived_source_layers
+from stratification_utils.foliar_key import foliar_key_layers
+from stratification_utils.foliar_key_engines import select_key_engine
+from stratification_utils.foliar_key_engines import verify_key_engines
+from stratification_utils.layer_sources import LayerSource
+from stratification_utils.parallel_blocks import ThreadLocalHandles
+from stratification_utils.parallel_blocks import map_blocks
+from stratification_utils.processing_windows import nodata_block
+from stratification_utils.processing_windows import split_domain_windows
+from stratification_utils.processing_windows import window_offset
+
+
+# Define a function to parse foliar cover rasters to types
+def parse_foliar_cover(area_input, input_dictionary, output_file, nodata=-32768, worker_count=1,
+                       key_engine='rules', cube_input=None, cache_folder=None, profile=None, block_size=None,
+                       derived_names=None):
+    """
+    Description: parses foliar cover and ancillary rasters to types block by block, optionally in parallel
+    Inputs: 'area_input' -- a file path to the map domain raster where the domain has a value of 1
+            'input_dictionary' -- a dictionary of layer names and raster or warped view file paths for the key layers
+            'output_file' -- a file path for the parsed output raster
+            'nodata' -- the no data value for the output raster
+            'worker_count' -- the number of worker threads that process blocks
+            'key_engine' -- the name of the key implementation in foliar_key_engines
+            'cube_input' -- a file path to an input cube that stores some or all of the layers or None
+            'cache_folder' -- a working cache folder through which single-band rasters are read or None
+            'profile' -- a RuleProfile that accumulates the effect and time of each rule or None
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+            of the area raster
+            'derived_names' -- a list of derived indices that are calculated from the foliar cover blocks of each
+            window instead of read from rasters, or None to read all derived indices
+    Returned Value: Returns the ClassHistogram of the parsed types; writes the parsed raster with band statistics and
+    its histogram sidecar to disk
+    Preconditions: all input rasters must share the grid of the area raster; output is identical for any worker count
+    and block size; blocks outside of the map domain are written as no data without reading the inputs, and the area
+    raster is not read for blocks inside of the map domain
+    """
+
+    # Select the key implementation and verify compiled kernels against the reference key
+    if profile is not None and key_engine != 'rules':
+        print('\tRule profiling requires the rule table; using the rules key engine.')
+        key_engine = 'rules'
+    key_engine, key_function = select_key_engine(key_engine)
+    if key_engine == 'numba':
+        verify_key_engines([key_engine])
+    if profile is not None:
+        key_function = partial(key_function, profile=profile)
+
+    # Define the layers read for each block, replacing calculated derived indices by their inputs
+    if derived_names:
+        derived_blocks = compile_derived_blocks(derived_names)[0]
+        layer_names = ['area'] + derived_source_layers(foliar_key_layers, derived_names)
+    else:
+        derived_blocks = None
+        layer_names = ['area'] + foliar_key_layers
+    source_dictionary = {'area': area_input}
+    source_dictionary.update(input_dictionary)
+    thread_sources = ThreadLocalHandles(lambda: LayerSource(source_dictionary, layer_names,
+                                                            cube_input, cache_folder))
+
+    # Create any missing cache entries before worker threads open them
+    if cache_folder is not None:
+        LayerSource(source_dictionary, layer_names, cube_input, cache_folder).close()
+
+    # Look up the processing windows and their coverage of the map domain
+    window_list, empty_list, full_offsets = split_domain_windows(area_input, block_size)
+
+    # Define the block function executed by each worker
+    def parse_block(window):
+        if window_offset(window) in full_offsets:
+            blocks = thread_sources.get().read(window, skip_names=('area',))
+            area_block = np.ones((1, int(window.height), int(window.width)), dtype='uint8')
+        else:
+            blocks = thread_sources.get().read(window)
+            area_block = blocks['area']
+        if derived_blocks is not None:
+            blocks = derived_blocks(blocks)
+        return key_function(area_block, blocks, nodata)
+
+    # Prepare output profile from the white spruce raster
+    with rasterio.open(input_dictionary['picgla']) as template_raster:
+        input_profile = template_raster.profile.copy()
+    input_profile.update(dtype='int16', nodata=nodata)
+
+    # Write parsed blocks in window order as workers finish them
+    try:
+        histogram = write_parsed_raster(output_file, input_profile, empty_list, len(window_list),
+                                        map_blocks(parse_block, window_list, worker_count))
+    finally:
+        thread_sources.close()
+    return histogram
+
+
+# Define a function to write a stream of parsed blocks
+def write_parsed_raster(output_file, output_profile, empty_list, window_count, block_stream):
+    """
+    Description: writes parsed blocks as they arrive, fills windows outside of the map domain with no data, and counts
+    types as they are written
+    Inputs: 'output_file' -- a file path for the parsed output raster
+            'output_profile' -- a rasterio profile of an int16 raster on the grid of the map domain
+            'empty_list' -- a list of windows that contain no cells of the map domain
+            'window_count' -- the number of windows in the block stream, used to report progress
+            'block_stream' -- an iterable of tuples of window and parsed block, such as the results of map_blocks
+    Returned Value: Returns the ClassHistogram of the parsed types; writes the parsed raster with band statistics and
+    its histogram sidecar to disk
+    Preconditions: the writer holds one block at a time, so memory is bounded by the blocks that the stream processes
+    ahead of it
+    """
+
+    nodata = output_profile['nodata']
+    histogram = ClassHistogram(nodata)
+    with rasterio.open(output_file, 'w', **output_profile, BIGTIFF='YES') as dst:
+        count = 1
+        progress = 0
+        for window in empty_list:
+            dst.write(nodata_block(window, nodata, 'int16'), window=window)
+        for window, out_block in block_stream:
+            dst.write(out_block, window=window)
+            histogram.update(out_block)
+            # Report progress
+            count, progress = raster_block_progress(100, window_count, count, progress)
+        dst.update_tags(1, **histogram.statistics_tags(dst.width * dst.height))
+
+    # Store the histogram for post-processing
+    write_histogram(histogram, output_file)
+    return histogram
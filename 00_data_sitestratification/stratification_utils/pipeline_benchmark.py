@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Pipeline benchmark
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+. The preparation and streaming stages require the GDAL Python bindings and the minimum mapping unit stage requires SciPy; stages whose dependencies are missing are skipped.
+# Description: "Pipeline benchmark" writes synthetic, aligned EPSG:3338 inputs with patchy cover and a ragged map domain and measures the wall time, throughput, peak memory, and bytes read and written of each stage of the site stratification on them.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import json
+import math
+import os
+import time
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.warp import transform_bounds
+from stratification_utils.calculate_derived_rasters import calculate_derived_rasters
+from stratification_utils.derived_indices import derived_registry
+from stratification_utils.foliar_key_numba import numba_available
+from stratification_utils.parse_foliar_cover import parse_foliar_cover
+from stratification_utils.processing_windows import grid_windows
+from stratification_utils.warped_views import warped_view_file
+from stratification_utils.warped_views import write_warped_view
+
+# Define synthetic foliar cover layers
+# Each entry lists the share of patches where the taxon is present and the mean cover in those patches.
+synthetic_cover = {'alnus': (0.35, 15), 'betshr': (0.5, 15), 'bettre': (0.3, 20), 'brotre': (0.35, 20),
+                   'dryas': (0.1, 8), 'dsalix': (0.15, 8), 'empnig': (0.3, 8), 'erivag': (0.3, 12),
+                   'mwcalama': (0.25, 10), 'ndsalix': (0.35, 12), 'nerishr': (0.4, 10), 'picgla': (0.4, 20),
+                   'picmar': (0.6, 30), 'poptre': (0.2, 20), 'populbt': (0.15, 20), 'rhoshr': (0.4, 12),
+                   'sphagn': (0.5, 25), 'vaculi': (0.45, 12), 'vacvit': (0.5, 10), 'wetsed': (0.35, 15),
+                   'lichen': (0.3, 10), 'gramin': (0.4, 12), 'forb': (0.35, 6)}
+
+# Define synthetic ancillary layers
+# Each entry lists the values of the layer and their probabilities.
+synthetic_ancillary = {'height': (list(range(16)), None),
+                       'esa': ([10, 20, 30, 40, 50, 60, 70, 80, 90],
+                               [0.45, 0.2, 0.1, 0.02, 0.01, 0.04, 0.01, 0.12, 0.05]),
+                       'esri': ([0, 1, 2, 5], [0.4, 0.05, 0.3, 0.25]),
+                       'fire': ([0, 1960, 1980, 1990, 2005, 2015, 2020], [0.6, 0.05, 0.05, 0.05, 0.1, 0.1, 0.05]),
+                       'flood': ([0, 1], [0.85, 0.15]),
+                       'alkaline': ([0, 1], [0.95, 0.05]),
+                       'correction': ([0, 1], [0.97, 0.03])}
+
+# Define the 30 m layers that are stored in ESRI:102001 and read through warped views
+synthetic_coarse_layers = ['lichen', 'gramin', 'forb']
+
+# Define the edge length of synthetic patches in cells
+patch_size = 16
+
+
+# Define a function to create a block of the ragged map domain
+def synthetic_domain(row_off, rows, width, height, seed=0):
+    """
+    Description: creates rows of a map domain shaped as a lobed region with small holes
+    Inputs: 'row_off' -- the first row of the block
+            'rows' -- the number of rows of the block
+            'width' -- the number of columns of the raster
+            'height' -- the number of rows of the raster
+            'seed' -- the seed for the random number generator
+    Returned Value: Returns a uint8 array where the domain has a value of 1
+    Preconditions: row_off must be a multiple of the patch size
+    """
+
+    # Define a lobed boundary around the center of the raster
+    row_grid, col_grid = np.meshgrid(np.arange(row_off, row_off + rows) - height / 2,
+                                     np.arange(width) - width / 2, indexing='ij')
+    angle = np.arctan2(row_grid, col_grid)
+    radius = 0.45 * min(width, height) * (1 + 0.15 * np.sin(5 * angle) + 0.1 * np.sin(11 * angle + 1)
+                                          + 0.05 * np.sin(23 * angle + 2))
+    area_block = (np.hypot(row_grid, col_grid) < radius).astype('uint8')
+    # Remove small patches as lakes
+    generator = np.random.default_rng([seed, 0, row_off])
+    lake_block = generator.random((math.ceil(rows / patch_size), math.ceil(width / patch_size))) < 0.03
+    lake_block = np.repeat(np.repeat(lake_block, patch_size, axis=0), patch_size, axis=1)[:rows, :width]
+    area_block[lake_block] = 0
+    return area_block
+
+
+# Define a function to create a block of a synthetic layer
+def synthetic_layer(name, row_off, rows, width, seed=0, layer_patch=patch_size):
+    """
+    Description: creates rows of a synthetic layer with values that are constant in patches apart from fine noise
+    Inputs: 'name' -- a layer name from synthetic_cover or synthetic_ancillary
+            'row_off' -- the first row of the block
+            'rows' -- the number of rows of the block
+            'width' -- the number of columns of the raster
+            'seed' -- the seed for the random number generator
+            'layer_patch' -- the edge length of patches in cells
+    Returned Value: Returns an int16 array of layer values
+    Preconditions: row_off must be a multiple of the patch size
+    """
+
+    layer_names = list(synthetic_cover.keys()) + list(synthetic_ancillary.keys())
+    generator = np.random.default_rng([seed, layer_names.index(name) + 1, row_off])
+    patch_shape = (math.ceil(rows / layer_patch), math.ceil(width / layer_patch))
+    if name in synthetic_cover:
+        presence, mean = synthetic_cover[name]
+        patch_block = np.where(generator.random(patch_shape) < presence, generator.gamma(2, mean / 2, patch_shape), 0)
+    else:
+        values, probabilities = synthetic_ancillary[name]
+        patch_block = generator.choice(values, patch_shape, p=probabilities)
+    layer_block = np.repeat(np.repeat(patch_block, layer_patch, axis=0), layer_patch, axis=1)[:rows, :width]
+    if name in synthetic_cover:
+        layer_block = np.clip(np.rint(layer_block * generator.uniform(0.7, 1.3, layer_block.shape)), 0, 100)
+    return layer_block.astype('int16')
+
+
+# Define a function to write synthetic inputs
+def write_synthetic_inputs(input_folder, width, height, seed=0, strip_height=512):
+    """
+    Description: writes a map domain, prepared 10 m layers, and 30 m sources with warped views on a synthetic grid
+    Inputs: 'input_folder' -- a folder for the synthetic rasters
+            'width' -- the number of columns of the map domain
+            'height' -- the number of rows of the map domain
+            'seed' -- the seed for the random number generator
+            'strip_height' -- the number of rows generated at once, which must be a multiple of the patch size
+    Returned Value: Returns a dictionary with the file path of the map domain, a dictionary of layer names and
+    prepared raster or warped view file paths, and a dictionary of layer names and unprepared source file paths
+    with their coordinate reference systems
+    Preconditions: inputs are reused when a previous run wrote them with the same settings; memory is bounded by one
+    strip of all layers
+    """
+
+    # Reuse inputs written with the same settings
+    settings = {'width': width, 'height': height, 'seed': seed, 'strip_height': strip_height}
+    settings_file = os.path.join(input_folder, 'synthetic_inputs.json')
+    area_input = os.path.join(input_folder, 'area_10m_3338.tif')
+    layer_dictionary = {}
+    source_dictionary = {}
+    for name in list(synthetic_cover.keys()) + list(synthetic_ancillary.keys()):
+        layer_file = os.path.join(input_folder, name + '_10m_3338.tif')
+        if name in synthetic_coarse_layers:
+            source_file = os.path.join(input_folder, name + '_30m_102001.tif')
+            layer_dictionary[name] = warped_view_file(layer_file)
+            source_dictionary[name] = (source_file, 'ESRI:102001')
+        else:
+            layer_dictionary[name] = layer_file
+            source_dictionary[name] = (layer_file, 'EPSG:3338')
+    inputs = {'area': area_input, 'layers': layer_dictionary, 'sources': source_dictionary}
+    if os.path.exists(settings_file):
+        with open(settings_file, 'r') as settings_stream:
+            if json.load(settings_stream) == settings:
+                return inputs
+    os.makedirs(input_folder, exist_ok=True)
+
+    # Define the grid of the map domain in EPSG:3338
+    transform = from_origin(300000, 1700000, 10, 10)
+    profile = {'driver': 'GTiff', 'width': width, 'height': height, 'count': 1, 'crs': 'EPSG:3338',
+               'transform': transform, 'compress': 'lzw', 'BIGTIFF': 'YES'}
+
+    # Write the map domain and the prepared 10 m layers in strips, with no data outside of the map domain
+    layer_rasters = {}
+    try:
+        area_raster = rasterio.open(area_input, 'w', dtype='uint8', tiled=True, blockxsize=256, blockysize=256,
+                                    **profile)
+        layer_rasters['area'] = area_raster
+        for name, layer_file in layer_dictionary.items():
+            if name in synthetic_cover and name not in synthetic_coarse_layers:
+                layer_rasters[name] = rasterio.open(layer_file, 'w', dtype='uint8', nodata=255, **profile)
+            elif name in synthetic_ancillary:
+                layer_rasters[name] = rasterio.open(layer_file, 'w', dtype='int16', nodata=-32768, **profile)
+        for row_off in range(0, height, strip_height):
+            rows = min(strip_height, height - row_off)
+            window = rasterio.windows.Window(0, row_off, width, rows)
+            area_block = synthetic_domain(row_off, rows, width, height, seed)
+            area_raster.write(area_block, 1, window=window)
+            for name, layer_raster in layer_rasters.items():
+                if name == 'area':
+                    continue
+                layer_block = synthetic_layer(name, row_off, rows, width, seed)
+                layer_block = np.where(area_block == 1, layer_block, layer_raster.nodata)
+                layer_raster.write(layer_block.astype(layer_raster.dtypes[0]), 1, window=window)
+    finally:
+        for layer_raster in layer_rasters.values():
+            layer_raster.close()
+
+    # Write the 30 m layers in ESRI:102001 over the map domain with a margin and describe them by warped views
+    with rasterio.open(area_input) as area_raster:
+        left, bottom, right, top = transform_bounds(area_raster.crs, 'ESRI:102001', *area_raster.bounds,
+                                                    densify_pts=21)
+    source_width = math.ceil((right - left + 2000) / 30)
+    source_height = math.ceil((top - bottom + 2000) / 30)
+    source_profile = {'driver': 'GTiff', 'width': source_width, 'height': source_height, 'count': 1,
+                      'crs': 'ESRI:102001', 'transform': from_origin(left - 1000, top + 1000, 30, 30),
+                      'dtype': 'uint8', 'nodata': 255, 'tiled': True, 'blockxsize': 256, 'blockysize': 256,
+                      'compress': 'lzw', 'BIGTIFF': 'YES'}
+    source_strip = strip_height // patch_size * 6
+    for name in synthetic_coarse_layers:
+        source_file = source_dictionary[name][0]
+        with rasterio.open(source_file, 'w', **source_profile) as source_raster:
+            for row_off in range(0, source_height, source_strip):
+                rows = min(source_strip, source_height - row_off)
+                source_block = synthetic_layer(name, row_off, rows, source_width, seed, layer_patch=6)
+                source_raster.write(source_block.astype('uint8'), 1,
+                                    window=rasterio.windows.Window(0, row_off, source_width, rows))
+        write_warped_view(layer_dictionary[name], source_file, area_input, 'ESRI:102001', 255, 'uint8', 255)
+
+    # Record the settings of the inputs
+    with open(settings_file, 'w') as settings_stream:
+        json.dump(settings, settings_stream)
+    return inputs
+
+
+# Define a function to read the counters of the current process
+def process_counters():
+    """
+    Description: reads the bytes read and written and the peak resident memory of the current process
+    Inputs: none
+    Returned Value: Returns a dictionary of counters in bytes, each None where the platform does not provide it
+    Preconditions: bytes are counted by read and write calls of all threads and include reads served from the page
+    cache; memory-mapped access to the working cache is not counted
+    """
+
+    counters = {'read_bytes': None, 'write_bytes': None, 'peak_rss': None}
+    if os.path.exists('/proc/self/io'):
+        with open('/proc/self/io', 'r') as io_stream:
+            for line in io_stream:
+                key, value = line.split(':')
+                if key == 'rchar':
+                    counters['read_bytes'] = int(value)
+                elif key == 'wchar':
+                    counters['write_bytes'] = int(value)
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status', 'r') as status_stream:
+            for line in status_stream:
+                if line.startswith('VmHWM:'):
+                    counters['peak_rss'] = int(line.split()[1]) * 1024
+    return counters
+
+
+# Define a function to reset the peak resident memory of the current process
+def reset_peak_rss():
+    """
+    Description: resets the peak resident memory of the current process to its current resident memory
+    Inputs: none
+    Returned Value: Returns True if the peak was reset
+    Preconditions: requires Linux; elsewhere the peak memory of a stage includes the stages before it
+    """
+
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_stream:
+            clear_stream.write('5')
+        return True
+    except OSError:
+        return False
+
+
+# Define a function to measure a stage
+def measure_stage(stage_name, cell_count, stage_function, *arguments, **keywords):
+    """
+    Description: runs a stage and measures its wall time, throughput, peak memory, and bytes read and written
+    Inputs: 'stage_name' -- a label for the stage
+            'cell_count' -- the number of cells of the map domain grid that the stage processes
+            'stage_function' -- the function that runs the stage
+            'arguments' and 'keywords' -- the arguments of the stage function
+    Returned Value: Returns a dictionary of measurements
+    Preconditions: stages are measured in the current process, so they must not overlap
+    """
+
+    reset_peak_rss()
+    start_counters = process_counters()
+    iteration_start = time.perf_counter()
+    stage_function(*arguments, **keywords)
+    seconds = time.perf_counter() - iteration_start
+    end_counters = process_counters()
+    measurement = {'stage': stage_name,
+                   'seconds': seconds,
+                   'cells_per_second': cell_count / seconds if seconds > 0 else None,
+                   'peak_rss_mb': end_counters['peak_rss'] / 1024 ** 2 if end_counters['peak_rss'] else None}
+    for key in ['read_bytes', 'write_bytes']:
+        if start_counters[key] is None:
+            measurement[key.replace('_bytes', '_mb')] = None
+        else:
+            measurement[key.replace('_bytes', '_mb')] = (end_counters[key] - start_counters[key]) / 1024 ** 2
+    return measurement
+
+
+# Define a function to count differing cells of two rasters
+def count_differences(first_input, second_input, block_size=None):
+    """
+    Description: counts the cells that differ between two rasters on the same grid
+    Inputs: 'first_input' -- a file path to a raster
+            'second_input' -- a file path to a raster on the same grid
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+    Returned Value: Returns the number of differing cells
+    Preconditions: none
+    """
+
+    difference_count = 0
+    with rasterio.open(first_input) as first_raster, rasterio.open(second_input) as second_raster:
+        for window in grid_windows(first_input, block_size):
+            difference_count += int(np.count_nonzero(first_raster.read(window=window, masked=False)
+                                                     != second_raster.read(window=window, masked=False)))
+    return difference_count
+
+
+# Define a function to benchmark the stages of the site stratification
+def benchmark_pipeline(benchmark_folder, width, height, seed=0, block_size=512, worker_count=1,
+                       key_engines=('rules', 'numba', 'reference'), mmu_tile_size=4096):
+    """
+    Description: writes synthetic inputs and measures preparation, derived indices, the key with each engine, the
+    streaming pipeline, and the minimum mapping unit on them
+    Inputs: 'benchmark_folder' -- a folder for the synthetic inputs and stage outputs
+            'width' -- the number of columns of the map domain
+            'height' -- the number of rows of the map domain
+            'seed' -- the seed for the synthetic inputs
+            'block_size' -- the approximate edge length of processing blocks in cells
+            'worker_count' -- the number of worker threads of each stage
+            'key_engines' -- the key implementations to compare
+            'mmu_tile_size' -- the edge length of the tiles of the minimum mapping unit in cells
+    Returned Value: Returns a report dictionary with the settings, the measurements of each stage, and the number of
+    parsed cells of each key engine and of the streaming pipeline that differ from the first key engine
+    Preconditions: stages whose dependencies are missing are skipped and listed in the report
+    """
+
+    # Write or reuse the synthetic inputs
+    cell_count = width * height
+    inputs = write_synthetic_inputs(os.path.join(benchmark_folder, 'inputs'), width, height, seed)
+    output_folder = os.path.join(benchmark_folder, 'outputs')
+    os.makedirs(output_folder, exist_ok=True)
+    area_input = inputs['area']
+    layer_dictionary = inputs['layers']
+    report = {'settings': {'width': width, 'height': height, 'seed': seed, 'block_size': block_size,
+                           'worker_count': worker_count, 'mmu_tile_size': mmu_tile_size},
+              'stages': [],
+              'skipped': [],
+              'differences': {}}
+
+    # Import stages that require the GDAL Python bindings
+    try:
+        from osgeo.gdalconst import GDT_Byte
+        from osgeo.gdalconst import GDT_Int16
+        from stratification_utils.streaming_pipeline import stream_foliar_cover
+        from stratification_utils.warp_scheduler import run_warp_jobs
+        from stratification_utils.warp_scheduler import warp_job
+        gdal_available = True
+    except ImportError:
+        gdal_available = False
+
+    # Define the warp jobs of the preparation stage with the parameters of 01_data_preparation.py
+    job_dictionary = {}
+    if gdal_available:
+        for name, (source_file, source_crs) in inputs['sources'].items():
+            output_name = name + '_10m_3338.tif'
+            if name in synthetic_cover:
+                job_dictionary[name] = warp_job(name, source_file,
+                                                os.path.join(output_folder, 'intermediate_' + output_name),
+                                                os.path.join(output_folder, 'prepared_' + output_name),
+                                                source_crs, GDT_Byte, 255, GDT_Byte, 255)
+            else:
+                job_dictionary[name] = warp_job(name, source_file,
+                                                os.path.join(output_folder, 'intermediate_' + output_name),
+                                                os.path.join(output_folder, 'prepared_' + output_name),
+                                                source_crs, GDT_Int16, -32768)
+
+    # Measure preparation of all layers
+    if gdal_available:
+        with rasterio.open(area_input) as area_raster:
+            area_bounds = list(area_raster.bounds)
+        report['stages'].append(measure_stage('01 prepare', cell_count, run_warp_jobs,
+                                              list(job_dictionary.values()), area_bounds, area_input,
+                                              mode='direct', worker_count=worker_count, threads_per_job=1,
+                                              overwrite=True, block_size=block_size))
+    else:
+        report['skipped'].append('01 prepare (requires the GDAL Python bindings)')
+
+    # Measure calculation of the derived rasters
+    derived_dictionary = {name: os.path.join(output_folder, name + '_10m_3338.tif') for name in derived_registry}
+    report['stages'].append(measure_stage('02 derive', cell_count, calculate_derived_rasters,
+                                          area_input, layer_dictionary, derived_dictionary,
+                                          block_size=block_size))
+
+    # Measure the key with each engine, calculating derived indices while parsing
+    parsed_dictionary = {}
+    for key_engine in key_engines:
+        if key_engine == 'numba' and numba_available is False:
+            report['skipped'].append('03 parse numba (requires numba)')
+            continue
+        parsed_dictionary[key_engine] = os.path.join(output_folder, f'parsed_{key_engine}_10m_3338.tif')
+        report['stages'].append(measure_stage(f'03 parse {key_engine}', cell_count, parse_foliar_cover,
+                                              area_input, layer_dictionary, parsed_dictionary[key_engine],
+                                              worker_count=worker_count, key_engine=key_engine,
+                                              block_size=block_size, derived_names=list(derived_registry)))
+
+    # Measure the key reading the derived rasters
+    full_dictionary = dict(layer_dictionary)
+    full_dictionary.update(derived_dictionary)
+    parsed_dictionary['derived rasters'] = os.path.join(output_folder, 'parsed_derived_10m_3338.tif')
+    report['stages'].append(measure_stage('03 parse derived rasters', cell_count, parse_foliar_cover,
+                                          area_input, full_dictionary, parsed_dictionary['derived rasters'],
+                                          worker_count=worker_count, key_engine=key_engines[0],
+                                          block_size=block_size))
+
+    # Measure the streaming pipeline from the unprepared sources
+    if gdal_available:
+        parsed_dictionary['stream'] = os.path.join(output_folder, 'parsed_stream_10m_3338.tif')
+        report['stages'].append(measure_stage('03c stream', cell_count, stream_foliar_cover,
+                                              area_input, job_dictionary, parsed_dictionary['stream'],
+                                              worker_count=worker_count, key_engine=key_engines[0],
+                                              block_size=block_size))
+    else:
+        report['skipped'].append('03c stream (requires the GDAL Python bindings)')
+
+    # Count parsed cells that differ from the first key engine
+    reference_input = list(parsed_dictionary.values())[0]
+    for label, parsed_input in list(parsed_dictionary.items())[1:]:
+        report['differences'][label] = count_differences(reference_input, parsed_input, block_size)
+
+    # Measure the minimum mapping unit
+    try:
+        from stratification_utils.enforce_mmu import enforce_mmu
+        scipy_available = True
+    except ImportError:
+        scipy_available = False
+    if scipy_available:
+        report['stages'].append(measure_stage('05 minimum mapping unit', cell_count, enforce_mmu,
+                                              area_input, reference_input,
+                                              os.path.join(output_folder, 'revised_10m_3338.tif'),
+                                              tile_size=mmu_tile_size, worker_count=worker_count))
+    else:
+        report['skipped'].append('05 minimum mapping unit (requires SciPy)')
+
+    return report
+
+
+# Define a function to compare a benchmark report to a baseline
+def compare_benchmark(report, baseline, tolerance=0.25):
+    """
+    Description: identifies stages that are slower than in a baseline report
+    Inputs: 'report' -- a report dictionary from benchmark_pipeline
+            'baseline' -- a report dictionary from an earlier run with the same settings
+            'tolerance' -- the allowed increase in wall time as a share of the baseline time
+    Returned Value: Returns a list of dictionaries with the stage, baseline seconds, and current seconds of each
+    slower stage
+    Preconditions: stages missing from either report are not compared
+    """
+
+    baseline_dictionary = {measurement['stage']: measurement['seconds'] for measurement in baseline['stages']}
+    regression_list = []
+    for measurement in report['stages']:
+        baseline_seconds = baseline_dictionary.get(measurement['stage'])
+        if baseline_seconds is not None and measurement['seconds'] > baseline_seconds * (1 + tolerance):
+            regression_list.append({'stage': measurement['stage'],
+                                    'baseline_seconds': baseline_seconds,
+                                    'seconds': measurement['seconds']})
+    return regression_list
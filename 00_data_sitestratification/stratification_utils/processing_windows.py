@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Processing windows
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Processing windows" precomputes the grid of windows that the stages process once per run, coalesces small native blocks into processing blocks of a configurable size, and keeps a coverage index of the map domain so that windows outside of the domain are never read and windows inside of it are not masked.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import json
+import os
+import threading
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+from stratification_utils.build_manifest import file_signature
+
+
+# Define a function to create a grid of tiles
+def tile_windows(width, height, tile_size, tile_height=None):
+    """
+    Description: divides a raster into a row-major grid of tiles
+    Inputs: 'width' -- the number of columns in the raster
+            'height' -- the number of rows in the raster
+            'tile_size' -- the edge length of a tile in cells, or its width when a tile height is given
+            'tile_height' -- the height of a tile in cells or None for square tiles
+    Returned Value: Returns a list of rasterio windows in row-major order
+    Preconditions: none
+    """
+
+    if tile_height is None:
+        tile_height = tile_size
+    window_list = []
+    for row_off in range(0, height, tile_height):
+        for col_off in range(0, width, tile_size):
+            window_list.append(Window(col_off, row_off,
+                                      min(tile_size, width - col_off),
+                                      min(tile_height, height - row_off)))
+    return window_list
+
+
+# Define a function to find the shape of processing blocks
+def processing_block_shape(raster, block_size=None):
+    """
+    Description: finds the height and width of processing blocks as whole multiples of the native blocks of a raster
+    Inputs: 'raster' -- an open rasterio dataset that defines the grid
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+    Returned Value: Returns a tuple of the block height and width in cells
+    Preconditions: native tiles that are larger than the block size are not split; native strips of a striped raster
+    span the full raster width, so they are split into columns of the block size, and strips that are taller than the
+    block size are also split into rows of the block size
+    """
+
+    native_height, native_width = raster.block_shapes[0]
+    if block_size is None:
+        return native_height, native_width
+    if raster.profile.get('tiled', False) is False:
+        # Read strips in parts, because a strip can be read from any column and row
+        block_width = block_size
+        if native_height > block_size:
+            block_height = block_size
+        else:
+            block_height = round(block_size / native_height) * native_height
+    else:
+        block_height = max(1, round(block_size / native_height)) * native_height
+        block_width = max(1, round(block_size / native_width)) * native_width
+    return min(block_height, raster.height), min(block_width, raster.width)
+
+
+# Define a function to create the processing windows of a raster
+def grid_windows(raster_path, block_size=None):
+    """
+    Description: precomputes the row-major grid of processing windows of a raster
+    Inputs: 'raster_path' -- a file path to the raster that defines the grid, usually the map domain raster
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+    Returned Value: Returns a list of rasterio windows
+    Preconditions: with a block size of None the windows match block_windows of the raster
+    """
+
+    with rasterio.open(raster_path) as raster:
+        block_height, block_width = processing_block_shape(raster, block_size)
+        return tile_windows(raster.width, raster.height, block_width, block_height)
+
+
+# Define coverage states of processing windows
+# 'empty' windows contain no cells of the map domain, 'full' windows contain only cells of the map domain, and
+# 'partial' windows contain both.
+coverage_states = ['empty', 'partial', 'full']
+
+
+# Define a function to name the coverage index of a map domain raster
+def coverage_sidecar(area_input, block_shape):
+    """
+    Description: derives the file path of the coverage index of a map domain raster for a processing block shape
+    Inputs: 'area_input' -- a file path to the map domain raster
+            'block_shape' -- a tuple of the processing block height and width in cells
+    Returned Value: Returns the file path of the sidecar
+    Preconditions: none
+    """
+
+    return os.path.splitext(area_input)[0] + f'_coverage_{block_shape[0]}x{block_shape[1]}.json'
+
+
+# Define a function to build the coverage index of a map domain raster
+def build_coverage_index(area_input, block_size=None):
+    """
+    Description: classifies each processing window of the map domain raster as empty, partial, or full and writes the
+    result to a sidecar with the signature of the raster
+    Inputs: 'area_input' -- a file path to the map domain raster where the domain has a value of 1
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+    Returned Value: Returns a list of tuples of window and coverage state in row-major order
+    Preconditions: the sidecar is replaced atomically, so concurrent builds of the same index are safe
+    """
+
+    coverage_list = []
+    with rasterio.open(area_input) as area_raster:
+        block_shape = processing_block_shape(area_raster, block_size)
+        for window in tile_windows(area_raster.width, area_raster.height, block_shape[1], block_shape[0]):
+            domain_count = int(np.count_nonzero(area_raster.read(1, window=window, masked=False) == 1))
+            if domain_count == 0:
+                coverage_list.append((window, 'empty'))
+            elif domain_count == int(window.width) * int(window.height):
+                coverage_list.append((window, 'full'))
+            else:
+                coverage_list.append((window, 'partial'))
+    sidecar = {'raster_signature': file_signature(area_input),
+               'block_shape': list(block_shape),
+               'windows': [[int(window.col_off), int(window.row_off), int(window.width), int(window.height), state]
+                           for window, state in coverage_list]}
+    sidecar_file = coverage_sidecar(area_input, block_shape)
+    temporary_file = f'{sidecar_file}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary_file, 'w') as sidecar_stream:
+        json.dump(sidecar, sidecar_stream)
+    os.replace(temporary_file, sidecar_file)
+    return coverage_list
+
+
+# Define a function to read the coverage index of a map domain raster
+def domain_coverage(area_input, block_size=None):
+    """
+    Description: reads the coverage index of the map domain raster for a processing block size, building it when it
+    does not exist or the raster changed after it was written
+    Inputs: 'area_input' -- a file path to the map domain raster where the domain has a value of 1
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+    Returned Value: Returns a list of tuples of window and coverage state in row-major order
+    Preconditions: the windows match grid_windows for the same block size
+    """
+
+    with rasterio.open(area_input) as area_raster:
+        block_shape = processing_block_shape(area_raster, block_size)
+    sidecar_file = coverage_sidecar(area_input, block_shape)
+    if os.path.exists(sidecar_file):
+        with open(sidecar_file, 'r') as sidecar_stream:
+            sidecar = json.load(sidecar_stream)
+        if sidecar['raster_signature'] == file_signature(area_input):
+            return [(Window(col_off, row_off, width, height), state)
+                    for col_off, row_off, width, height, state in sidecar['windows']]
+    return build_coverage_index(area_input, block_size)
+
+
+# Define a function to separate windows by their coverage of the map domain
+def split_domain_windows(area_input, block_size=None):
+    """
+    Description: separates the processing windows that contain cells of the map domain from the windows that contain
+    none and identifies the windows that lie entirely in the map domain
+    Inputs: 'area_input' -- a file path to the map domain raster where the domain has a value of 1
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+    Returned Value: Returns a tuple of the list of domain windows and the list of empty windows, each in row-major
+    order, and the set of row and column offsets of full windows
+    Preconditions: reads only the coverage index or, when it must be built, the map domain raster
+    """
+
+    domain_list = []
+    empty_list = []
+    full_offsets = set()
+    for window, state in domain_coverage(area_input, block_size):
+        if state == 'empty':
+            empty_list.append(window)
+        else:
+            domain_list.append(window)
+        if state == 'full':
+            full_offsets.add(window_offset(window))
+    return domain_list, empty_list, full_offsets
+
+
+# Define a function to identify a window by its offset
+def window_offset(window):
+    """
+    Description: identifies a processing window by its row and column offsets
+    Inputs: 'window' -- a rasterio window
+    Returned Value: Returns a tuple of the row and column offsets
+    Preconditions: none
+    """
+
+    return int(window.row_off), int(window.col_off)
+
+
+# Define a function to create a block of no data for a window
+def nodata_block(window, nodata, dtype, count=1):
+    """
+    Description: creates a block filled with no data that covers a window
+    Inputs: 'window' -- a rasterio window
+            'nodata' -- the no data value
+            'dtype' -- the data type of the block
+            'count' -- the number of bands
+    Returned Value: Returns an array of shape (count, height, width)
+    Preconditions: none
+    """
+
+    return np.full((count, int(window.height), int(window.width)), nodata, dtype=dtype)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Raster attributes
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+ with GDAL.
+# Description: "Raster attributes" calculates the class histogram and statistics of a raster of types in one streaming pass, writes a raster attribute table with labels, and builds nearest neighbor overviews without arcpy.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import numpy as np
+from osgeo import gdal
+from stratification_utils.class_histogram import raster_histogram
+from stratification_utils.class_histogram import read_histogram
+
+
+# Define a function to look up labels for an array of values
+def label_values(values, label_dictionary, missing_label=''):
+    """
+    Description: looks up the label of each value in a sorted dictionary array instead of evaluating each row
+    Inputs: 'values' -- an array of integer values
+            'label_dictionary' -- a dictionary of values and labels
+            'missing_label' -- the label of values that are not in the dictionary
+    Returned Value: Returns an object array of labels
+    Preconditions: none
+    """
+
+    values = np.asarray(values)
+    label_keys = np.array(sorted(label_dictionary), dtype='int64')
+    label_names = np.array([label_dictionary[key] for key in label_keys.tolist()] + [missing_label], dtype=object)
+    if len(label_keys) == 0:
+        return np.full(values.shape, missing_label, dtype=object)
+    positions = np.searchsorted(label_keys, values).clip(0, len(label_keys) - 1)
+    positions = np.where(label_keys[positions] == values, positions, len(label_keys))
+    return label_names[positions]
+
+
+# Define a function to write statistics and a raster attribute table
+def write_raster_attributes(raster_path, histogram, label_dictionary, label_field='label'):
+    """
+    Description: writes band statistics and a raster attribute table with value, count, and label fields
+    Inputs: 'raster_path' -- a file path to a single-band integer raster
+            'histogram' -- a ClassHistogram of the raster
+            'label_dictionary' -- a dictionary of values and labels
+            'label_field' -- the name of the label field
+    Returned Value: No return value; updates the raster metadata on disk
+    Preconditions: equivalent to CalculateStatistics, BuildRasterAttributeTable, and CalculateField with
+    get_response; GeoTIFF attribute tables are stored in the auxiliary metadata file
+    """
+
+    values, counts = histogram.counts()
+    labels = label_values(values, label_dictionary)
+
+    # Build the attribute table
+    attribute_table = gdal.RasterAttributeTable()
+    attribute_table.SetTableType(gdal.GRTT_THEMATIC)
+    attribute_table.CreateColumn('Value', gdal.GFT_Integer, gdal.GFU_MinMax)
+    attribute_table.CreateColumn('Count', gdal.GFT_Real, gdal.GFU_PixelCount)
+    attribute_table.CreateColumn(label_field, gdal.GFT_String, gdal.GFU_Name)
+    attribute_table.SetRowCount(len(values))
+    if len(values) > 0:
+        attribute_table.WriteArray(values.astype('int32'), 0)
+        attribute_table.WriteArray(counts.astype('float64'), 1)
+        attribute_table.WriteArray(np.array([label.encode('utf-8') for label in labels], dtype=bytes), 2)
+
+    # Write statistics and the attribute table
+    dataset = gdal.OpenEx(raster_path, gdal.OF_RASTER | gdal.OF_UPDATE)
+    try:
+        band = dataset.GetRasterBand(1)
+        statistics = histogram.statistics()
+        if statistics is not None:
+            band.SetStatistics(statistics['minimum'], statistics['maximum'], statistics['mean'], statistics['std'])
+            cell_count = dataset.RasterXSize * dataset.RasterYSize
+            band.SetMetadataItem('STATISTICS_VALID_PERCENT', str(100 * statistics['count'] / cell_count))
+        band.SetDefaultRAT(attribute_table)
+    finally:
+        dataset = None
+
+
+# Define a function to build overviews
+def build_overviews(raster_path, minimum_size=256, compression='DEFLATE'):
+    """
+    Description: builds nearest neighbor overviews by factors of two until the smallest overview fits in a block
+    Inputs: 'raster_path' -- a file path to a raster
+            'minimum_size' -- the largest edge length in cells of the smallest overview
+            'compression' -- the compression of the overviews
+    Returned Value: Returns the list of overview factors
+    Preconditions: equivalent to BuildPyramids with NEAREST resampling and all levels; existing overviews are
+    replaced
+    """
+
+    dataset = gdal.OpenEx(raster_path, gdal.OF_RASTER | gdal.OF_UPDATE)
+    try:
+        factor_list = []
+        factor = 2
+        while max(dataset.RasterXSize, dataset.RasterYSize) / (factor // 2) > minimum_size:
+            factor_list.append(factor)
+            factor *= 2
+        dataset.BuildOverviews('NONE', [])
+        if len(factor_list) > 0:
+            gdal.SetThreadLocalConfigOption('COMPRESS_OVERVIEW', compression)
+            dataset.BuildOverviews('NEAREST', factor_list)
+    finally:
+        gdal.SetThreadLocalConfigOption('COMPRESS_OVERVIEW', None)
+        dataset = None
+    return factor_list
+
+
+# Define a function to post-process a raster of types
+def postprocess_raster(raster_path, label_dictionary, histogram=None, overviews=True):
+    """
+    Description: writes statistics, a labeled raster attribute table, and overviews for a raster of types
+    Inputs: 'raster_path' -- a file path to a single-band integer raster
+            'label_dictionary' -- a dictionary of values and labels
+            'histogram' -- a ClassHistogram of the raster or None to read the histogram sidecar of the raster
+            'overviews' -- a boolean that builds overviews
+    Returned Value: Returns the ClassHistogram of the raster
+    Preconditions: replaces the post-processing with arcpy; the raster is only read in full when no current histogram
+    sidecar exists
+    """
+
+    if histogram is None:
+        histogram = read_histogram(raster_path)
+    if histogram is None:
+        histogram = raster_histogram(raster_path)
+    write_raster_attributes(raster_path, histogram, label_dictionary)
+    if overviews:
+        build_overviews(raster_path)
+    return histogram
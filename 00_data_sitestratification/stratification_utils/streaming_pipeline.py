@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Streaming pipeline
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+ with GDAL.
+# Description: "Streaming pipeline" runs data preparation, derived indices, and the programmatic key for one processing window at a time, warping each input raster to the grid of the map domain on demand so that only the parsed raster is written to disk.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import numpy as np
+import rasterio
+from osgeo.gdalconst import GDT_Byte
+from osgeo.gdalconst import GDT_Int16
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from stratification_utils.derived_indices import compile_derived_blocks
+from stratification_utils.derived_indices import derived_registry
+from stratification_utils.derived_indices import derived_source_layers
+from stratification_utils.foliar_key import foliar_key_layers
+from stratification_utils.foliar_key_engines import select_key_engine
+from stratification_utils.foliar_key_engines import verify_key_engines
+from stratification_utils.parallel_blocks import ThreadLocalHandles
+from stratification_utils.parallel_blocks import map_blocks
+from stratification_utils.parse_foliar_cover import write_parsed_raster
+from stratification_utils.processing_windows import split_domain_windows
+from stratification_utils.processing_windows import window_offset
+
+# Define NumPy data types of the GDAL working and output types of warp jobs
+warp_dtypes = {GDT_Byte: 'uint8',
+               GDT_Int16: 'int16'}
+
+
+# Define a class to read blocks of named layers through warped virtual rasters
+class WarpedLayerSource:
+    """
+    Description: reads windows of named layers by warping their input rasters to the grid of the map domain when a
+    window is read in the working type and with the resampling of their warp jobs, setting no data in the window to 0,
+    and converting the window to the output type, like the outputs of 01_data_preparation.py inside of the map domain
+    Inputs: 'area_input' -- a file path to the map domain raster where the domain has a value of 1
+            'job_dictionary' -- a dictionary of layer names and warp jobs created by warp_job
+            'layer_names' -- a list of the layer names to read, where 'area' reads the map domain raster
+            'thread_count' -- the number of GDAL warper threads of each layer
+            'memory_limit' -- the warp buffer budget of each layer in megabytes
+    Preconditions: a WarpedLayerSource must only be used by one thread; cells outside of the map domain are not set to
+    no data, so blocks must be evaluated with the area block; the warped virtual rasters mark no data with the source
+    no data value, which must be representable in the working type
+    """
+
+    def __init__(self, area_input, job_dictionary, layer_names, thread_count=1, memory_limit=64):
+        self.layer_names = list(layer_names)
+        self.area_raster = rasterio.open(area_input)
+        self.source_rasters = []
+        self.warped_rasters = {}
+        self.nodata_values = {}
+        self.output_dtypes = {}
+        # Open a warped virtual raster on the grid of the map domain for each layer
+        for name in self.layer_names:
+            if name == 'area':
+                continue
+            job = job_dictionary[name]
+            source_raster = rasterio.open(job['input_file'])
+            self.source_rasters.append(source_raster)
+            self.warped_rasters[name] = WarpedVRT(source_raster,
+                                                  src_crs=job['source_crs'],
+                                                  src_nodata=job['source_nodata'],
+                                                  crs=self.area_raster.crs,
+                                                  transform=self.area_raster.transform,
+                                                  width=self.area_raster.width,
+                                                  height=self.area_raster.height,
+                                                  nodata=job['source_nodata'],
+                                                  dtype=warp_dtypes[job['working_type']],
+                                                  resampling=Resampling[job['resampling']],
+                                                  warp_mem_limit=memory_limit,
+                                                  warp_extras={'NUM_THREADS': thread_count})
+            self.nodata_values[name] = job['source_nodata']
+            self.output_dtypes[name] = warp_dtypes[job['output_type']]
+
+    def read(self, window, skip_names=()):
+        # Read the map domain and warp every layer except the skipped layers
+        blocks = {}
+        if 'area' in self.layer_names and 'area' not in skip_names:
+            blocks['area'] = self.area_raster.read(window=window, masked=False)
+        for name, warped_raster in self.warped_rasters.items():
+            if name in skip_names:
+                continue
+            raster_block = warped_raster.read(window=window, masked=False)
+            # Set no data values in warped raster to 0 and convert to the output type
+            raster_block[raster_block == self.nodata_values[name]] = 0
+            blocks[name] = raster_block.astype(self.output_dtypes[name], copy=False)
+        return blocks
+
+    def close(self):
+        for warped_raster in self.warped_rasters.values():
+            warped_raster.close()
+        for source_raster in self.source_rasters:
+            source_raster.close()
+        self.area_raster.close()
+
+
+# Define a function to parse types from the unprepared input rasters in one pass
+def stream_foliar_cover(area_input, job_dictionary, output_file, nodata=-32768, worker_count=1, key_engine='rules',
+                        block_size=None, warp_threads=1, warp_memory=64):
+    """
+    Description: warps, fills, derives, and parses each processing window of the map domain in memory and writes only
+    the parsed types
+    Inputs: 'area_input' -- a file path to the map domain raster where the domain has a value of 1
+            'job_dictionary' -- a dictionary of layer names and warp jobs created by warp_job for the foliar cover and
+            ancillary layers of the key
+            'output_file' -- a file path for the parsed output raster
+            'nodata' -- the no data value for the output raster
+            'worker_count' -- the number of worker threads that process windows
+            'key_engine' -- the name of the key implementation in foliar_key_engines
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+            of the area raster
+            'warp_threads' -- the number of GDAL warper threads of each layer in each worker
+            'warp_memory' -- the warp buffer budget of each layer in megabytes
+    Returned Value: Returns the ClassHistogram of the parsed types; writes the parsed raster with band statistics and
+    its histogram sidecar to disk
+    Preconditions: each input raster is read once for the windows of the map domain and no intermediate raster is
+    written; at most four windows per worker are held in memory; derived indices are always calculated from the
+    foliar cover blocks; reprojected layers are resampled in the blocks of the warped virtual raster, like the direct
+    mode of 01_data_preparation.py, so they match its outputs unless a window covers the whole raster
+    """
+
+    # Select the key implementation and verify compiled kernels against the reference key
+    key_engine, key_function = select_key_engine(key_engine)
+    if key_engine == 'numba':
+        verify_key_engines([key_engine])
+
+    # Define the layers warped for each window, replacing derived indices by their inputs
+    derived_names = [name for name in foliar_key_layers if name in derived_registry]
+    derived_blocks = compile_derived_blocks(derived_names)[0]
+    layer_names = derived_source_layers(foliar_key_layers, derived_names)
+    missing_layers = [name for name in layer_names if name not in job_dictionary]
+    if len(missing_layers) > 0:
+        raise KeyError(f'Warp jobs are not defined for {", ".join(missing_layers)}.')
+    thread_sources = ThreadLocalHandles(lambda: WarpedLayerSource(area_input, job_dictionary, ['area'] + layer_names,
+                                                                  warp_threads, warp_memory))
+
+    # Look up the processing windows and their coverage of the map domain
+    window_list, empty_list, full_offsets = split_domain_windows(area_input, block_size)
+
+    # Define the stages applied to each window by a worker
+    def stream_window(window):
+        # Warp and fill the input layers, reading the map domain only for windows that it does not fill
+        if window_offset(window) in full_offsets:
+            blocks = thread_sources.get().read(window, skip_names=('area',))
+            area_block = np.ones((1, int(window.height), int(window.width)), dtype='uint8')
+        else:
+            blocks = thread_sources.get().read(window)
+            area_block = blocks['area']
+        # Calculate derived indices as the key reads them
+        blocks = derived_blocks(blocks)
+        # Parse types
+        return key_function(area_block, blocks, nodata)
+
+    # Prepare output profile from the map domain raster
+    with rasterio.open(area_input) as area_raster:
+        output_profile = area_raster.profile.copy()
+    output_profile.update(driver='GTiff', count=1, dtype='int16', nodata=nodata, compress='lzw')
+
+    # Write parsed blocks in window order as workers finish them
+    try:
+        histogram = write_parsed_raster(output_file, output_profile, empty_list, len(window_list),
+                                        map_blocks(stream_window, window_list, worker_count))
+    finally:
+        thread_sources.close()
+    return histogram
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Tiled nibble
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Tiled nibble" replaces cells that are not retained with the value of the nearest retained cell tile by tile, searching a halo around each tile and expanding the search only for cells whose nearest retained cell lies outside the halo.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import numpy as np
+from rasterio.windows import Window
+from scipy import ndimage
+
+
+# Define a function to expand a window by a halo
+def halo_window(window, halo, width, height):
+    """
+    Description: expands a window by a halo on every side and clips it to the raster
+    Inputs: 'window' -- a rasterio window
+            'halo' -- the number of cells added on every side
+            'width' -- the number of columns in the raster
+            'height' -- the number of rows in the raster
+    Returned Value: Returns the expanded window and a tuple of row and column slices of the original window within it
+    Preconditions: none
+    """
+
+    row_start = max(0, window.row_off - halo)
+    col_start = max(0, window.col_off - halo)
+    row_stop = min(height, window.row_off + window.height + halo)
+    col_stop = min(width, window.col_off + window.width + halo)
+    core_slice = (slice(window.row_off - row_start, window.row_off - row_start + window.height),
+                  slice(window.col_off - col_start, window.col_off - col_start + window.width))
+    return Window(col_start, row_start, col_stop - col_start, row_stop - row_start), core_slice
+
+
+# Define a function to replace cells of a tile with the nearest retained value
+def nibble_tile(read_class, read_retained, window, width, height, halo=32, class_block=None, area_block=None,
+                restored_values=()):
+    """
+    Description: replaces each cell of a tile that is not retained with the value of the nearest retained cell
+    Inputs: 'read_class' -- a function that accepts a window and returns the types within it
+            'read_retained' -- a function that accepts a window and returns the boolean retained flags within it
+            'window' -- the rasterio window of the tile
+            'width' -- the number of columns in the raster
+            'height' -- the number of rows in the raster
+            'halo' -- the number of cells searched around the tile before the search is expanded
+            'class_block' -- the types of the tile or None to read them
+            'area_block' -- the map domain of the tile where the domain has a value of 1 or None to replace cells
+            outside of the map domain as well
+            'restored_values' -- a list of types that are restored from the input after the replacement and are
+            therefore not replaced
+    Returned Value: Returns the replaced types of the tile
+    Preconditions: a nearest retained cell found within the halo is the nearest in the full raster because every cell
+    outside the halo is more than halo cells away; the halo is doubled only while cells in the map domain that are
+    not restored remain unresolved, and the search is exact once it covers the full raster
+    """
+
+    # Identify the cells of the tile that need a replacement and return the tile when there are none
+    if class_block is None:
+        class_block = read_class(window)
+    nibble_block = class_block.copy()
+    unresolved = ~np.asarray(read_retained(window), dtype=bool)
+    if area_block is not None:
+        unresolved &= area_block == 1
+    if len(restored_values) > 0:
+        unresolved &= ~np.isin(class_block, restored_values)
+    if unresolved.any() == 0:
+        return nibble_block
+
+    # Search for the nearest retained cells in a halo that doubles while cells remain unresolved
+    search_halo = halo
+    while True:
+        search_window, core_slice = halo_window(window, search_halo, width, height)
+        class_search = read_class(search_window)
+        retained_block = np.asarray(read_retained(search_window), dtype=bool)
+        covers_raster = search_window.width == width and search_window.height == height
+        if retained_block.any():
+            distances, nearest_index = ndimage.distance_transform_edt(~retained_block, return_indices=True)
+            nearest_block = class_search[nearest_index[0][core_slice], nearest_index[1][core_slice]]
+            resolved = unresolved if covers_raster else unresolved & (distances[core_slice] <= search_halo)
+            nibble_block[resolved] = nearest_block[resolved]
+            unresolved &= ~resolved
+        # Keep the input types when no cell of the raster is retained
+        if covers_raster or unresolved.any() == 0:
+            return nibble_block
+        search_halo = max(2 * search_halo, 1)
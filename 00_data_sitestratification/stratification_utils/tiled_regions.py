@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Tiled regions
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Tiled regions" labels 8-connected regions of equal type tile by tile, merges regions that cross tile seams, and flags cells of regions that meet the minimum mapping unit without holding labels for the full raster.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import numpy as np
+import rasterio
+from scipy import ndimage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from stratification_utils.minimum_mapping_unit import mmu_excluded_values
+from stratification_utils.minimum_mapping_unit import mmu_minimum_count
+from stratification_utils.parallel_blocks import ThreadLocalHandles
+from stratification_utils.parallel_blocks import map_blocks
+from stratification_utils.processing_windows import tile_windows
+
+
+# Define a function to label regions within a tile
+def label_tile(class_block, nodata=-32768, excluded_values=mmu_excluded_values):
+    """
+    Description: labels 8-connected regions of equal type within a tile
+    Inputs: 'class_block' -- a two-dimensional array of types
+            'nodata' -- the no data value of the types
+            'excluded_values' -- a list of types that are not labeled
+    Returned Value: Returns an int32 array of labels where 0 marks unlabeled cells and an array of cell counts per label
+    Preconditions: labels are deterministic, so labeling the same tile twice returns the same labels
+    """
+
+    structure = np.ones((3, 3), dtype=bool)
+    label_block = np.zeros(class_block.shape, dtype='int32')
+    label_count = 0
+    for value in np.unique(class_block):
+        if value == nodata or value in excluded_values:
+            continue
+        region_block, region_count = ndimage.label(class_block == value, structure=structure)
+        np.add(region_block, label_count, out=label_block, where=region_block > 0)
+        label_count += region_count
+    label_sizes = np.bincount(label_block.ravel(), minlength=label_count + 1)
+    return label_block, label_sizes
+
+
+# Define a function to summarize the edges of a labeled tile
+def tile_edges(class_block, label_block, label_sizes):
+    """
+    Description: extracts the edge cells of a labeled tile and the sizes of the labels that touch an edge
+    Inputs: 'class_block' -- a two-dimensional array of types
+            'label_block' -- the labels returned by label_tile
+            'label_sizes' -- the cell counts returned by label_tile
+    Returned Value: Returns a dictionary of edge labels, edge types, edge label ids, and their cell counts
+    Preconditions: none
+    """
+
+    edges = {'top': (label_block[0, :].copy(), class_block[0, :].copy()),
+             'bottom': (label_block[-1, :].copy(), class_block[-1, :].copy()),
+             'left': (label_block[:, 0].copy(), class_block[:, 0].copy()),
+             'right': (label_block[:, -1].copy(), class_block[:, -1].copy())}
+    edge_labels = np.unique(np.concatenate([edge[0] for edge in edges.values()]))
+    edge_labels = edge_labels[edge_labels > 0]
+    return {'edges': edges,
+            'label_count': len(label_sizes) - 1,
+            'edge_labels': edge_labels,
+            'edge_sizes': label_sizes[edge_labels]}
+
+
+# Define a function to pair labels that touch across a seam
+def seam_pairs(first_edge, second_edge, first_offset, second_offset):
+    """
+    Description: pairs labels of two parallel tile edges that are 8-connected and share a type
+    Inputs: 'first_edge' -- a tuple of edge labels and edge types of the first tile
+            'second_edge' -- a tuple of edge labels and edge types of the adjacent tile
+            'first_offset' -- the global label offset of the first tile
+            'second_offset' -- the global label offset of the adjacent tile
+    Returned Value: Returns two arrays of paired global labels
+    Preconditions: the edges must have the same length and face each other across the seam
+    """
+
+    first_labels, first_values = first_edge
+    second_labels, second_values = second_edge
+    length = len(first_labels)
+    first_list = []
+    second_list = []
+    for shift in [-1, 0, 1]:
+        first_slice = slice(max(0, -shift), length - max(0, shift))
+        second_slice = slice(max(0, shift), length - max(0, -shift))
+        connected = ((first_labels[first_slice] > 0) & (second_labels[second_slice] > 0)
+                     & (first_values[first_slice] == second_values[second_slice]))
+        first_list.append(first_labels[first_slice][connected].astype('int64') + first_offset)
+        second_list.append(second_labels[second_slice][connected].astype('int64') + second_offset)
+    return np.concatenate(first_list), np.concatenate(second_list)
+
+
+# Define a function to merge edge labels across the tile grid
+def merge_tile_edges(summary_list, grid_shape, minimum_count=mmu_minimum_count):
+    """
+    Description: joins edge labels of adjacent tiles into regions, sums their cell counts, and flags regions that meet
+    the minimum count
+    Inputs: 'summary_list' -- a list of tile summaries from tile_edges in row-major tile order
+            'grid_shape' -- a tuple of the number of tile rows and tile columns
+            'minimum_count' -- the smallest number of cells in a retained region
+    Returned Value: Returns a list with one dictionary of edge labels and retained flags per tile
+    Preconditions: connected components of the equivalence graph act as the union-find equivalence table
+    """
+
+    tile_rows, tile_columns = grid_shape
+
+    # Assign global label offsets in tile order
+    offsets = np.zeros(len(summary_list), dtype='int64')
+    total = 0
+    for position, summary in enumerate(summary_list):
+        offsets[position] = total
+        total += summary['label_count']
+
+    # Pair labels across vertical seams, horizontal seams, and tile corners
+    first_list = []
+    second_list = []
+    for tile_row in range(tile_rows):
+        for tile_column in range(tile_columns):
+            position = tile_row * tile_columns + tile_column
+            edges = summary_list[position]['edges']
+            if tile_column + 1 < tile_columns:
+                neighbor = position + 1
+                pairs = seam_pairs(edges['right'], summary_list[neighbor]['edges']['left'],
+                                   offsets[position], offsets[neighbor])
+                first_list.append(pairs[0])
+                second_list.append(pairs[1])
+            if tile_row + 1 < tile_rows:
+                neighbor = position + tile_columns
+                pairs = seam_pairs(edges['bottom'], summary_list[neighbor]['edges']['top'],
+                                   offsets[position], offsets[neighbor])
+                first_list.append(pairs[0])
+                second_list.append(pairs[1])
+                # Pair corner cells of diagonal neighbors
+                for corner, neighbor_column, neighbor_corner in [(-1, tile_column + 1, 0),
+                                                                 (0, tile_column - 1, -1)]:
+                    if 0 <= neighbor_column < tile_columns:
+                        neighbor = (tile_row + 1) * tile_columns + neighbor_column
+                        neighbor_edge = summary_list[neighbor]['edges']['top']
+                        first_label = edges['bottom'][0][corner]
+                        second_label = neighbor_edge[0][neighbor_corner]
+                        if (first_label > 0 and second_label > 0
+                                and edges['bottom'][1][corner] == neighbor_edge[1][neighbor_corner]):
+                            first_list.append(np.array([first_label + offsets[position]], dtype='int64'))
+                            second_list.append(np.array([second_label + offsets[neighbor]], dtype='int64'))
+
+    # Resolve equivalent edge labels to regions
+    edge_ids = np.concatenate([summary['edge_labels'].astype('int64') + offsets[position]
+                               for position, summary in enumerate(summary_list)])
+    edge_sizes = np.concatenate([summary['edge_sizes'] for summary in summary_list])
+    first_ids = np.searchsorted(edge_ids, np.concatenate(first_list + [np.zeros(0, dtype='int64')]))
+    second_ids = np.searchsorted(edge_ids, np.concatenate(second_list + [np.zeros(0, dtype='int64')]))
+    graph = coo_matrix((np.ones(len(first_ids), dtype='int8'), (first_ids, second_ids)),
+                       shape=(len(edge_ids), len(edge_ids)))
+    region_count, region_ids = connected_components(graph, directed=False)
+
+    # Sum cell counts per region and flag retained regions
+    region_sizes = np.bincount(region_ids, weights=edge_sizes, minlength=region_count)
+    edge_retained = region_sizes[region_ids] >= minimum_count
+
+    # Split retained flags by tile
+    flag_list = []
+    start = 0
+    for summary in summary_list:
+        end = start + len(summary['edge_labels'])
+        flag_list.append({'edge_labels': summary['edge_labels'],
+                          'edge_retained': edge_retained[start:end]})
+        start = end
+    return flag_list
+
+
+# Define a function to flag retained cells tile by tile
+def retained_region_blocks(class_input, nodata=-32768, minimum_count=mmu_minimum_count,
+                           excluded_values=mmu_excluded_values, tile_size=2048, worker_count=1):
+    """
+    Description: flags cells of 8-connected regions that meet the minimum count, labeling tiles in parallel and merging
+    regions across tile seams
+    Inputs: 'class_input' -- a file path to the raster of types
+            'nodata' -- the no data value of the types
+            'minimum_count' -- the smallest number of cells in a retained region
+            'excluded_values' -- a list of types whose regions are never retained
+            'tile_size' -- the edge length of a tile in cells
+            'worker_count' -- the number of worker threads that label tiles
+    Returned Value: Yields tuples of window and boolean retained block in row-major tile order
+    Preconditions: memory is bounded by the tiles in flight and the edge labels of all tiles; tiles are labeled a second
+    time when the retained flags are written instead of storing labels for the full raster
+    """
+
+    # Define tile grid
+    with rasterio.open(class_input) as class_raster:
+        width = class_raster.width
+        height = class_raster.height
+    window_list = tile_windows(width, height, tile_size)
+    grid_shape = (-(-height // tile_size), -(-width // tile_size))
+    thread_rasters = ThreadLocalHandles(lambda: rasterio.open(class_input))
+
+    # Define the block function that labels a tile and summarizes its edges
+    def summarize_tile(window):
+        class_block = thread_rasters.get().read(1, window=window, masked=False)
+        label_block, label_sizes = label_tile(class_block, nodata, excluded_values)
+        return tile_edges(class_block, label_block, label_sizes)
+
+    # Define the block function that relabels a tile and flags retained cells
+    def flag_tile(window):
+        position = window_position[(window.row_off, window.col_off)]
+        class_block = thread_rasters.get().read(1, window=window, masked=False)
+        label_block, label_sizes = label_tile(class_block, nodata, excluded_values)
+        label_retained = label_sizes >= minimum_count
+        label_retained[0] = False
+        flags = flag_list[position]
+        label_retained[flags['edge_labels']] = flags['edge_retained']
+        return label_retained[label_block]
+
+    try:
+        # Label tiles and merge edge labels across seams
+        summary_list = [summary for window, summary in map_blocks(summarize_tile, window_list, worker_count)]
+        flag_list = merge_tile_edges(summary_list, grid_shape, minimum_count)
+        del summary_list
+        window_position = {(window.row_off, window.col_off): position
+                           for position, window in enumerate(window_list)}
+
+        # Relabel tiles and yield retained flags
+        for window, retained_block in map_blocks(flag_tile, window_list, worker_count):
+            yield window, retained_block
+    finally:
+        thread_rasters.close()
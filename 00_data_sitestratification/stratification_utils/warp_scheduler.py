@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Warp scheduler
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+ with GDAL.
+# Description: "Warp scheduler" runs independent raster warp jobs concurrently in a bounded worker pool with per-job thread and memory budgets and applies the map domain mask during the warp.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+import numpy as np
+import rasterio
+from osgeo import gdal
+from osgeo.gdalconst import GDT_Int16
+from stratification_utils.processing_windows import domain_coverage
+from stratification_utils.processing_windows import grid_windows
+from stratification_utils.processing_windows import nodata_block
+from stratification_utils.processing_windows import split_domain_windows
+from stratification_utils.processing_windows import window_offset
+
+# Define preparation modes
+# 'direct' warps to a virtual raster and writes the filled and masked output once; 'two_step' writes the warped
+# intermediate raster that is then filled and masked in a second pass; 'verify' writes the warped intermediate raster
+# and compares its filled and masked values to the output of the direct mode.
+preparation_modes = ['direct', 'two_step', 'verify']
+
+
+# Define a function to create a warp job
+def warp_job(name, input_file, intermediate_file, output_file, source_crs, working_type, source_nodata,
+             output_type=GDT_Int16, output_nodata=None, resampling='bilinear'):
+    """
+    Description: describes a warp of one input raster to the common grid
+    Inputs: 'name' -- a label for the job used in progress reports
+            'input_file' -- a file path to the input raster
+            'intermediate_file' -- a file path to the warped raster before masking
+            'output_file' -- a file path to the filled and masked output raster
+            'source_crs' -- the coordinate reference system of the input raster
+            'working_type' -- the GDAL working data type of the warp
+            'source_nodata' -- the no data value of the input raster
+            'output_type' -- the GDAL data type of the output raster
+            'output_nodata' -- the no data value of the output raster or None for the no data value of the run
+            'resampling' -- the name of the GDAL resampling method of the warp
+    Returned Value: Returns a dictionary that defines the job
+    Preconditions: the no data value of the output must be representable in the output type
+    """
+
+    return {'name': name,
+            'input_file': input_file,
+            'intermediate_file': intermediate_file,
+            'output_file': output_file,
+            'source_crs': source_crs,
+            'working_type': working_type,
+            'source_nodata': source_nodata,
+            'output_type': output_type,
+            'output_nodata': output_nodata,
+            'resampling': resampling}
+
+
+# Define a function to find the output no data value of a warp job
+def warp_job_nodata(job, nodata=-32768):
+    """
+    Description: finds the no data value of the output raster of a warp job
+    Inputs: 'job' -- a dictionary created by warp_job
+            'nodata' -- the no data value of the run
+    Returned Value: Returns the no data value of the job output
+    Preconditions: none
+    """
+
+    return job['output_nodata'] if job['output_nodata'] is not None else nodata
+
+
+# Define a function to fill and mask a warped raster
+def mask_warped_raster(input_file, area_file, output_file, nodata=-32768, block_size=None):
+    """
+    Description: sets no data in a warped raster to 0 and sets cells outside of the map domain to no data
+    Inputs: 'input_file' -- a file path to a warped raster or virtual raster on the grid of the map domain
+            'area_file' -- a file path to the map domain raster where the domain has a value of 1
+            'output_file' -- a file path to the output raster
+            'nodata' -- the no data value of the input and output rasters
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+            of the area raster
+    Returned Value: No return value; writes the output raster to disk
+    Preconditions: the input raster must share the grid of the area raster; blocks outside of the map domain are
+    written as no data without reading the input, so a virtual raster is not warped there, and blocks inside of the
+    map domain are only filled
+    """
+
+    window_list, empty_list, full_offsets = split_domain_windows(area_file, block_size)
+    with rasterio.open(input_file) as input_raster, rasterio.open(area_file) as area_raster:
+        output_profile = input_raster.profile.copy()
+        output_profile.update(driver='GTiff', compress='lzw')
+        for key in ['blockxsize', 'blockysize', 'tiled']:
+            output_profile.pop(key, None)
+        with rasterio.open(output_file, 'w', **output_profile, BIGTIFF='YES') as dst:
+            for window in empty_list:
+                dst.write(nodata_block(window, nodata, output_profile['dtype'], output_profile['count']),
+                          window=window)
+            for window in window_list:
+                raster_block = input_raster.read(window=window, masked=False)
+                # Set no data values in input raster to 0
+                raster_block = np.where(raster_block == nodata, 0, raster_block)
+                # Set no data values from area raster to no data
+                if window_offset(window) not in full_offsets:
+                    area_block = area_raster.read(window=window, masked=False)
+                    raster_block = np.where(area_block != 1, nodata, raster_block)
+                # Write results
+                dst.write(raster_block, window=window)
+
+
+# Define a function to compare a masked intermediate raster to an output raster
+def compare_masked_raster(intermediate_file, area_file, output_file, nodata=-32768, block_size=None):
+    """
+    Description: counts the cells where the filled and masked intermediate raster differs from the output raster
+    Inputs: 'intermediate_file' -- a file path to the warped raster before masking
+            'area_file' -- a file path to the map domain raster where the domain has a value of 1
+            'output_file' -- a file path to the output raster written by the direct mode
+            'nodata' -- the no data value of the rasters
+            'block_size' -- the approximate edge length of a processing block in cells or None for the native blocks
+            of the area raster
+    Returned Value: Returns the number of differing cells
+    Preconditions: all rasters must share the grid of the area raster
+    """
+
+    mismatch_count = 0
+    with rasterio.open(intermediate_file) as input_raster, rasterio.open(area_file) as area_raster, \
+            rasterio.open(output_file) as output_raster:
+        for window in grid_windows(area_file, block_size):
+            area_block = area_raster.read(window=window, masked=False)
+            raster_block = input_raster.read(window=window, masked=False)
+            raster_block = np.where(raster_block == nodata, 0, raster_block)
+            raster_block = np.where(area_block != 1, nodata, raster_block)
+            output_block = output_raster.read(window=window, masked=False)
+            mismatch_count += int(np.count_nonzero(raster_block != output_block))
+    return mismatch_count
+
+
+# Define a function to run a warp job
+def run_warp_job(job, area_bounds, area_file, mode='direct', nodata=-32768, thread_count=1, memory_limit=512,
+                 block_size=None):
+    """
+    Description: resamples and reprojects an input raster to the 10 m EPSG:3338 grid of the map domain
+    Inputs: 'job' -- a dictionary created by warp_job
+            'area_bounds' -- a list of the bounds of the map domain
+            'area_file' -- a file path to the map domain raster where the domain has a value of 1
+            'mode' -- a preparation mode from preparation_modes
+            'nodata' -- the no data value of the run, used when the job does not define its own
+            'thread_count' -- the number of GDAL warper threads for this job
+            'memory_limit' -- the warp buffer budget for this job in megabytes
+            'block_size' -- the approximate edge length of a processing block in cells for the masking pass or None
+    Returned Value: Returns the elapsed time in seconds
+    Preconditions: removes partial outputs if the job fails
+    """
+
+    iteration_start = time.time()
+    job_nodata = warp_job_nodata(job, nodata)
+    # Remove results of an earlier run that are being replaced
+    result_file = job['output_file'] if mode == 'direct' else job['intermediate_file']
+    if os.path.exists(result_file):
+        os.remove(result_file)
+    # Direct mode warps to a virtual raster that is evaluated while the masked output is written
+    if mode == 'direct':
+        warp_file = os.path.splitext(job['intermediate_file'])[0] + '.vrt'
+        warp_format = 'VRT'
+        creation_options = []
+    else:
+        warp_file = job['intermediate_file']
+        warp_format = 'GTiff'
+        creation_options = ['COMPRESS=LZW', 'BIGTIFF=YES']
+    # Limit the threads used by this job
+    gdal.SetThreadLocalConfigOption('GDAL_NUM_THREADS', str(thread_count))
+    try:
+        gdal.Warp(warp_file,
+                  job['input_file'],
+                  format=warp_format,
+                  srcSRS=job['source_crs'],
+                  dstSRS='EPSG:3338',
+                  outputType=job['output_type'],
+                  workingType=job['working_type'],
+                  xRes=10,
+                  yRes=-10,
+                  srcNodata=job['source_nodata'],
+                  dstNodata=job_nodata,
+                  outputBounds=area_bounds,
+                  resampleAlg=job['resampling'],
+                  targetAlignedPixels=False,
+                  multithread=thread_count > 1,
+                  warpOptions=[f'NUM_THREADS={thread_count}'],
+                  warpMemoryLimit=memory_limit,
+                  creationOptions=creation_options)
+        if mode == 'direct':
+            mask_warped_raster(warp_file, area_file, job['output_file'], job_nodata, block_size)
+    except Exception:
+        partial_list = [warp_file, job['output_file']] if mode == 'direct' else [warp_file]
+        for partial_file in partial_list:
+            if os.path.exists(partial_file):
+                os.remove(partial_file)
+        raise
+    finally:
+        gdal.SetThreadLocalConfigOption('GDAL_NUM_THREADS', None)
+    # Remove the virtual raster once the output is written
+    if mode == 'direct' and os.path.exists(warp_file):
+        os.remove(warp_file)
+    return time.time() - iteration_start
+
+
+# Define a function to run warp jobs in a worker pool
+def run_warp_jobs(job_list, area_bounds, area_file, mode='direct', nodata=-32768,
+                  worker_count=4, threads_per_job=2, memory_per_job=512, overwrite=False, block_size=None):
+    """
+    Description: runs warp jobs concurrently, skipping jobs whose result already exists unless overwriting, and reports
+    timing per job
+    Inputs: 'job_list' -- a list of dictionaries created by warp_job
+            'area_bounds' -- a list of the bounds of the map domain
+            'area_file' -- a file path to the map domain raster where the domain has a value of 1
+            'mode' -- a preparation mode from preparation_modes
+            'nodata' -- the no data value of output rasters whose jobs do not define their own
+            'worker_count' -- the number of jobs that run at the same time
+            'threads_per_job' -- the number of GDAL warper threads for each job
+            'memory_per_job' -- the warp buffer budget for each job in megabytes
+            'overwrite' -- a boolean that runs every job in the list, replacing existing results
+            'block_size' -- the approximate edge length of a processing block in cells for the masking pass or None
+    Returned Value: Returns a dictionary of job names and elapsed times for the jobs that ran
+    Preconditions: worker_count multiplied by threads_per_job should not exceed the number of cores; the shared GDAL
+    block cache is set to the sum of the per-job budgets
+    """
+
+    # Identify jobs that must be run
+    if mode not in preparation_modes:
+        raise ValueError(f'Preparation mode must be one of {", ".join(preparation_modes)}.')
+    result_key = 'output_file' if mode == 'direct' else 'intermediate_file'
+    pending_list = [job for job in job_list if overwrite or os.path.exists(job[result_key]) == 0]
+    if len(pending_list) == 0:
+        return {}
+    print(f'Warping {len(pending_list)} rasters with {worker_count} workers...')
+
+    # Set the shared block cache to the total budget of the concurrent jobs
+    gdal.SetCacheMax(worker_count * memory_per_job * 1024 * 1024)
+
+    # Build the coverage index of the map domain once before jobs read it
+    domain_coverage(area_file, block_size)
+
+    # Run jobs in the worker pool and report each job as it finishes
+    timing_dictionary = {}
+    failure_list = []
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        future_dictionary = {}
+        for job in pending_list:
+            future = executor.submit(run_warp_job, job, area_bounds, area_file, mode, nodata,
+                                     threads_per_job, memory_per_job, block_size)
+            future_dictionary[future] = job['name']
+        count = 1
+        for future in as_completed(future_dictionary):
+            name = future_dictionary[future]
+            try:
+                elapsed = future.result()
+                timing_dictionary[name] = elapsed
+                print(f'\t[{count}/{len(pending_list)}] Warped {name} in {elapsed:.1f} seconds.')
+            except Exception as error:
+                failure_list.append(name)
+                print(f'\t[{count}/{len(pending_list)}] Failed to warp {name}: {error}')
+            count += 1
+
+    # Raise an error if any job failed
+    if len(failure_list) > 0:
+        raise RuntimeError(f'Warp failed for {", ".join(failure_list)}.')
+
+    return timing_dictionary
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Warped views
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Warped views" describes coarse input rasters that are reprojected to the grid of the map domain when a window is read instead of being written at 10 m, and reads them through a small cache of source tiles.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+from rasterio.enums import Resampling
+from rasterio.warp import reproject
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window
+from rasterio.windows import bounds as window_bounds
+from rasterio.windows import transform as window_transform
+
+# Define the suffix of warped view files
+warped_view_suffix = '_view.json'
+
+
+# Define a function to name the warped view of a raster
+def warped_view_file(raster_path):
+    """
+    Description: derives the file path of the warped view that stands in for a raster
+    Inputs: 'raster_path' -- a file path to the raster that the view replaces
+    Returned Value: Returns the file path of the view
+    Preconditions: none
+    """
+
+    return os.path.splitext(raster_path)[0] + warped_view_suffix
+
+
+# Define a function to identify warped view files
+def is_warped_view(raster_path):
+    """
+    Description: identifies whether a file path refers to a warped view
+    Inputs: 'raster_path' -- a file path to a raster or warped view
+    Returned Value: Returns True for warped views
+    Preconditions: none
+    """
+
+    return raster_path.endswith(warped_view_suffix)
+
+
+# Define a function to write a warped view
+def write_warped_view(view_file, input_file, area_file, source_crs, source_nodata, dtype, nodata,
+                      resampling='bilinear'):
+    """
+    Description: writes the description of an input raster warped to the grid of the map domain
+    Inputs: 'view_file' -- a file path for the warped view
+            'input_file' -- a file path to the input raster
+            'area_file' -- a file path to the map domain raster that defines the grid
+            'source_crs' -- the coordinate reference system of the input raster
+            'source_nodata' -- the no data value of the input raster
+            'dtype' -- the NumPy data type of the warped values
+            'nodata' -- the no data value of the warped values
+            'resampling' -- the name of the resampling method of the warp
+    Returned Value: No return value; writes the view to disk
+    Preconditions: the view is replaced atomically, so readers never see a partial view
+    """
+
+    view = {'input_file': os.path.abspath(input_file),
+            'area_file': os.path.abspath(area_file),
+            'source_crs': source_crs,
+            'source_nodata': source_nodata,
+            'dtype': dtype,
+            'nodata': nodata,
+            'resampling': resampling}
+    os.makedirs(os.path.dirname(os.path.abspath(view_file)), exist_ok=True)
+    temporary_file = f'{view_file}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary_file, 'w') as view_stream:
+        json.dump(view, view_stream, indent=2)
+    os.replace(temporary_file, view_file)
+
+
+# Define a class to read a warped view
+class WarpedView:
+    """
+    Description: reads windows of an input raster reprojected to the grid of the map domain with the resampling of the
+    view, with no data in the map domain set to 0 and cells outside of it set to no data like the outputs of
+    01_data_preparation.py, and with the same read interface as a rasterio dataset
+    Inputs: 'view_file' -- a file path to a view written by write_warped_view
+            'cache_tiles' -- the number of source tiles kept in the least recently used tile cache
+            'tile_size' -- the edge length of source tiles in cells
+            'warp_size' -- the edge length of the tiles of the map domain grid that are warped at once in cells
+    Preconditions: a WarpedView must only be used by one thread; values do not depend on the windows that are read
+    because the grid is always warped in the same tiles; adjacent windows share source tiles, so windows should be
+    read in row-major order and their edge lengths should be multiples of the warp size
+    """
+
+    def __init__(self, view_file, cache_tiles=16, tile_size=256, warp_size=256):
+        with open(view_file, 'r') as view_stream:
+            self.view = json.load(view_stream)
+        self.source_raster = rasterio.open(self.view['input_file'])
+        self.area_raster = rasterio.open(self.view['area_file'])
+        self.source_crs = CRS.from_user_input(self.view['source_crs'])
+        self.source_nodata = self.view['source_nodata']
+        self.resampling = Resampling[self.view['resampling']]
+        self.cache_tiles = cache_tiles
+        self.tile_size = tile_size
+        self.warp_size = warp_size
+        self.tiles = OrderedDict()
+        self.height = self.area_raster.height
+        self.width = self.area_raster.width
+        self.dtypes = (self.view['dtype'],)
+        self.nodata = self.view['nodata']
+        self.crs = self.area_raster.crs
+        self.transform = self.area_raster.transform
+        self.profile = {'driver': 'GTiff',
+                        'dtype': self.dtypes[0],
+                        'nodata': self.nodata,
+                        'width': self.width,
+                        'height': self.height,
+                        'count': 1,
+                        'crs': self.crs,
+                        'transform': self.transform,
+                        'compress': 'lzw'}
+
+    def source_tile(self, tile_row, tile_col):
+        # Return a source tile from the cache, reading it and evicting the least recently used tile when needed
+        tile_key = (tile_row, tile_col)
+        if tile_key in self.tiles:
+            self.tiles.move_to_end(tile_key)
+            return self.tiles[tile_key]
+        row_off = tile_row * self.tile_size
+        col_off = tile_col * self.tile_size
+        tile_window = Window(col_off, row_off,
+                             min(self.tile_size, self.source_raster.width - col_off),
+                             min(self.tile_size, self.source_raster.height - row_off))
+        tile = self.source_raster.read(1, window=tile_window, masked=False)
+        self.tiles[tile_key] = tile
+        if len(self.tiles) > self.cache_tiles:
+            self.tiles.popitem(last=False)
+        return tile
+
+    def read_source(self, row_start, row_stop, col_start, col_stop):
+        # Assemble a source block from the cached tiles that it overlaps
+        source_block = np.empty((row_stop - row_start, col_stop - col_start), dtype=self.source_raster.dtypes[0])
+        for tile_row in range(row_start // self.tile_size, (row_stop - 1) // self.tile_size + 1):
+            for tile_col in range(col_start // self.tile_size, (col_stop - 1) // self.tile_size + 1):
+                tile = self.source_tile(tile_row, tile_col)
+                tile_top = tile_row * self.tile_size
+                tile_left = tile_col * self.tile_size
+                top = max(row_start, tile_top)
+                bottom = min(row_stop, tile_top + tile.shape[0])
+                left = max(col_start, tile_left)
+                right = min(col_stop, tile_left + tile.shape[1])
+                source_block[top - row_start:bottom - row_start, left - col_start:right - col_start] = \
+                    tile[top - tile_top:bottom - tile_top, left - tile_left:right - tile_left]
+        return source_block
+
+    def warp_tile(self, tile_window):
+        # Reproject the source cells under a tile of the grid with a margin for the resampling kernel
+        # The scale of the kernel is fixed because GDAL can estimate a downsampling scale for small tiles of an
+        # upsampling warp, which widens the bilinear kernel
+        tile = np.full((int(tile_window.height), int(tile_window.width)), self.nodata, dtype=self.dtypes[0])
+        left, bottom, right, top = transform_bounds(self.crs, self.source_crs,
+                                                    *window_bounds(tile_window, self.transform), densify_pts=21)
+        source_inverse = ~self.source_raster.transform
+        corner_list = [source_inverse * corner for corner in [(left, top), (right, top), (left, bottom),
+                                                               (right, bottom)]]
+        col_start = max(0, math.floor(min(corner[0] for corner in corner_list)) - 2)
+        col_stop = min(self.source_raster.width, math.ceil(max(corner[0] for corner in corner_list)) + 2)
+        row_start = max(0, math.floor(min(corner[1] for corner in corner_list)) - 2)
+        row_stop = min(self.source_raster.height, math.ceil(max(corner[1] for corner in corner_list)) + 2)
+        if col_start >= col_stop or row_start >= row_stop:
+            return tile
+        source_window = Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+        reproject(self.read_source(row_start, row_stop, col_start, col_stop), tile,
+                  src_transform=window_transform(source_window, self.source_raster.transform),
+                  src_crs=self.source_crs,
+                  src_nodata=self.source_nodata,
+                  dst_transform=window_transform(tile_window, self.transform),
+                  dst_crs=self.crs,
+                  dst_nodata=self.nodata,
+                  resampling=self.resampling,
+                  XSCALE=1,
+                  YSCALE=1)
+        return tile
+
+    def read(self, indexes=None, window=None, masked=False):
+        if window is None:
+            window = Window(0, 0, self.width, self.height)
+        (row_start, row_stop), (col_start, col_stop) = window.toranges()
+        block = np.empty((row_stop - row_start, col_stop - col_start), dtype=self.dtypes[0])
+        # Warp the tiles of the grid that the window overlaps so that values do not depend on the window
+        for tile_row in range(row_start // self.warp_size, (row_stop - 1) // self.warp_size + 1):
+            for tile_col in range(col_start // self.warp_size, (col_stop - 1) // self.warp_size + 1):
+                tile_top = tile_row * self.warp_size
+                tile_left = tile_col * self.warp_size
+                tile = self.warp_tile(Window(tile_left, tile_top,
+                                             min(self.warp_size, self.width - tile_left),
+                                             min(self.warp_size, self.height - tile_top)))
+                top = max(row_start, tile_top)
+                bottom = min(row_stop, tile_top + tile.shape[0])
+                left = max(col_start, tile_left)
+                right = min(col_stop, tile_left + tile.shape[1])
+                block[top - row_start:bottom - row_start, left - col_start:right - col_start] = \
+                    tile[top - tile_top:bottom - tile_top, left - tile_left:right - tile_left]
+        # Set no data values in warped raster to 0
+        block[block == self.nodata] = 0
+        # Set no data values from area raster to no data
+        area_block = self.area_raster.read(1, window=Window(col_start, row_start, col_stop - col_start,
+                                                            row_stop - row_start), masked=False)
+        block[area_block != 1] = self.nodata
+        if indexes is None or not isinstance(indexes, int):
+            block = block[np.newaxis]
+        return block
+
+    def close(self):
+        self.tiles = OrderedDict()
+        self.source_raster.close()
+        self.area_raster.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# Define a function to open a raster or warped view
+def open_layer_raster(raster_path):
+    """
+    Description: opens a single-band raster with rasterio or a warped view as a WarpedView
+    Inputs: 'raster_path' -- a file path to a raster or warped view
+    Returned Value: Returns an object with the read interface of a rasterio dataset
+    Preconditions: none
+    """
+
+    if is_warped_view(raster_path):
+        return WarpedView(raster_path)
+    return rasterio.open(raster_path)
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+# ---------------------------------------------------------------------------
+# Working cache
+# Author: Timm Nawrocki
+# Last Updated: 2026-10-17
+# Usage: Execute in Python 3.9+.
+# Description: "Working cache" stores intermediate rasters as uncompressed memory-mapped arrays with a georeference sidecar so that windows are read as zero-copy slices.
+# ---------------------------------------------------------------------------
+
+# Import packages
+import json
+import os
+import time
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+from rasterio.transform import Affine
+from rasterio.windows import Window
+
+
+# Define a function to name the cache entry for a raster
+def cache_entry_name(raster_path):
+    """
+    Description: derives the cache entry name from the file name of a raster
+    Inputs: 'raster_path' -- a file path to a raster
+    Returned Value: Returns the file name without extension
+    Preconditions: rasters cached in the same folder must have unique file names
+    """
+
+    return os.path.splitext(os.path.basename(raster_path))[0]
+
+
+# Define a function to read a cache sidecar
+def read_cache_header(cache_folder, entry_name):
+    """
+    Description: reads the georeference sidecar of a cache entry
+    Inputs: 'cache_folder' -- a folder that holds the working cache
+            'entry_name' -- the name of the cache entry
+    Returned Value: Returns a dictionary of the sidecar contents or None if the entry does not exist
+    Preconditions: none
+    """
+
+    header_file = os.path.join(cache_folder, entry_name + '.json')
+    array_file = os.path.join(cache_folder, entry_name + '.npy')
+    if os.path.exists(header_file) == 0 or os.path.exists(array_file) == 0:
+        return None
+    with open(header_file, 'r') as header_stream:
+        return json.load(header_stream)
+
+
+# Define a function to write a cache sidecar
+def write_cache_header(cache_folder, entry_name, header):
+    """
+    Description: writes the georeference sidecar of a cache entry
+    Inputs: 'cache_folder' -- a folder that holds the working cache
+            'entry_name' -- the name of the cache entry
+            'header' -- a dictionary of the sidecar contents
+    Returned Value: No return value
+    Preconditions: none
+    """
+
+    header_file = os.path.join(cache_folder, entry_name + '.json')
+    with open(header_file, 'w') as header_stream:
+        json.dump(header, header_stream, indent=2)
+
+
+# Define a function to describe the source of a cache entry
+def source_signature(raster_path):
+    """
+    Description: summarizes the size and modification time of a source raster
+    Inputs: 'raster_path' -- a file path to a raster
+    Returned Value: Returns a list of file size and modification time in nanoseconds or None if the file does not exist
+    Preconditions: none
+    """
+
+    if os.path.exists(raster_path) == 0:
+        return None
+    status = os.stat(raster_path)
+    return [status.st_size, status.st_mtime_ns]
+
+
+# Define a class to read a cached raster
+class CachedRaster:
+    """
+    Description: reads windows of a cached raster as zero-copy slices of a memory-mapped array with the same read
+    interface as a rasterio dataset
+    Inputs: 'cache_folder' -- a folder that holds the working cache
+            'entry_name' -- the name of the cache entry
+    Preconditions: the entry must exist in the cache
+    """
+
+    def __init__(self, cache_folder, entry_name):
+        self.header = read_cache_header(cache_folder, entry_name)
+        if self.header is None:
+            raise FileNotFoundError(f'Cache entry "{entry_name}" does not exist in {cache_folder}.')
+        array_file = os.path.join(cache_folder, entry_name + '.npy')
+        self.array = np.load(array_file, mmap_mode='r')
+        self.height, self.width = self.array.shape
+        self.dtypes = (str(self.array.dtype),)
+        self.nodata = self.header['nodata']
+        self.crs = CRS.from_wkt(self.header['crs']) if self.header['crs'] else None
+        self.transform = Affine(*self.header['transform'])
+        self.profile = {'driver': 'GTiff',
+                        'dtype': self.dtypes[0],
+                        'nodata': self.nodata,
+                        'width': self.width,
+                        'height': self.height,
+                        'count': 1,
+                        'crs': self.crs,
+                        'transform': self.transform,
+                        'tiled': True,
+                        'blockxsize': 256,
+                        'blockysize': 256,
+                        'compress': 'lzw'}
+        # Record use for eviction in the modification time of the array file
+        os.utime(array_file)
+
+    def read(self, indexes=None, window=None, masked=False):
+        if window is None:
+            window = Window(0, 0, self.width, self.height)
+        (row_start, row_stop), (col_start, col_stop) = window.toranges()
+        block = self.array[row_start:row_stop, col_start:col_stop]
+        if indexes is None or not isinstance(indexes, int):
+            block = block[np.newaxis]
+        return block
+
+    def close(self):
+        self.array = None
+
+
+# Define a class to write a cached raster
+class CachedRasterWriter:
+    """
+    Description: writes windows of a raster to a new cache entry instead of a compressed GeoTIFF
+    Inputs: 'cache_folder' -- a folder that holds the working cache
+            'entry_name' -- the name of the cache entry
+            'profile' -- a rasterio profile that defines the grid, data type, and no data value
+            'source' -- the file path that the entry stands in for, recorded in the sidecar
+    Preconditions: the entry is only valid after close is called
+    """
+
+    def __init__(self, cache_folder, entry_name, profile, source=None):
+        os.makedirs(cache_folder, exist_ok=True)
+        self.cache_folder = cache_folder
+        self.entry_name = entry_name
+        self.header = {'crs': profile['crs'].to_wkt() if profile.get('crs') else None,
+                       'transform': list(profile['transform'])[:6],
+                       'nodata': profile.get('nodata'),
+                       'source': source,
+                       'source_signature': None,
+                       'written_ns': None}
+        # Remove any previous entry so that an interrupted write is never read as complete
+        for extension in ['.json', '.npy']:
+            entry_file = os.path.join(cache_folder, entry_name + extension)
+            if os.path.exists(entry_file):
+                os.remove(entry_file)
+        self.array = np.lib.format.open_memmap(os.path.join(cache_folder, entry_name + '.npy'),
+                                               mode='w+',
+                                               dtype=profile['dtype'],
+                                               shape=(profile['height'], profile['width']))
+
+    def write(self, block, window):
+        (row_start, row_stop), (col_start, col_stop) = window.toranges()
+        self.array[row_start:row_stop, col_start:col_stop] = block.reshape(row_stop - row_start,
+                                                                          col_stop - col_start)
+
+    def close(self):
+        if self.array is not None:
+            self.array.flush()
+            self.array = None
+            self.header['written_ns'] = time.time_ns()
+            write_cache_header(self.cache_folder, self.entry_name, self.header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# Define a function to copy a raster into the working cache
+def cache_raster(raster_path, cache_folder):
+    """
+    Description: copies a raster into the working cache unless a current copy already exists
+    Inputs: 'raster_path' -- a file path to a single-band raster
+            'cache_folder' -- a folder that holds the working cache
+    Returned Value: Returns the cache entry name
+    Preconditions: the raster must have a single band; an entry that was produced in the cache is only replaced by
+    a copy of the raster when the raster was modified after the entry was written
+    """
+
+    # Reuse the entry when the source is unchanged
+    entry_name = cache_entry_name(raster_path)
+    header = read_cache_header(cache_folder, entry_name)
+    signature = source_signature(raster_path)
+    if header is not None and (signature is None or header['source_signature'] == signature):
+        return entry_name
+    # Reuse an entry produced in the cache unless the source was written after it
+    if header is not None and header['source_signature'] is None:
+        written_ns = header.get('written_ns')
+        if written_ns is None or signature[1] <= written_ns:
+            return entry_name
+    if signature is None:
+        raise FileNotFoundError(f'{raster_path} does not exist and is not in the working cache.')
+
+    # Copy the source block by block
+    with rasterio.open(raster_path) as input_raster:
+        with CachedRasterWriter(cache_folder, entry_name, input_raster.profile, raster_path) as writer:
+            writer.header['source_signature'] = signature
+            for block_index, window in input_raster.block_windows(1):
+                writer.write(input_raster.read(1, window=window, masked=False), window)
+
+    return entry_name
+
+
+# Define a function to open a raster through the working cache
+def open_cached_raster(raster_path, cache_folder):
+    """
+    Description: opens the cached copy of a raster, creating or refreshing it when needed
+    Inputs: 'raster_path' -- a file path to a single-band raster
+            'cache_folder' -- a folder that holds the working cache
+    Returned Value: Returns a CachedRaster
+    Preconditions: entries must be created before worker threads open them in parallel
+    """
+
+    return CachedRaster(cache_folder, cache_raster(raster_path, cache_folder))
+
+
+# Define a function to export a cached raster to a compressed GeoTIFF
+def export_cached_raster(raster_path, cache_folder):
+    """
+    Description: writes a cache entry to its compressed GeoTIFF path for delivery or inspection
+    Inputs: 'raster_path' -- the output file path, which also names the cache entry
+            'cache_folder' -- a folder that holds the working cache
+    Returned Value: No return value; writes the raster to disk
+    Preconditions: the cache entry must exist; the entry records the signature of the exported raster so that it is
+    not copied back into the cache
+    """
+
+    entry_name = cache_entry_name(raster_path)
+    cached_raster = CachedRaster(cache_folder, entry_name)
+    os.makedirs(os.path.dirname(os.path.abspath(raster_path)), exist_ok=True)
+    with rasterio.open(raster_path, 'w', **cached_raster.profile, BIGTIFF='YES') as dst:
+        for block_index, window in dst.block_windows(1):
+            dst.write(np.array(cached_raster.read(window=window)), window=window)
+    header = cached_raster.header
+    cached_raster.close()
+    header['source_signature'] = source_signature(raster_path)
+    write_cache_header(cache_folder, entry_name, header)
+
+
+# Define a function to summarize the size of the working cache
+def cache_size(cache_folder):
+    """
+    Description: lists the entries in the working cache with their size and last use
+    Inputs: 'cache_folder' -- a folder that holds the working cache
+    Returned Value: Returns a tuple of the total size in bytes and a list of entry dictionaries sorted from least to most recently used
+    Preconditions: the modification time of each array file records its last use
+    """
+
+    entry_list = []
+    if os.path.exists(cache_folder) == 0:
+        return 0, entry_list
+    for file_name in os.listdir(cache_folder):
+        if file_name.endswith('.npy') is False:
+            continue
+        entry_name = file_name[:-4]
+        array_file = os.path.join(cache_folder, file_name)
+        size = os.path.getsize(array_file)
+        last_used = os.path.getmtime(array_file)
+        header_file = os.path.join(cache_folder, entry_name + '.json')
+        if os.path.exists(header_file):
+            size += os.path.getsize(header_file)
+        entry_list.append({'name': entry_name, 'bytes': size, 'last_used': last_used})
+    entry_list.sort(key=lambda entry: entry['last_used'])
+    total_bytes = sum(entry['bytes'] for entry in entry_list)
+    return total_bytes, entry_list
+
+
+# Define a function to evict entries from the working cache
+def clean_cache(cache_folder, max_bytes=0):
+    """
+    Description: removes the least recently used entries until the working cache fits within a size budget
+    Inputs: 'cache_folder' -- a folder that holds the working cache
+            'max_bytes' -- the size budget in bytes; 0 removes all entries
+    Returned Value: Returns a list of the removed entry names
+    Preconditions: entries must not be open in a running stage
+    """
+
+    total_bytes, entry_list = cache_size(cache_folder)
+    removed_list = []
+    for entry in entry_list:
+        if total_bytes <= max_bytes:
+            break
+        for extension in ['.npy', '.json']:
+            entry_file = os.path.join(cache_folder, entry['name'] + extension)
+            if os.path.exists(entry_file):
+                os.remove(entry_file)
+        total_bytes -= entry['bytes']
+        removed_list.append(entry['name'])
+    return removed_list